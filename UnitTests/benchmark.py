@@ -0,0 +1,558 @@
+"""
+Benchmark harness for the plugin.
+
+Replays event traces through Adafruit_16x2_LCD against the dummy LCD, and
+reports for each trace:
+
+  * event-to-screen latency percentiles (modeled bus time + time spent in
+    the plugin)
+  * character writes per event
+  * total modeled bus time and bus commands
+
+A trace is a list of steps:
+
+  ('event', name, payload)         -> on_event(name, payload)
+  ('print_progress', progress)     -> on_print_progress(...)
+  ('slicing_progress', progress)   -> on_slicing_progress(...)
+
+Run `python benchmark.py` from the UnitTests folder to print the report,
+or `python benchmark.py trace.jsonl` to benchmark a recorded trace (see
+the record_events setting).
+"""
+import gc
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+
+#setup the imports for the benchmark
+from test_plugin import adafruitLCD, printer, settings
+from octoprint_adafruitlcd import frameBuffer
+from octoprint_adafruitlcd import recorder
+from octoprint_adafruitlcd import renderer
+import fakeSMBus
+
+
+def full_print_trace(name="foo_bar_2018-06-24_v2.gcode"):
+    trace = [
+        ('event', "Connected", None),
+        ('event', "MetadataAnalysisStarted", {"name":name}),
+        ('event', "MetadataAnalysisFinished", {"name":name}),
+        ('event', "PrintStarted", {"name":name})
+    ]
+    trace += [('print_progress', i) for i in range(1, 100)]
+    trace += [
+        ('event', "PrintDone", {"time":4512}),
+        ('event', "Disconnected", None)
+    ]
+    return trace
+
+def slice_then_print_trace(stl="foo_bar_v4_20180626.stl"):
+    trace = [
+        ('event', "Connected", None),
+        ('event', "SlicingStarted", {"stl":stl, "progressAvailable":True})
+    ]
+    trace += [('slicing_progress', i) for i in range(1, 100)]
+    trace += [('event', "SlicingDone", {"stl":stl, "time":123.354})]
+    return trace + full_print_trace(stl.replace(".stl", ".gcode"))[1:]
+
+def error_storm_trace(errors=200):
+    trace = [
+        ('event', "Connected", None),
+        ('event', "PrintStarted", {"name":"foobar.gcode"})
+    ]
+    for i in range(errors):
+        trace.append(('print_progress', i % 98 + 1))
+        trace.append(('event', "Error", {"error":"Thermal runaway {}".format(i)}))
+        if i % 10 == 9:
+            trace.append(('event', "Disconnected", None))
+            trace.append(('event', "Connected", None))
+    return trace
+
+TRACES = [
+    ('full print', full_print_trace),
+    ('slice then print', slice_then_print_trace),
+    ('error storm', error_storm_trace)
+]
+
+
+def get_plugin(**overrides):
+    plugin = adafruitLCD.Adafruit_16x2_LCD()
+
+    logging.basicConfig()
+    plugin._logger = logging.getLogger("benchmark")
+    plugin._logger.setLevel(40) #error
+
+    overrides.setdefault('render_thread', False)
+    plugin._settings = settings(plugin, overrides)
+    plugin._printer = printer()
+
+    plugin.on_startup(None, None)
+    plugin.on_after_startup()
+    plugin.wait_idle(5)
+    return plugin
+
+def get_lcd(plugin):
+    return plugin._Adafruit_16x2_LCD__data.lcd
+
+
+def percentile(values, percent):
+    # type (list, float) -> float
+    """
+    Nearest rank percentile
+    """
+    values = sorted(values)
+    if len(values) == 0:
+        return 0
+    rank = int(round(percent / 100.0 * (len(values) - 1)))
+    return values[rank]
+
+def run_trace(trace, **overrides):
+    # type (list) -> dict
+    """
+    Replay a trace step by step, and measure each step.  Events are drawn
+    on the calling thread, so the latency of a step is the modeled time
+    the lcd took, plus the time spent in the plugin.
+    """
+    plugin = get_plugin(**overrides)
+    lcd = get_lcd(plugin)
+
+    latencies = []
+    writes = []
+    lcd.resetStats()
+    for step in trace:
+        before = lcd.getStats()
+        start = time.time()
+        recorder.play_step(plugin, step)
+        elapsed = time.time() - start
+        after = lcd.getStats()
+
+        latencies.append(elapsed * 1000 + (after['bus_time_us'] - before['bus_time_us']) / 1000.0)
+        writes.append(after.get('write8', 0) - before.get('write8', 0))
+
+    stats = lcd.getStats()
+    return dict(
+        steps=len(trace),
+        latency_p50=percentile(latencies, 50),
+        latency_p90=percentile(latencies, 90),
+        latency_p99=percentile(latencies, 99),
+        latency_max=max(latencies),
+        writes_per_event=float(sum(writes)) / len(trace),
+        writes_max=max(writes),
+        bus_commands=stats['bus_commands'],
+        bus_time_ms=stats['bus_time_us'] / 1000.0
+    )
+
+# Events that start from a blank screen
+CLEARING_EVENTS = ('Connected', 'Disconnected', 'Connecting', 'Error')
+
+def transition_commands(trace):
+    # type (list) -> dict
+    """
+    Count the bus commands of the connection and error events of a trace,
+    and the commands they would need if the lcd was cleared before every
+    one of them, and the new screen was written on the blank lcd.  The bus
+    time is modeled with the dummy lcd's timings: 1 ms per command, and 3 ms
+    more for a clear.
+    """
+    plugin = get_plugin()
+    lcd = get_lcd(plugin)
+    util = plugin._Adafruit_16x2_LCD__util
+    frame_renderer = renderer.FrameRenderer()
+    blank = [" " * 16] * 2
+
+    events = 0
+    commands = clears = 0
+    cleared = 0
+    for step in trace:
+        before = util.get_render_stats()
+        recorder.play_step(plugin, step)
+        if step[0] != 'event' or step[1] not in CLEARING_EVENTS:
+            continue
+
+        after = util.get_render_stats()
+        events += 1
+        commands += after['commands'] - before['commands']
+        clears += after['clears'] - before['clears']
+        screen = [lcd.getLCDText(row) for row in range(2)]
+        cleared += 1 + frame_renderer.commands(frame_renderer.plan(blank, screen))
+
+    events = max(1, events)
+    return dict(events=events, commands=commands, cleared_commands=cleared,
+                saved_per_event=float(cleared - commands) / events,
+                saved_ms_per_event=(cleared - commands + 3 * (events - clears)) / float(events))
+
+# I2C transactions of a write8 with Adafruit_CharLCDPlate: RS, two nibbles,
+# and three for each enable pulse
+STOCK_WRITE8_TRANSACTIONS = 9
+
+def i2c_transactions(trace):
+    # type (list) -> dict
+    """
+    Count the I2C transactions a trace needs with Adafruit_CharLCDPlate, and
+    with the batched MCP23017Plate driver.  The stock count is modeled from
+    the bus commands of the dummy lcd, the batched count is recorded on a
+    fake smbus.
+    """
+    plugin = get_plugin()
+    lcd = get_lcd(plugin)
+    lcd.resetStats()
+    for step in trace:
+        recorder.play_step(plugin, step)
+    stats = lcd.getStats()
+    frames = plugin._Adafruit_16x2_LCD__util.get_render_stats()['frames']
+    # set_backlight is a single write of the backlight pins
+    stock = stats['bus_commands'] * STOCK_WRITE8_TRANSACTIONS + stats.get('set_backlight', 0)
+
+    bus = fakeSMBus.MCP23017()
+    plugin = get_plugin(backend='mcp23017', backend_options=dict(bus=bus, clear_delay=0))
+    del bus.transactions[:]
+    for step in trace:
+        recorder.play_step(plugin, step)
+    batched = len(bus.transactions)
+
+    return dict(frames=frames, stock=stock, batched=batched,
+                stock_per_frame=float(stock) / frames, batched_per_frame=float(batched) / frames)
+
+def startup_time(**overrides):
+    # type (...) -> dict
+    """
+    Time how long on_startup blocks the server, and how long the display
+    takes to open.  By default the display is an MCP23017 plate on a fake
+    smbus, which waits for the controller after every clear and home.
+    """
+    overrides.setdefault('backend', 'mcp23017')
+    overrides.setdefault('backend_options', dict(bus=fakeSMBus.MCP23017()))
+    plugin = get_plugin(**overrides)
+    stats = plugin.get_startup_stats()
+    plugin.on_shutdown()
+    return stats
+
+# Imports the plugin package in a fresh interpreter, after OctoPrint, and
+# reports how long it took and the modules it pulled in
+IMPORT_SCRIPT = """
+import json, sys, time
+import octoprint.plugin
+before = set(sys.modules)
+start = time.time()
+import octoprint_adafruitlcd
+import_ms = (time.time() - start) * 1000
+modules = sorted(m for m in set(sys.modules) - before if sys.modules[m] is not None)
+print(json.dumps(dict(import_ms=import_ms, modules=modules)))
+"""
+
+# Libraries that drive the display, only imported once a backend is opened
+HARDWARE_MODULES = ('Adafruit_CharLCD', 'Adafruit_GPIO', 'RPi', 'smbus', 'smbus2', 'spidev')
+
+def import_time(repeat=5):
+    # type (int) -> dict
+    """
+    Time the import of the plugin package, like `python -X importtime`,
+    which python 2 does not have.  Every import runs in a new interpreter,
+    so that nothing is imported already.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([root] + [p for p in [env.get('PYTHONPATH')] if p])
+
+    times = []
+    for i in range(repeat):
+        result = json.loads(subprocess.check_output([sys.executable, "-c", IMPORT_SCRIPT], env=env))
+        times.append(result['import_ms'])
+    modules = result['modules']
+
+    return dict(
+        import_ms=percentile(times, 50),
+        modules=len(modules),
+        hardware_modules=[m for m in modules if m.split('.')[0] in HARDWARE_MODULES]
+    )
+
+def file_name_corpus(count=5000, seed=0):
+    # type (int, int) -> list
+    """
+    Generate distinct file names like the ones found on a print server:
+    words joined with underscores, dashes, spaces or camel case, with
+    dates, counters, version numbers, and slicer suffixes.  The default
+    corpus is much larger than the file name cache.
+    """
+    rand = random.Random(seed)
+    words = ["bracket", "benchy", "3DBenchy", "calibration", "cube", "vase", "mode", "gear", "spool",
+             "holder", "raspberry", "pi", "case", "lid", "fan", "duct", "hotend", "mount", "clip",
+             "cable", "chain", "x", "carriage", "Y", "belt", "tensioner", "PLA", "PETG", "ABS", "final",
+             "fixed", "copy", "part", "left", "right", "top", "bottom"]
+    separators = ["_", "-", " ", ""]
+    extensions = [".gcode", ".gco", ".g", ".stl", ".STL", ".obj", ".3mf"]
+    names = []
+    seen = set()
+    while len(names) < count:
+        parts = [rand.choice(words) for w in range(rand.randint(1, 5))]
+        if rand.random() < 0.3:
+            parts.insert(0, "{:04d}{:02d}{:02d}".format(rand.randint(2015, 2019), rand.randint(1, 12), rand.randint(1, 28)))
+        if rand.random() < 0.3:
+            parts.append("v{}".format(rand.randint(1, 12)))
+        if rand.random() < 0.2:
+            parts.append("{}".format(rand.randint(1, 99999)))
+        if rand.random() < 0.2:
+            parts.append("{}mm".format(rand.choice([0.1, 0.15, 0.2, 0.3])))
+        sep = rand.choice(separators)
+        if sep == "":
+            parts = [p[0].upper() + p[1:] for p in parts]
+        name = sep.join(parts) + rand.choice(extensions)
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+def file_name_lookups(names, count, seed=0):
+    # type (list, int, int) -> list
+    """
+    Pick the names that events look up, most of them among the files that
+    were uploaded recently: the names are in upload order, and a name is
+    picked with a probability that falls off with its age.
+    """
+    rand = random.Random(seed)
+    return [names[len(names) - 1 - int(len(names) * rand.random() ** 4)] for i in range(count)]
+
+def file_name_benchmark(names, lookups=None):
+    # type (list, list) -> dict
+    """
+    Time shortening every name of a corpus, then looking up names through
+    the cache, misses and evictions included.
+    :param names: corpus of file names
+    :param lookups: names to look up, file_name_lookups of 5 times the
+        corpus by default
+    :return: microseconds per name without the cache, per lookup with the
+        cache, and the cache statistics
+    """
+    data = get_plugin()._Adafruit_16x2_LCD__data
+    if lookups is None:
+        lookups = file_name_lookups(names, len(names) * 5)
+
+    start = time.time()
+    for name in names:
+        data.shorten_file_name(name, data.lcd_width)
+    uncached = (time.time() - start) * 1000000 / len(names)
+
+    start = time.time()
+    for name in lookups:
+        data.clean_file_name(name)
+    cached = (time.time() - start) * 1000000 / len(lookups)
+
+    return dict(uncached_us=uncached, cached_us=cached, cache=data.file_names.get_stats())
+
+class FormatOnlyHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.formatted = 0
+
+    def emit(self, record):
+        self.format(record)
+        self.formatted += 1
+
+def write_overhead(level=logging.ERROR, writes=2000):
+    # type (int, int) -> dict
+    """
+    Measure the time write_to_lcd spends outside of the lcd, such as
+    logging, by writing a message that is already on the screen.
+    :param level: log level of the plugin
+    :return: dict with the microseconds per write, and the number of log
+        messages formatted and bus commands sent by the writes
+    """
+    plugin = get_plugin()
+    plugin._logger.setLevel(level)
+    # format the log messages as if they were written, without printing them
+    handler = FormatOnlyHandler()
+    plugin._logger.propagate = False
+    plugin._logger.handlers = [handler]
+
+    util = plugin._Adafruit_16x2_LCD__util
+    message = u"[====\x01     ] 42%"
+    util.write_to_lcd(message, 1)
+    lcd = get_lcd(plugin)
+    lcd.resetStats()
+    handler.formatted = 0
+
+    start = time.time()
+    for i in range(writes):
+        util.write_to_lcd(message, 1)
+    return dict(
+        write_us=(time.time() - start) * 1000000 / writes,
+        formatted=handler.formatted,
+        bus_commands=lcd.getStats()['bus_commands']
+    )
+
+# (width, height) of the common character LCDs
+GEOMETRIES = [(16, 2), (20, 4), (40, 2)]
+
+def geometry_benchmark(writes=2000):
+    # type (int) -> list
+    """
+    Replay the traces on each display geometry, and measure the time
+    write_to_lcd takes to draw a progress line that changes every write,
+    on a virtual display so that only the time spent in the plugin counts.
+    :return: list of ((width, height), results)
+    """
+    results = []
+    for width, height in GEOMETRIES:
+        traces = dict(run_all(lcd_width=width, lcd_height=height))
+
+        plugin = get_plugin(backend='virtual', lcd_width=width, lcd_height=height)
+        util = plugin._Adafruit_16x2_LCD__util
+        lines = [u"[" + c * (width - 6) + u"] 42%" for c in (u"=", u"-")]
+        start = time.time()
+        for i in range(writes):
+            util.write_to_lcd(lines[i % 2], 1)
+        write_us = (time.time() - start) * 1000000 / writes
+
+        results.append(((width, height), dict(
+            bus_commands=dict((name, r['bus_commands']) for name, r in traces.items()),
+            write_us=write_us
+        )))
+    return results
+
+def marquee_commands(name="foo_bar_cheese_grinder_v3.gcode", steps=100):
+    # type (str, int) -> dict
+    """
+    Scroll a file name above the progress bar, and count the bus commands
+    of each step, against rewriting the whole row every step.
+    """
+    plugin = get_plugin(marquee_file_names=True, marquee_interval=60)
+    lcd = get_lcd(plugin)
+    plugin.on_event("PrintStarted", {"name": name})
+    plugin.on_print_progress(None, None, 43)
+
+    lcd.resetStats()
+    for i in range(steps):
+        plugin.on_event("self_marquee", None)
+    commands = lcd.getStats()['bus_commands']
+    plugin.on_shutdown()
+    return dict(
+        steps=steps,
+        commands_per_step=float(commands) / steps,
+        row_commands_per_step=plugin._Adafruit_16x2_LCD__data.lcd_width + 1
+    )
+
+def frame_cost(writes=3000, repeat=7):
+    # type (int, int) -> dict
+    """
+    Measure the time write_to_lcd takes to draw a progress line that
+    changes every write, and a line that is already on the screen, best of
+    repeat runs.  Also check that the frames are drawn in place: the frame
+    buffers stay the same objects, and the writes leave no objects behind
+    (new_objects is the growth of the objects the garbage collector tracks).
+    """
+    plugin = get_plugin(backend='virtual')
+    util = plugin._Adafruit_16x2_LCD__util
+    lines = [u"[====\x01     ] 42%", u"[=====\x02    ] 43%"]
+    util.write_to_lcd(lines[1], 1)
+
+    def best(changing):
+        times = []
+        for r in range(repeat):
+            start = time.time()
+            for i in range(writes):
+                util.write_to_lcd(lines[i % 2 if changing else 1], 1)
+            times.append((time.time() - start) * 1000000 / writes)
+        return min(times)
+
+    result = dict(write_us=best(True), unchanged_us=best(False))
+
+    buffers = [util._LCDUtil__frame, util._LCDUtil__drawn]
+    gc.collect()
+    objects = len(gc.get_objects())
+    for i in range(writes):
+        util.write_to_lcd(lines[i % 2], 1)
+    gc.collect()
+    result['new_objects'] = len(gc.get_objects()) - objects
+    result['buffers_reused'] = all(a is b for a, b in zip(buffers, [util._LCDUtil__frame, util._LCDUtil__drawn]))
+    plugin.on_shutdown()
+    return result
+
+def diff_cost(width=16, diffs=20000, repeat=7):
+    # type (int, int, int) -> dict
+    """
+    Measure the time FrameBuffer.diff takes to find the cells of a progress
+    bar row that changed: a step of the bar, a row that changed everywhere,
+    and a row that did not change, best of repeat runs.
+    """
+    def line(percent, bar):
+        return u"[{}] {:>3}%".format(bar.ljust(width - 7), percent)[:width]
+
+    drawn = frameBuffer.FrameBuffer.from_lines([line(42, u"=" * 5)])
+    frames = dict(
+        step_us=frameBuffer.FrameBuffer.from_lines([line(43, u"=" * 6)]),
+        changed_us=frameBuffer.FrameBuffer.from_lines([u"-" * width]),
+        unchanged_us=drawn.copy()
+    )
+
+    result = dict()
+    for name, frame in frames.items():
+        times = []
+        for r in range(repeat):
+            start = time.time()
+            for i in range(diffs):
+                frame.diff(drawn, 0)
+            times.append((time.time() - start) * 1000000 / diffs)
+        result[name] = min(times)
+    return result
+
+def run_all(**overrides):
+    # type () -> list
+    return [(name, run_trace(trace(), **overrides)) for name, trace in TRACES]
+
+def format_report(results):
+    # type (list) -> str
+    lines = ["{:<18}{:>7}{:>9}{:>9}{:>9}{:>9}{:>10}{:>10}{:>12}".format(
+        "trace", "steps", "p50 ms", "p90 ms", "p99 ms", "max ms", "writes/ev", "commands", "bus ms")]
+    for name, r in results:
+        lines.append("{:<18}{:>7}{:>9.2f}{:>9.2f}{:>9.2f}{:>9.2f}{:>10.2f}{:>10}{:>12.1f}".format(
+            name, r['steps'], r['latency_p50'], r['latency_p90'], r['latency_p99'], r['latency_max'],
+            r['writes_per_event'], r['bus_commands'], r['bus_time_ms']))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        results = [(path, run_trace([step for t, step in recorder.load_trace(path)])) for path in sys.argv[1:]]
+    else:
+        results = run_all()
+    print(format_report(results))
+    print("")
+    print("write_to_lcd overhead: {:.1f} us at ERROR, {:.1f} us at DEBUG".format(
+        write_overhead(logging.ERROR)['write_us'], write_overhead(logging.DEBUG)['write_us']))
+    for name, trace in TRACES:
+        i2c = i2c_transactions(trace())
+        print("{}: {:.1f} I2C transactions per frame with Adafruit_CharLCDPlate, {:.1f} batched".format(
+            name, i2c['stock_per_frame'], i2c['batched_per_frame']))
+    for name, trace in TRACES:
+        transitions = transition_commands(trace())
+        print("{}: {} connection and error events, {:.1f} bus commands and {:.1f} ms saved per event "
+              "by only clearing the lcd when it is cheaper".format(
+            name, transitions['events'], transitions['saved_per_event'], transitions['saved_ms_per_event']))
+    for (width, height), r in geometry_benchmark():
+        print("{}x{}: write_to_lcd {:.1f} us, bus commands {}".format(width, height, r['write_us'],
+            ", ".join("{} {}".format(name, r['bus_commands'][name]) for name, trace in TRACES)))
+    scrolled = marquee_commands()
+    print("marquee: {:.1f} bus commands per step, {} to rewrite the row".format(
+        scrolled['commands_per_step'], scrolled['row_commands_per_step']))
+    frames = frame_cost()
+    print("write_to_lcd: {:.1f} us for a new frame, {:.1f} us for an unchanged frame, {} objects left, "
+          "buffers {}".format(frames['write_us'], frames['unchanged_us'], frames['new_objects'],
+                              "reused" if frames['buffers_reused'] else "reallocated"))
+    diffs = diff_cost()
+    print("FrameBuffer.diff: {:.2f} us for a progress step, {:.2f} us for a changed row, {:.2f} us for an "
+          "unchanged row".format(diffs['step_us'], diffs['changed_us'], diffs['unchanged_us']))
+    imported = import_time()
+    print("import octoprint_adafruitlcd: {:.1f} ms, {} modules, hardware modules: {}".format(
+        imported['import_ms'], imported['modules'], ", ".join(imported['hardware_modules']) or "none"))
+    startup = startup_time()
+    print("startup: on_startup blocks {:.1f} ms, display open after {:.1f} ms".format(
+        startup['startup_ms'], startup['open_ms']))
+    # the names of the files on a print server, looked up again and again
+    names = file_name_benchmark(file_name_corpus())
+    print("clean_file_name: {:.1f} us uncached, {:.1f} us per lookup with the cache, {}".format(
+        names['uncached_us'], names['cached_us'], names['cache']))
@@ -86,8 +86,21 @@ DOWN                    = 2
 UP                      = 3
 LEFT                    = 4
 
+# Time in microseconds a command takes on the bus (the library waits 1 ms after each write8)
+WRITE8_TIME             = 1000
+# Extra time that clear and home take
+CLEAR_TIME              = 3000
+
 class Adafruit_CharLCD(object):
-    """Class to represent and interact with an HD44780 character LCD display."""
+    """Class to represent and interact with an HD44780 character LCD display.
+
+    Test version: every call is counted, and the delays only advance a
+    virtual clock, unless realtime is True.  getStats() reports the calls,
+    the number of commands sent to the controller, and the modeled bus time.
+    """
+
+    # Busy wait like the real library, instead of only advancing the virtual clock
+    realtime = False
 
     def __init__(self, rs, en, d4, d5, d6, d7, cols, lines, backlight=None,
                     invert_polarity=True,
@@ -124,11 +137,15 @@ class Adafruit_CharLCD(object):
         """
 
         # Test variables
+        self.resetStats()
+
         self.__lcd_array = []
         for i in range(lines):
             self.__lcd_array.append(" " * cols)
         
         self.__cursor = [0, 0]
+        # CGRAM is undefined until characters are created
+        self.__cgram = [None] * 8
 
         self.__BACKLIGHT = True
         self.__ENABLED = True
@@ -174,35 +191,45 @@ class Adafruit_CharLCD(object):
 
     def home(self):
         """Move the cursor back to its home (first line and first column)."""
+        self._count('home')
         # self.write8(LCD_RETURNHOME)  # set cursor position to zero
+        self._bus_write()
         self.__cursor = [0, 0]
-        self._delay_microseconds(3000)  # this command takes a long time!
+        self._delay_microseconds(CLEAR_TIME)  # this command takes a long time!
 
     def clear(self):
         """Clear the LCD."""
+        self._count('clear')
         # self.write8(LCD_CLEARDISPLAY)  # command to clear display
+        self._bus_write()
         self.__lcd_array = []
         for i in range(self._lines):
             self.__lcd_array.append(" " * self._cols)
-        self._delay_microseconds(3000)  # 3000 microsecond sleep, clearing the display takes a long time
+        # clearing the display also sets the cursor home
+        self.__cursor = [0, 0]
+        self._delay_microseconds(CLEAR_TIME)  # 3000 microsecond sleep, clearing the display takes a long time
 
     def set_cursor(self, col, row):
         """Move the cursor to an explicit column and row position."""
+        self._count('set_cursor')
         # Clamp row to the last row of the display.
         if row > self._lines:
             row = self._lines - 1
         # Set location.
         # self.write8(LCD_SETDDRAMADDR | (col + LCD_ROW_OFFSETS[row]))
+        self._bus_write()
         self.__cursor = [col, row]
 
     def enable_display(self, enable):
         """Enable or disable the display.  Set enable to True to enable."""
+        self._count('enable_display')
         self.__ENABLED = enable
         if enable:
             self.displaycontrol |= LCD_DISPLAYON
         else:
             self.displaycontrol &= ~LCD_DISPLAYON
         # self.write8(LCD_DISPLAYCONTROL | self.displaycontrol)
+        self._bus_write()
 
     def show_cursor(self, show):
         """Show or hide the cursor.  Cursor is shown if show is True."""
@@ -271,6 +298,7 @@ class Adafruit_CharLCD(object):
         turn it off.  If PWM is enabled, backlight can be any value from 0.0 to
         1.0, with 1.0 being full intensity backlight.
         """
+        self._count('set_backlight')
         self.__BACKLIGHT = backlight
         # if self._backlight is not None:
         #     if self._pwm_enabled:
@@ -283,8 +311,9 @@ class Adafruit_CharLCD(object):
         value from 0-255, and char_mode is True if character data or False if
         non-character data (default).
         """
+        self._count('write8')
         # One millisecond delay to prevent writing too quickly.
-        self._delay_microseconds(1000)
+        self._bus_write()
         # Set character / data bit.
         # self._gpio.output(self._rs, char_mode)
         # Write upper 4 bits.
@@ -317,18 +346,32 @@ class Adafruit_CharLCD(object):
         design your custom character at http://www.quinapalus.com/hd44780udg.html
         To show your custom character use eg. lcd.message('\x01')
         """
+        self._count('create_char')
         # only position 0..7 are allowed
         location &= 0x7
         # self.write8(LCD_SETCGRAMADDR | (location << 3))
         # for i in range(8):
             # self.write8(pattern[i], char_mode=True)
+        self._bus_write(9)
+        self.__cgram[location] = list(pattern)
 
     def _delay_microseconds(self, microseconds):
+        self.__stats['bus_time_us'] += microseconds
+        if not self.realtime:
+            return
         # Busy wait in loop because delays are generally very short (few microseconds).
         end = time.time() + (microseconds/1000000.0)
         while time.time() < end:
             pass
 
+    def _bus_write(self, count=1):
+        # Model count write8 commands being sent to the controller
+        self.__stats['bus_commands'] += count
+        self._delay_microseconds(WRITE8_TIME * count)
+
+    def _count(self, call):
+        self.__stats[call] = self.__stats.get(call, 0) + 1
+
     def _pulse_enable(self):
         # Pulse the clock enable line off, on, off to send command.
         # self._gpio.output(self._en, False)
@@ -353,11 +396,23 @@ class Adafruit_CharLCD(object):
     def getBacklight(self):
         #type () -> bool
         return self.__BACKLIGHT
+
+    def getCGRAM(self, location):
+        #type (int) -> list
+        return self.__cgram[location]
     
     def getEnabled(self):
         #type () -> bool
         return self.__ENABLED
 
+    def getStats(self):
+        #type () -> dict
+        return dict(self.__stats)
+
+    def resetStats(self):
+        #type () -> None
+        self.__stats = {'bus_commands': 0, 'bus_time_us': 0}
+
 
 class Adafruit_RGBCharLCD(Adafruit_CharLCD):
     """Class to represent and interact with an HD44780 character LCD display with
@@ -459,6 +514,7 @@ class Adafruit_RGBCharLCD(Adafruit_CharLCD):
         1.0, with 1.0 being full intensity backlight.  On an RGB display this
         function will set the backlight to all white.
         """
+        self._count('set_backlight')
         self.__BACKLIGHT = backlight
         # self.set_color(backlight, backlight, backlight)
     
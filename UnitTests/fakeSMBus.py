@@ -0,0 +1,140 @@
+class SMBus(object):
+    """
+    Test version of smbus.SMBus: records every transaction instead of
+    talking to a device.
+    """
+
+    def __init__(self, bus=1):
+        self.bus = bus
+        self.transactions = []
+        # value read from each register
+        self.registers = dict()
+
+    def write_byte(self, address, value):
+        self.transactions.append(('write_byte', address, value))
+
+    def write_byte_data(self, address, register, value):
+        self.transactions.append(('write_byte_data', address, register, value))
+
+    def write_i2c_block_data(self, address, register, data):
+        if len(data) > 32:
+            raise IOError("smbus blocks hold up to 32 bytes")
+        self.transactions.append(('write_i2c_block_data', address, register, list(data)))
+
+    def read_byte_data(self, address, register):
+        self.transactions.append(('read_byte_data', address, register))
+        return self.registers.get(register, 0xFF)
+
+    def port_states(self, register=None):
+        # type (int) -> list
+        """
+        Every state written to a register, in order.  Without a register,
+        the states written to a device that has no registers, where the
+        register of a block write is the first state.
+        """
+        states = []
+        for t in self.transactions:
+            if register is None:
+                if t[0] == 'write_byte':
+                    states.append(t[2])
+                elif t[0] == 'write_i2c_block_data':
+                    states += [t[2]] + t[3]
+            elif t[0] == 'write_byte_data' and t[2] == register:
+                states.append(t[3])
+            elif t[0] == 'write_i2c_block_data' and t[2] == register:
+                states += t[3]
+        return states
+
+
+# MCP23017 registers, in the order of the IOCON.BANK = 1 map
+MCP23017_REGISTERS = ['IODIR', 'IPOL', 'GPINTEN', 'DEFVAL', 'INTCON', 'IOCON', 'GPPU', 'INTF', 'INTCAP', 'GPIO',
+                      'OLAT']
+MCP23017_BANK = 0x80
+MCP23017_SEQOP = 0x20
+
+
+class MCP23017(SMBus):
+    """
+    Test version of smbus.SMBus with an MCP23017 on it, that models where
+    every byte written lands: the register map depends on IOCON.BANK, and the
+    address pointer of a block write increments, or with IOCON.SEQOP set,
+    stays on the register with BANK = 1, and toggles between the A and B
+    registers of a pair with BANK = 0.
+    """
+
+    def __init__(self, bus=1):
+        super(MCP23017, self).__init__(bus)
+        self.iocon = 0
+        # every (register, value) written, with registers named as 'GPIOB'
+        self.writes = []
+
+    def clear(self):
+        """
+        Forget the transactions and the writes, but not the IOCON register
+        """
+        del self.transactions[:]
+        del self.writes[:]
+
+    def register_name(self, register):
+        # type (int) -> str
+        if self.iocon & MCP23017_BANK:
+            index, port = register & 0x0F, register >> 4
+        else:
+            index, port = register >> 1, register & 1
+        return MCP23017_REGISTERS[index] + 'AB'[port]
+
+    def __write(self, register, data):
+        for value in data:
+            name = self.register_name(register)
+            self.writes.append((name, value))
+            if name.startswith('IOCON'):
+                self.iocon = value
+            if not self.iocon & MCP23017_SEQOP:
+                register += 1
+            elif not self.iocon & MCP23017_BANK:
+                register ^= 1
+
+    def write_byte_data(self, address, register, value):
+        super(MCP23017, self).write_byte_data(address, register, value)
+        self.__write(register, [value])
+
+    def write_i2c_block_data(self, address, register, data):
+        super(MCP23017, self).write_i2c_block_data(address, register, data)
+        self.__write(register, data)
+
+    def read_byte_data(self, address, register):
+        self.transactions.append(('read_byte_data', address, register))
+        return self.registers.get(self.register_name(register), 0xFF)
+
+    def port_states(self, register=None):
+        # type (str) -> list
+        """
+        Every state written to a register, in order
+        :param register: name of the register, such as 'GPIOB'
+        """
+        return [value for name, value in self.writes if name == register]
+
+
+def decode_hd44780(states, rs, en, data):
+    # type (list, int, int, tuple) -> list
+    """
+    Read port states the way an HD44780 in 4 bit mode does: a nibble is
+    latched when EN falls, and two nibbles make a byte
+    :param rs: mask of the RS pin
+    :param en: mask of the EN pin
+    :param data: masks of the D4, D5, D6, and D7 pins
+    :return: list of (rs, value)
+    """
+    writes = []
+    high = None
+    previous = 0
+    for state in states:
+        if previous & en and not state & en:
+            nibble = sum(1 << bit for bit, pin in enumerate(data) if state & pin)
+            if high is None:
+                high = nibble
+            else:
+                writes.append((bool(state & rs), (high << 4) | nibble))
+                high = None
+        previous = state
+    return writes
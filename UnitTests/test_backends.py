@@ -0,0 +1,49 @@
+import unittest
+
+import sys
+
+#setup the imports for the unit test
+sys.modules['Adafruit_CharLCD'] = __import__('dummyLCD')
+from octoprint_adafruitlcd import backends
+from octoprint_adafruitlcd import mcp23017
+from octoprint_adafruitlcd import pcf8574
+from octoprint_adafruitlcd import virtualLCD
+
+import dummyLCD as LCD
+import fakeSMBus
+
+
+class TestBackends(unittest.TestCase):
+
+    def test_get_backend(self):
+        self.assertIsInstance(backends.get_backend("plate"), backends.PlateBackend)
+        self.assertIsInstance(backends.get_backend("virtual"), backends.VirtualBackend)
+        self.assertRaises(ValueError, backends.get_backend, "hd44780")
+
+    def test_create(self):
+        lcd = backends.get_backend("plate").create(16, 2)
+        self.assertIsInstance(lcd, LCD.Adafruit_CharLCDPlate)
+
+        lcd = backends.get_backend("gpio", dict(rs=27, en=22, d4=25, d5=24, d6=23, d7=18, backlight=4)).create(20, 4)
+        self.assertIsInstance(lcd, LCD.Adafruit_CharLCD)
+        self.assertEqual(lcd._backlight, 4)
+
+        options = dict(bus=fakeSMBus.MCP23017(), clear_delay=0)
+        self.assertIsInstance(backends.get_backend("mcp23017", options).create(16, 2), mcp23017.MCP23017Plate)
+        options = dict(bus=fakeSMBus.SMBus(), clear_delay=0)
+        self.assertIsInstance(backends.get_backend("pcf8574", options).create(16, 2), pcf8574.PCF8574Backpack)
+
+        lcd = backends.get_backend("virtual").create(20, 4)
+        self.assertIsInstance(lcd, virtualLCD.VirtualLCD)
+        lcd.set_cursor(3, 2)
+        lcd.message("foo")
+        self.assertEqual(lcd.get_text(2), "   foo" + " " * 14)
+
+    def test_costs(self):
+        for name, backend in backends.BACKENDS.items():
+            self.assertGreater(backend.char_cost, 0, name)
+            self.assertGreaterEqual(backend.cursor_cost, backend.char_cost, name)
+            self.assertGreaterEqual(backend.clear_cost, backend.cursor_cost, name)
+
+        # the batched drivers write characters much faster than they move the cursor
+        self.assertGreater(backends.MCP23017Backend.cursor_cost, backends.MCP23017Backend.char_cost * 1.5)
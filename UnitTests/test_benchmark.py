@@ -0,0 +1,123 @@
+import unittest
+
+import logging
+
+import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_percentile(self):
+        self.assertEqual(benchmark.percentile([5, 1, 4, 2, 3], 50), 3)
+        self.assertEqual(benchmark.percentile([5, 1, 4, 2, 3], 100), 5)
+        self.assertEqual(benchmark.percentile([], 90), 0)
+
+    def test_traces(self):
+        results = dict(benchmark.run_all())
+
+        for name, trace in benchmark.TRACES:
+            r = results[name]
+            self.assertEqual(r['steps'], len(trace()))
+            self.assertLessEqual(r['latency_p50'], r['latency_p90'])
+            self.assertLessEqual(r['latency_p90'], r['latency_p99'])
+            self.assertLessEqual(r['latency_p99'], r['latency_max'])
+
+        # budgets for the modeled bus cost of each trace, to catch regressions
+        self.assertLessEqual(results['full print']['bus_commands'], 500)
+        self.assertLessEqual(results['slice then print']['bus_commands'], 900)
+        self.assertLessEqual(results['error storm']['bus_commands'], 11000)
+
+        # a progress update only rewrites a few characters
+        self.assertLess(results['full print']['writes_per_event'], 4)
+
+    def test_report(self):
+        report = benchmark.format_report([('full print', benchmark.run_trace(benchmark.full_print_trace()))])
+        self.assertIn("full print", report)
+        self.assertEqual(len(report.splitlines()), 2)
+
+    def test_write_overhead(self):
+        error = benchmark.write_overhead(logging.ERROR, 500)
+        debug = benchmark.write_overhead(logging.DEBUG, 500)
+        # nothing is formatted when the messages are not logged
+        self.assertEqual(error['formatted'], 0)
+        self.assertGreaterEqual(debug['formatted'], 500)
+        # the message is already on the screen, the time is all spent in the plugin
+        self.assertEqual(error['bus_commands'], 0)
+        self.assertEqual(debug['bus_commands'], 0)
+
+    def test_file_names(self):
+        names = benchmark.file_name_corpus(1000)
+        self.assertEqual(len(set(names)), 1000)
+
+        # a small corpus stays in the cache
+        small = names[:200]
+        result = benchmark.file_name_benchmark(small, small * 3)
+        cache = result['cache']
+        self.assertEqual(cache['hits'] + cache['misses'], 600 - 3 * sum(1 for n in small if len(n) <= 16))
+        self.assertEqual(cache['misses'], cache['entries'])
+        self.assertEqual(cache['evictions'], 0)
+
+        # a corpus larger than the cache evicts the old names, the recent
+        # ones are still found
+        result = benchmark.file_name_benchmark(names, benchmark.file_name_lookups(names, 3000))
+        cache = result['cache']
+        self.assertGreater(cache['evictions'], 0)
+        self.assertGreater(cache['hits'], cache['misses'])
+
+    def test_transition_commands(self):
+        result = benchmark.transition_commands(benchmark.error_storm_trace())
+
+        self.assertEqual(result['events'], 200 + 2 * 20 + 1)
+        # an error that follows an error only rewrites the message
+        self.assertLess(result['commands'], result['cleared_commands'])
+        self.assertGreater(result['saved_ms_per_event'], 0)
+
+    def test_geometry(self):
+        results = dict(benchmark.geometry_benchmark(200))
+        self.assertEqual(sorted(results), sorted(benchmark.GEOMETRIES))
+
+        for geometry, r in results.items():
+            self.assertGreater(r['write_us'], 0)
+            for name, trace in benchmark.TRACES:
+                self.assertGreater(r['bus_commands'][name], 0)
+
+        # the wider progress bar takes more writes to fill
+        self.assertGreater(results[(40, 2)]['bus_commands']['full print'],
+                           results[(16, 2)]['bus_commands']['full print'])
+
+    def test_marquee_commands(self):
+        result = benchmark.marquee_commands(steps=60)
+        # the steps that hold the start of the name draw nothing
+        self.assertLess(result['commands_per_step'], result['row_commands_per_step'])
+
+    def test_frame_cost(self):
+        result = benchmark.frame_cost(200, 2)
+        # an unchanged frame is not planned
+        self.assertLess(result['unchanged_us'], result['write_us'])
+        # the frames are drawn in place
+        self.assertTrue(result['buffers_reused'])
+        self.assertLessEqual(result['new_objects'], 0)
+
+    def test_diff_cost(self):
+        result = benchmark.diff_cost(20, 100, 1)
+        self.assertEqual(sorted(result), ['changed_us', 'step_us', 'unchanged_us'])
+
+    def test_import_time(self):
+        result = benchmark.import_time(1)
+        self.assertGreater(result['modules'], 0)
+        # the display libraries are imported by the backends, when the display is opened
+        self.assertEqual(result['hardware_modules'], [])
+
+    def test_startup_time(self):
+        result = benchmark.startup_time()
+        # the server does not wait for the display to open
+        self.assertLess(result['startup_ms'], result['open_ms'])
+
+    def test_i2c_transactions(self):
+        result = benchmark.i2c_transactions(benchmark.full_print_trace())
+
+        self.assertGreater(result['frames'], 100)
+        # a progress frame is a couple of characters: about 9 transactions
+        # per command with the stock library, and a couple of blocks batched
+        self.assertGreater(result['stock_per_frame'], 30)
+        self.assertLess(result['batched_per_frame'], 4)
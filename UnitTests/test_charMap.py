@@ -0,0 +1,48 @@
+import unittest
+
+from octoprint_adafruitlcd import charMap
+
+
+class TestCharMap(unittest.TestCase):
+
+    def setUp(self):
+        self.charmap = charMap.CharMap()
+
+    def test_ascii(self):
+        self.assertEqual(self.charmap.translate(u"Hello World! 42%"), u"Hello World! 42%")
+        self.assertEqual(self.charmap.translate("Time: 1 h,2 m"), u"Time: 1 h,2 m")
+
+        # the custom characters of the progress bar stay, control characters are blanks
+        self.assertEqual(self.charmap.translate(u"[====\x01] \t"), u"[====\x01]  ")
+
+    def test_rom(self):
+        # degree sign, umlauts, sharp s and greek letters are in the ROM
+        self.assertEqual(self.charmap.translate(u"210\u00b0C"), u"210\u00dfC")
+        self.assertEqual(self.charmap.translate(u"Gr\u00fc\u00dfe"), u"Gr\u00f5\u00e2e")
+        self.assertEqual(self.charmap.translate(u"\u03c0 \u03a9 \u00b5"), u"\u00f7 \u00f4 \u00e4")
+        # halfwidth katakana
+        self.assertEqual(self.charmap.translate(u"\uff76\uff80"), u"\u00b6\u00c0")
+
+    def test_fallbacks(self):
+        # accents are dropped
+        self.assertEqual(self.charmap.translate(u"Caf\u00e9 \u0158\u00c7"), u"Cafe RC")
+        # compatibility characters, and similar punctuation
+        self.assertEqual(self.charmap.translate(u"\uff21\ufb01 \u2013 \u201cx\u201d"), u"Afi - \"x\"")
+        # characters that the lcd can not show
+        self.assertEqual(self.charmap.translate(u"\u4e2d \U0001f600"), u"? ?")
+        # UTF-8 file names
+        self.assertEqual(self.charmap.translate(b"caf\xc3\xa9"), u"cafe")
+
+    def test_glyphs(self):
+        glyphs = dict((char, fallback) for char, pattern, fallback in self.charmap.glyphs())
+
+        translated = self.charmap.translate(u"C:\\foo~ \u00c4")
+        self.assertEqual(translated[:2], u"C:")
+        # the backslash and the tilde are the yen sign and an arrow in the ROM
+        for char in translated[2] + translated[6] + translated[8]:
+            self.assertIn(char, glyphs)
+        self.assertEqual(glyphs[translated[2]], u"/")
+        self.assertEqual(glyphs[translated[8]], u"\u00e1")
+
+        # custom characters registered with the plugin stay
+        self.assertEqual(self.charmap.translate(u"\ue000"), u"\ue000")
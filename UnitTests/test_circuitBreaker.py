@@ -0,0 +1,81 @@
+import unittest
+
+import logging
+import threading
+
+from octoprint_adafruitlcd import circuitBreaker
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger("circuitBreaker")
+        self.logger.setLevel(logging.CRITICAL)
+
+    def test_threshold(self):
+        breaker = circuitBreaker.CircuitBreaker(self.logger, 3, 60)
+
+        # a success resets the count
+        breaker.failure()
+        breaker.failure()
+        breaker.success()
+        breaker.failure()
+        breaker.failure()
+        self.assertTrue(breaker.allow())
+
+        breaker.failure()
+        self.assertTrue(breaker.is_open())
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.get_stats()['trips'], 1)
+        self.assertEqual(breaker.get_stats()['skipped'], 1)
+
+        breaker.stop(5)
+
+    def test_backoff(self):
+        breaker = circuitBreaker.CircuitBreaker(self.logger, 1, 0.01, 0.04)
+
+        probes = []
+        answers = threading.Event()
+        closed = threading.Event()
+        def probe():
+            probes.append(threading.current_thread().name)
+            if len(probes) == 5:
+                answers.set()
+            return answers.is_set()
+        breaker.set_probe(probe, closed.set)
+
+        breaker.failure()
+        self.assertTrue(closed.wait(5))
+        self.assertTrue(breaker.wait_closed(5))
+        self.assertTrue(breaker.allow())
+
+        # the display is probed off the calling thread, until it answers
+        self.assertEqual(len(probes), 5)
+        self.assertNotIn(threading.current_thread().name, probes)
+        stats = breaker.get_stats()
+        self.assertEqual(stats['probes'], 5)
+        self.assertEqual(stats['recoveries'], 1)
+
+    def test_probe_error(self):
+        breaker = circuitBreaker.CircuitBreaker(self.logger, 1, 0.01, 0.01)
+
+        probes = []
+        def probe():
+            probes.append(1)
+            if len(probes) < 3:
+                raise IOError(121, "Remote I/O error")
+            return True
+        breaker.set_probe(probe)
+
+        breaker.failure()
+        self.assertTrue(breaker.wait_closed(5))
+        self.assertEqual(len(probes), 3)
+
+    def test_stop(self):
+        breaker = circuitBreaker.CircuitBreaker(self.logger, 1, 0.01, 0.01)
+        breaker.set_probe(lambda: False)
+
+        breaker.failure()
+        breaker.stop(5)
+        self.assertTrue(breaker.is_open())
+        self.assertFalse(breaker.wait_closed(0))
@@ -66,3 +66,21 @@ class TestWrite(unittest.TestCase):
         result = lcd.getBacklight()
         self.assertEqual(result, False)
 
+    def test_stats(self):
+        lcd = self.get_lcd()
+        lcd.resetStats()
+
+        lcd.message("Hi")
+        lcd.set_cursor(0, 1)
+        lcd.clear()
+        lcd.create_char(1, [0] * 8)
+        lcd.set_backlight(True)
+
+        stats = lcd.getStats()
+        self.assertEqual(stats['write8'], 2)
+        self.assertEqual(stats['set_cursor'], 1)
+        self.assertEqual(stats['clear'], 1)
+        self.assertEqual(stats['create_char'], 1)
+        self.assertEqual(stats['set_backlight'], 1)
+        self.assertEqual(stats['bus_commands'], 2 + 1 + 1 + 9)
+        self.assertEqual(stats['bus_time_us'], 13 * 1000 + 3000)
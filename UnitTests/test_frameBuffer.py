@@ -0,0 +1,93 @@
+import unittest
+
+from octoprint_adafruitlcd import frameBuffer
+
+
+class TestFrameBuffer(unittest.TestCase):
+
+    def test_geometry(self):
+        for width, height in ((16, 2), (20, 4), (40, 2)):
+            frame = frameBuffer.FrameBuffer(width, height)
+            self.assertEqual(frame.lines(), [" " * width] * height)
+
+    def test_write(self):
+        frame = frameBuffer.FrameBuffer(20, 4)
+
+        frame.write(2, 3, "Hello")
+        self.assertEqual(frame.line(2), "   Hello            ")
+
+        # the text is cut at the end of the row
+        frame.write(3, 15, "Hello World")
+        self.assertEqual(frame.line(3), " " * 15 + "Hello")
+
+        # rows that the display does not have are dropped
+        frame.write(4, 0, "foo")
+        frame.write(0, 20, "foo")
+        self.assertEqual(frame.line(0), " " * 20)
+        self.assertEqual(len(frame.lines()), 4)
+
+    def test_fill(self):
+        frame = frameBuffer.FrameBuffer(16, 2)
+        frame.write(0, 0, "Hello World!")
+        frame.write(1, 0, "foobar")
+
+        frame.fill_row(0)
+        self.assertEqual(frame.lines(), [" " * 16, "foobar          "])
+
+        frame.fill(u'\uffff')
+        self.assertEqual(frame.lines(), [u'\uffff' * 16] * 2)
+
+    def test_copy(self):
+        frame = frameBuffer.FrameBuffer(16, 2)
+        frame.write(0, 0, "foo")
+
+        copy = frame.copy()
+        self.assertEqual(copy, frame)
+        self.assertEqual(copy.height, 2)
+
+        # the copy does not share the rows
+        frame.write(0, 0, "bar")
+        self.assertNotEqual(copy, frame)
+        self.assertEqual(copy.line(0), "foo             ")
+
+        # copying into a frame reuses its cells
+        copy.copy_from(frame)
+        self.assertEqual(copy.lines(), frame.lines())
+
+    def test_from_lines(self):
+        frame = frameBuffer.FrameBuffer.from_lines(["Hello", "World"])
+        self.assertEqual((frame.width, frame.height), (5, 2))
+        self.assertEqual(frame.text(), "HelloWorld")
+        self.assertEqual(frame.line(1, 1, 3), "or")
+
+    def test_diff(self):
+        frame = frameBuffer.FrameBuffer.from_lines(["[====\x01     ] 42%", "Hello World!    "])
+        other = frame.copy()
+        self.assertEqual(other.diff(frame, 0), [])
+
+        other.write(0, 5, "\x02")
+        other.write(0, 14, "3")
+        self.assertEqual(other.diff(frame, 0), [5, 14])
+        self.assertEqual(other.diff(frame, 1), [])
+
+        # a row that changed everywhere
+        other.write(1, 0, "abcdefghijklmnop")
+        self.assertEqual(other.diff(frame, 1), list(range(16)))
+        other.write(1, 0, "Hxlxo World!    ")
+        self.assertEqual(other.diff(frame, 1), [1, 3])
+
+        # the custom characters are not lcd characters
+        other.write(1, 15, u'\ue000')
+        self.assertEqual(other.line(1, 15), u'\ue000')
+        self.assertEqual(other.diff(frame, 1), [1, 3, 15])
+
+    def test_diff_tail(self):
+        # the columns after the last whole word of a row
+        frame = frameBuffer.FrameBuffer(10, 3)
+        other = frame.copy()
+        for column in range(10):
+            other.write(1, column, u'\u0120')
+            self.assertEqual(other.diff(frame, 1), [column])
+            self.assertEqual(other.diff(frame, 0), [])
+            self.assertEqual(other.diff(frame, 2), [])
+            other.write(1, column, u' ')
@@ -0,0 +1,89 @@
+import unittest
+
+import sys
+
+#setup the imports for the unit test
+sys.modules['Adafruit_CharLCD'] = __import__('dummyLCD')
+from octoprint_adafruitlcd import glyphAllocator
+
+import dummyLCD as LCD
+
+
+def glyph(n):
+    # a distinct pattern, and the char that stands for it
+    return unichr(0xe000 + n), [n & 0b11111] * 8
+
+
+class TestGlyphAllocator(unittest.TestCase):
+
+    def setUp(self):
+        self.lcd = LCD.Adafruit_CharLCDPlate()
+        self.glyphs = glyphAllocator.GlyphAllocator()
+        for n in range(12):
+            char, pattern = glyph(n)
+            self.glyphs.register(char, pattern)
+
+    def draw(self, chars, visible=()):
+        slots, uploads, deferred = self.glyphs.assign(chars, visible)
+        for slot, pattern in uploads + deferred:
+            self.glyphs.upload(self.lcd, slot, pattern)
+        return slots
+
+    def test_preferred_slot(self):
+        self.glyphs.register(u'\x03', [0b11100] * 8, 3)
+
+        slots = self.draw([u'\x03'])
+        self.assertEqual(slots, {u'\x03': 3})
+        self.assertEqual(self.glyphs.translate([u'[=\x03]'], slots), [u'[=\x03]'])
+
+    def test_lru(self):
+        # fill the 8 slots, then draw the first glyphs again
+        self.draw([glyph(n)[0] for n in range(8)])
+        self.draw([glyph(n)[0] for n in range(4)])
+
+        # the least recently drawn slots are replaced
+        slots = self.draw([glyph(8)[0], glyph(9)[0]])
+        self.assertEqual(sorted(slots.values()), [4, 5])
+        self.assertEqual(self.lcd.getCGRAM(4), glyph(8)[1])
+
+        # loaded glyphs keep their slot
+        slots = self.draw([glyph(0)[0], glyph(8)[0]])
+        self.assertEqual(slots, {glyph(0)[0]: 0, glyph(8)[0]: 4})
+        self.assertEqual(self.glyphs.get_stats(),
+                         dict(uploads=10, resident=6, replaced=2, deferred=0, fallbacks=0))
+
+    def test_keep_visible_slots(self):
+        self.draw([glyph(n)[0] for n in range(8)])
+
+        # slot 0 is the least recently drawn, but it is on the screen
+        self.draw([glyph(n)[0] for n in range(1, 8)])
+        slots, uploads, deferred = self.glyphs.assign([glyph(8)[0]], visible=set([0]))
+        self.assertEqual(uploads, [(1, tuple(glyph(8)[1]))])
+        self.assertEqual(deferred, [])
+
+        # every other slot is used by the frame
+        chars = [glyph(n)[0] for n in range(1, 8)] + [glyph(9)[0]]
+        slots, uploads, deferred = self.glyphs.assign(chars, visible=set([0]))
+        self.assertEqual(deferred, [(0, tuple(glyph(9)[1]))])
+        self.assertEqual(uploads, [])
+
+    def test_fallback(self):
+        self.glyphs.register(u'\ue200', [0b10101] * 8, fallback=u'*')
+        chars = [glyph(n)[0] for n in range(8)] + [u'\ue200']
+
+        slots = self.draw(chars)
+        self.assertIsNone(slots[u'\ue200'])
+        self.assertEqual(self.glyphs.translate([u'a\ue200' + glyph(2)[0]], slots), [u'a*' + unichr(slots[glyph(2)[0]])])
+
+    def test_shared_pattern(self):
+        self.glyphs.register(u'\ue200', glyph(5)[1])
+
+        slots = self.draw([glyph(5)[0], u'\ue200'])
+        self.assertEqual(slots[glyph(5)[0]], slots[u'\ue200'])
+        self.assertEqual(self.glyphs.get_stats()['uploads'], 1)
+
+    def test_invalidate(self):
+        self.draw([glyph(0)[0]])
+        self.glyphs.invalidate()
+        self.draw([glyph(0)[0]])
+        self.assertEqual(self.lcd.getStats()['create_char'], 2)
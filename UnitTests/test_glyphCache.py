@@ -0,0 +1,40 @@
+import unittest
+
+import sys
+
+#setup the imports for the unit test
+sys.modules['Adafruit_CharLCD'] = __import__('dummyLCD')
+from octoprint_adafruitlcd import glyphCache
+
+import dummyLCD as LCD
+
+
+class TestGlyphCache(unittest.TestCase):
+
+    def setUp(self):
+        self.lcd = LCD.Adafruit_CharLCDPlate()
+        self.lcd.resetStats()
+        self.glyphs = glyphCache.GlyphCache()
+
+    def test_skip_loaded(self):
+        pattern = [0, 0, 0b10000, 0, 0b10000, 0, 0, 0]
+
+        self.assertTrue(self.glyphs.load(self.lcd, 1, pattern))
+        self.assertFalse(self.glyphs.load(self.lcd, 1, list(pattern)))
+        self.assertEqual(self.lcd.getCGRAM(1), pattern)
+        self.assertEqual(self.lcd.getStats()['create_char'], 1)
+
+        # a different pattern replaces the slot
+        self.assertTrue(self.glyphs.load(self.lcd, 1, [0b11111] * 8))
+        self.assertEqual(self.lcd.getCGRAM(1), [0b11111] * 8)
+        self.assertEqual(self.glyphs.get_stats(), dict(uploads=2, skipped=1))
+
+    def test_invalidate(self):
+        pattern = [0b00100] * 8
+
+        self.glyphs.load(self.lcd, 3, pattern)
+        self.glyphs.invalidate()
+        self.assertIsNone(self.glyphs.get(3))
+
+        self.assertTrue(self.glyphs.load(self.lcd, 3, pattern))
+        self.assertEqual(self.lcd.getStats()['create_char'], 2)
@@ -0,0 +1,38 @@
+import unittest
+
+import sys
+
+#setup the imports for the unit test
+sys.modules['Adafruit_CharLCD'] = __import__('dummyLCD')
+from octoprint_adafruitlcd import lruCache
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_hits(self):
+        cache = lruCache.LRUCache(4)
+        computed = []
+
+        def compute(value):
+            computed.append(value)
+            return value * 2
+
+        self.assertEqual(cache.get(1, lambda: compute(1)), 2)
+        self.assertEqual(cache.get(1, lambda: compute(1)), 2)
+        self.assertEqual(computed, [1])
+        self.assertEqual(cache.get_stats(), dict(hits=1, misses=1, evictions=0, entries=1))
+
+    def test_eviction(self):
+        cache = lruCache.LRUCache(2)
+
+        cache.get('a', lambda: 1)
+        cache.get('b', lambda: 2)
+        # 'a' is used, so 'b' is the least recently used
+        cache.get('a', lambda: 1)
+        cache.get('c', lambda: 3)
+
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get_stats()['evictions'], 1)
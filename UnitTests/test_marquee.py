@@ -0,0 +1,66 @@
+import unittest
+
+import logging
+import threading
+
+from octoprint_adafruitlcd import marquee
+
+
+class TestMarquee(unittest.TestCase):
+
+    def test_short_text(self):
+        m = marquee.Marquee()
+        m.reset("foobar")
+        self.assertFalse(m.scrolls(16))
+        self.assertEqual(m.window(16), "foobar")
+
+    def test_scroll(self):
+        m = marquee.Marquee(gap=3, pause=2)
+        m.reset("foo_bar_cheese_grinder_v3")
+        self.assertTrue(m.scrolls(16))
+        self.assertEqual(m.window(16), "foo_bar_cheese_g")
+
+        # the start of the text is shown for a few steps
+        self.assertFalse(m.step())
+        self.assertFalse(m.step())
+        self.assertTrue(m.step())
+        self.assertEqual(m.window(16), "oo_bar_cheese_gr")
+
+        # the text loops after a gap
+        for i in range(20):
+            m.step()
+        self.assertEqual(m.window(16), "r_v3   foo_bar_c")
+        for i in range(7):
+            m.step()
+        self.assertEqual(m.window(16), "foo_bar_cheese_g")
+        self.assertFalse(m.step())
+
+    def test_reset(self):
+        m = marquee.Marquee(pause=0)
+        m.reset("foo_bar_cheese_grinder_v3")
+        m.visible = True
+        m.step()
+
+        m.reset("FooBar_cheeseGrinderv3")
+        self.assertFalse(m.visible)
+        self.assertEqual(m.window(16), "FooBar_cheeseGri")
+
+    def test_timer(self):
+        ticks = []
+        ticked = threading.Event()
+        def tick():
+            ticks.append(threading.current_thread().name)
+            if len(ticks) == 3:
+                ticked.set()
+
+        timer = marquee.MarqueeTimer(0.01, tick, logging.getLogger("marquee"))
+        timer.start()
+        # the timer only ticks while scrolling
+        self.assertFalse(ticked.wait(0.05))
+        self.assertEqual(ticks, [])
+
+        timer.scroll(True)
+        self.assertTrue(ticked.wait(5))
+        timer.stop(5)
+        self.assertFalse(timer.is_alive())
+        self.assertEqual(set(ticks), set(["AdafruitLCDMarquee"]))
@@ -0,0 +1,87 @@
+import unittest
+
+import sys
+
+#setup the imports for the unit test
+sys.modules['Adafruit_CharLCD'] = __import__('dummyLCD')
+from octoprint_adafruitlcd import mcp23017
+
+import fakeSMBus
+
+
+def decode(states):
+    return fakeSMBus.decode_hd44780(states, mcp23017.PIN_RS, mcp23017.PIN_EN,
+                                    (mcp23017.PIN_D4, mcp23017.PIN_D5, mcp23017.PIN_D6, mcp23017.PIN_D7))
+
+
+class TestMCP23017Plate(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = fakeSMBus.MCP23017()
+        self.lcd = mcp23017.MCP23017Plate(self.bus, clear_delay=0)
+
+    def test_write_table(self):
+        for rs in (False, True):
+            for value in range(256):
+                states = list(mcp23017.WRITE_TABLE[rs][value])
+                self.assertEqual(decode([0] + states), [(rs, value)])
+
+    def test_init(self):
+        # byte mode, with the registers of a port next to each other
+        self.assertEqual(self.bus.writes[0], ('IOCONA', mcp23017.IOCON_BANK | mcp23017.IOCON_SEQOP))
+        self.assertEqual(self.bus.writes[1:5], [('IODIRA', mcp23017.BUTTONS), ('GPPUA', mcp23017.BUTTONS),
+                                                ('IODIRB', 0x00), ('GPIOA', 0)])
+        self.assertEqual(decode(self.bus.port_states('GPIOB')), [
+            (False, 0x33), (False, 0x32), (False, 0x0C), (False, 0x28), (False, 0x06), (False, 0x01)])
+
+    def test_message(self):
+        self.bus.clear()
+
+        self.lcd.set_cursor(3, 1)
+        self.lcd.message("Hello World!")
+
+        self.assertEqual(decode(self.bus.port_states('GPIOB')),
+                         [(False, 0x80 | 0x43)] + [(True, ord(c)) for c in "Hello World!"])
+        # Adafruit_CharLCDPlate needs about 9 transactions per write8, 117 here
+        self.assertEqual(len(self.bus.transactions), 3)
+
+    def test_block_writes(self):
+        self.bus.clear()
+
+        self.lcd.message("The quick brown fox jumps")
+
+        # every state of a block lands on port B, and port A keeps the backlights
+        self.assertEqual(decode(self.bus.port_states('GPIOB')), [(True, ord(c)) for c in "The quick brown fox jumps"])
+        self.assertEqual(self.bus.port_states('GPIOA'), [])
+        self.assertGreater(len(self.bus.port_states('GPIOB')), mcp23017.BLOCK_SIZE)
+
+    def test_create_char(self):
+        self.bus.clear()
+
+        self.lcd.create_char(2, [0, 0, 0b11000, 0, 0b11000, 0, 0, 0])
+
+        self.assertEqual(decode(self.bus.port_states('GPIOB')),
+                         [(False, 0x40 | (2 << 3))] + [(True, r) for r in [0, 0, 0b11000, 0, 0b11000, 0, 0, 0]])
+        self.assertEqual(len(self.bus.transactions), 2)
+
+    def test_backlight(self):
+        self.bus.clear()
+
+        self.lcd.set_backlight(False)
+        self.assertEqual(self.bus.port_states('GPIOA'), [mcp23017.PIN_RED | mcp23017.PIN_GREEN])
+
+        # the blue backlight stays off while writing
+        self.lcd.message("a")
+        for state in self.bus.port_states('GPIOB'):
+            self.assertTrue(state & mcp23017.PIN_BLUE)
+
+        self.lcd.set_backlight(True)
+        self.assertEqual(self.bus.port_states('GPIOA')[-1], 0)
+        self.assertEqual(self.bus.port_states('GPIOB')[-1], 0)
+
+    def test_buttons(self):
+        self.bus.registers['GPIOA'] = 0xFF & ~(1 << 3)
+
+        self.assertTrue(self.lcd.is_pressed(3))
+        self.assertFalse(self.lcd.is_pressed(0))
+        self.assertRaises(ValueError, self.lcd.is_pressed, 7)
@@ -0,0 +1,65 @@
+import unittest
+
+import sys
+
+#setup the imports for the unit test
+sys.modules['Adafruit_CharLCD'] = __import__('dummyLCD')
+from octoprint_adafruitlcd import pcf8574
+
+import fakeSMBus
+
+
+def decode(states):
+    return fakeSMBus.decode_hd44780(states, pcf8574.PIN_RS, pcf8574.PIN_EN,
+                                    (pcf8574.PIN_D4, pcf8574.PIN_D5, pcf8574.PIN_D6, pcf8574.PIN_D7))
+
+
+class TestPCF8574Backpack(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = fakeSMBus.SMBus()
+        self.lcd = pcf8574.PCF8574Backpack(self.bus, clear_delay=0)
+
+    def test_init(self):
+        # EN is pulled low before the first command
+        self.assertEqual(self.bus.transactions[0], ('write_byte', 0x27, pcf8574.PIN_BACKLIGHT))
+        self.assertEqual(decode(self.bus.port_states()), [
+            (False, 0x33), (False, 0x32), (False, 0x0C), (False, 0x28), (False, 0x06), (False, 0x01)])
+
+    def test_message(self):
+        del self.bus.transactions[:]
+
+        self.lcd.set_cursor(0, 1)
+        self.lcd.message("Hello World!")
+
+        self.assertEqual(decode(self.bus.port_states()),
+                         [(False, 0x80 | 0x40)] + [(True, ord(c)) for c in "Hello World!"])
+        # 49 port states fit in two block writes of up to 33 states
+        self.assertEqual(len(self.bus.transactions), 3)
+
+    def test_geometry(self):
+        # the third and fourth rows continue the first two
+        for cols, offsets in ((20, [0x00, 0x40, 0x14, 0x54]), (16, [0x00, 0x40, 0x10, 0x50])):
+            lcd = pcf8574.PCF8574Backpack(self.bus, cols=cols, lines=4, clear_delay=0)
+            del self.bus.transactions[:]
+
+            for row in range(4):
+                lcd.set_cursor(1, row)
+            self.assertEqual(decode(self.bus.port_states()), [(False, 0x80 | (offset + 1)) for offset in offsets])
+
+        # a message moves to the next row on a newline
+        del self.bus.transactions[:]
+        lcd.message("a\nb\nc")
+        self.assertEqual(decode(self.bus.port_states()),
+                         [(True, ord('a')), (False, 0x80 | 0x40), (True, ord('b')), (False, 0x80 | 0x10), (True, ord('c'))])
+
+    def test_backlight(self):
+        del self.bus.transactions[:]
+
+        self.lcd.set_backlight(False)
+        self.lcd.message("a")
+        for state in self.bus.port_states():
+            self.assertFalse(state & pcf8574.PIN_BACKLIGHT)
+
+        self.lcd.set_backlight(True)
+        self.assertEqual(self.bus.port_states()[-1], pcf8574.PIN_BACKLIGHT)
@@ -5,6 +5,8 @@ import logging
 import math
 
 import threading
+import time
+import random
 
 #setup the imports for the unit test
 sys.modules['Adafruit_CharLCD'] = __import__('dummyLCD')
@@ -17,6 +19,25 @@ class printer():
     def is_printing(self):
         return True
 
+class settings():
+
+    def __init__(self, plugin, overrides):
+        # type (Adafruit_16x2_LCD, dict) -> None
+        self.values = plugin.get_settings_defaults()
+        self.values.update(overrides)
+
+    def get(self, path):
+        return self.values[path[0]]
+
+    def get_boolean(self, path):
+        return bool(self.get(path))
+
+    def get_float(self, path):
+        return float(self.get(path))
+
+    def get_int(self, path):
+        return int(self.get(path))
+
 
 class TestPlugin(unittest.TestCase):
 
@@ -25,9 +46,13 @@ class TestPlugin(unittest.TestCase):
         text = text[:16]
         return text + " " * (16 - len(text))
 
-    def getPlugin(self):
+    def getPlugin(self, wait=True, **overrides):
         plugin = adafruitLCD.Adafruit_16x2_LCD()
 
+        # draw events on the calling thread unless a test asks otherwise
+        overrides.setdefault('render_thread', False)
+        plugin._settings = settings(plugin, overrides)
+
         logging.basicConfig()
         plugin._logger = logging.getLogger("logging")
 
@@ -42,6 +67,10 @@ class TestPlugin(unittest.TestCase):
         plugin.on_startup(None, None)
         plugin.on_after_startup()
 
+        # the display is opened in the background
+        if wait:
+            self.assertTrue(plugin.wait_idle(5))
+
         return plugin
     
     
@@ -55,7 +84,7 @@ class TestPlugin(unittest.TestCase):
         return plugin._Adafruit_16x2_LCD__util
     
     def getLCDBuffer(self, plugin, row):
-        return self.getUtil(plugin)._LCDUtil__current_lcd_text[row]
+        return self.getUtil(plugin)._LCDUtil__current_lcd_text.line(row)
 
     def assertTwoLines(self, plugin, line1, line2):
         self.assertEqual(self.getLCD(plugin).getLCDText(0), line1)
@@ -199,6 +228,13 @@ class TestPlugin(unittest.TestCase):
         self.assertEqual(result, False)
         result = self.getLCD(plugin).getEnabled()
         self.assertEqual(result, False)
+
+        # the lcd answers again after a failure, and is redrawn as it was
+        plugin._Adafruit_16x2_LCD__handle_event("self_redraw", None)
+        self.assertTrue(plugin.wait_idle(5))
+
+        result = self.getLCD(plugin).getBacklight()
+        self.assertEqual(result, False)
         
 
     
@@ -224,6 +260,406 @@ class TestPlugin(unittest.TestCase):
         self.assertEqual(result, "FooBarCheeseV3")
     
 
+    def test_file_name_cache(self):
+        plugin = self.getPlugin()
+        data = self.getData(plugin)
+
+        names = ["hello_what_are_do.gcode", "06302018-print_two123.gcode", "FooBar_cheeseGrinderv3.gcode"]
+        for name in names * 3:
+            self.assertEqual(data.clean_file_name(name), data.shorten_file_name(name, 16))
+        self.assertEqual(data.file_names.get_stats(), dict(hits=6, misses=3, evictions=0, entries=3))
+
+        # the cache is keyed on the width of the lcd
+        data.lcd_width = 20
+        self.assertEqual(data.clean_file_name("asdf_FooBar_cheeseGrinder.gcode"), "AsdfFooBarCheese")
+        data.lcd_width = 10
+        self.assertEqual(data.clean_file_name("asdf_FooBar_cheeseGrinder.gcode"), "AsdfFooBar")
+        data.lcd_width = 16
+
+    def test_prewarm_file_names(self):
+        plugin = self.getPlugin()
+        data = self.getData(plugin)
+
+        plugin.on_event("Upload", {"name":"FooBar_cheeseGrinderv3.gcode", "path":"FooBar_cheeseGrinderv3.gcode", "target":"local"})
+        plugin.on_event("FileAdded", {"name":"asdf_FooBar_cheeseGrinder.stl", "path":"models/asdf_FooBar_cheeseGrinder.stl",
+                                      "storage":"local", "type":["model", "stl"]})
+        self.assertTrue(plugin.wait_idle(5))
+        self.assertEqual(data.file_names.get_stats(), dict(hits=0, misses=2, evictions=0, entries=2))
+
+        # the file events are not drawn
+        self.assertEqual(self.getLCDBuffer(plugin, 0), self.getLCDText("Hello! What will"))
+
+        # drawing the print is a cache lookup
+        plugin.on_event("PrintStarted", {"name":"FooBar_cheeseGrinderv3.gcode"})
+        plugin.on_event("SlicingStarted", {"stl":"asdf_FooBar_cheeseGrinder.stl", "progressAvailable":True})
+        self.assertEqual(data.file_names.get_stats()['misses'], 2)
+        self.assertEqual(self.getLCDBuffer(plugin, 1), self.getLCDText("AsdfFooBarCheese"))
+
+        plugin = self.getPlugin(prewarm_file_names=False)
+        plugin.on_event("Upload", {"name":"FooBar_cheeseGrinderv3.gcode"})
+        self.assertEqual(self.getData(plugin).file_names.get_stats(), dict(hits=0, misses=0, evictions=0, entries=0))
+
+    def test_custom_characters(self):
+        plugin = self.getPlugin()
+        lcd = self.getLCD(plugin)
+        lcd.resetStats()
+
+        plugin.on_event("PrintStarted", {"name":"foobar"})
+        self.assertEqual(lcd.getStats()['create_char'], 4)
+        self.assertEqual(lcd.getCGRAM(1), [0, 0, 0b10000, 0, 0b10000, 0, 0, 0])
+
+        # the progress bar is already loaded for the next print
+        plugin.on_event("PrintDone", {"time":50})
+        plugin.on_event("PrintStarted", {"name":"foobar"})
+        plugin.on_print_progress(None, None, 43)
+        self.assertEqual(lcd.getStats()['create_char'], 4)
+        self.assertEqual(self.getLCDBuffer(plugin, 1), self.getLCDText(u"[====\x01     ] 43%"))
+
+        self.getUtil(plugin).reset_glyphs()
+        plugin.on_event("PrintStarted", {"name":"foobar"})
+        self.assertEqual(lcd.getStats()['create_char'], 8)
+        self.assertEqual(self.getUtil(plugin).get_glyph_stats(), dict(uploads=8, resident=5, replaced=0, deferred=0, fallbacks=0))
+
+    def test_glyph_slots(self):
+        plugin = self.getPlugin()
+        util = self.getUtil(plugin)
+        lcd = self.getLCD(plugin)
+
+        patterns = dict()
+        for n in range(10):
+            char = unichr(0xe000 + n)
+            patterns[char] = [n + 1] * 8
+            util.register_glyph(char, patterns[char])
+
+        # a slot is never redefined while the lcd shows it
+        create_char = lcd.create_char
+        def checked(location, pattern):
+            for row in range(2):
+                self.assertNotIn(unichr(location), lcd.getLCDText(row))
+            create_char(location, pattern)
+        lcd.create_char = checked
+
+        random.seed(3)
+        for i in range(50):
+            chars = random.sample(sorted(patterns), 6)
+            with util.frame():
+                util.write_to_lcd(u"".join(chars[:3]), 0)
+                util.write_to_lcd(u"".join(chars[3:]), 1)
+
+            # every glyph is shown with its own pattern
+            for row in range(2):
+                for col, char in enumerate(chars[row * 3:row * 3 + 3]):
+                    self.assertEqual(lcd.getCGRAM(ord(lcd.getLCDText(row)[col])), patterns[char])
+
+        # some frames had to replace a slot that was on the screen
+        self.assertGreater(util.get_glyph_stats()['deferred'], 0)
+
+    def test_backends(self):
+        plugin = self.getPlugin(backend='virtual')
+        lcd = self.getLCD(plugin)
+
+        plugin.on_event("PrintStarted", {"name":"foobar"})
+        plugin.on_print_progress(None, None, 43)
+        self.assertEqual(lcd.get_text(0), self.getLCDText("foobar"))
+        self.assertEqual(lcd.get_text(1), self.getLCDText(u"[====\x01     ] 43%"))
+        self.assertEqual(lcd.get_cgram(1), [0, 0, 0b10000, 0, 0b10000, 0, 0, 0])
+
+        # a display that can not be opened is replaced with a virtual
+        # display, while it is probed in the background
+        logging.disable(logging.ERROR)
+        try:
+            plugin = self.getPlugin(backend='pcf8574', backend_options=dict(bus=None, busnum=-1),
+                                    bus_retry_interval=60)
+        finally:
+            logging.disable(logging.NOTSET)
+        plugin.on_event("Connected", None)
+        self.assertIsInstance(self.getLCD(plugin), adafruitLCD.virtualLCD.VirtualLCD)
+        self.assertEqual(self.getUtil(plugin).get_bus_stats()['trips'], 1)
+        plugin.on_shutdown()
+
+    def test_open_later(self):
+        state = dict(plugged=False)
+
+        class UnpluggedBackend(adafruitLCD.backends.VirtualBackend):
+            def create(self, cols, lines):
+                if not state['plugged']:
+                    raise IOError(2, "No such file or directory")
+                return super(UnpluggedBackend, self).create(cols, lines)
+
+        adafruitLCD.backends.BACKENDS['unplugged'] = UnpluggedBackend
+        logging.disable(logging.CRITICAL)
+        try:
+            plugin = self.getPlugin(backend='unplugged', bus_retry_interval=0.01, bus_retry_max_interval=0.02)
+            fallback = self.getLCD(plugin)
+            util = self.getUtil(plugin)
+
+            plugin.on_event("PrintStarted", {"name":"foobar"})
+            plugin.on_print_progress(None, None, 43)
+
+            # the display is opened once it is plugged in, and shows the latest frame
+            state['plugged'] = True
+            for i in range(500):
+                if util.get_bus_stats()['recoveries'] == 1:
+                    break
+                time.sleep(0.01)
+            self.assertTrue(plugin.wait_idle(5))
+        finally:
+            logging.disable(logging.NOTSET)
+            del adafruitLCD.backends.BACKENDS['unplugged']
+
+        lcd = self.getLCD(plugin)
+        self.assertIsNot(lcd, fallback)
+        self.assertEqual(lcd.get_text(0), self.getLCDText("foobar"))
+        self.assertEqual(lcd.get_text(1), self.getLCDText(u"[====\x01     ] 43%"))
+        self.assertEqual(lcd.get_cgram(1), [0, 0, 0b10000, 0, 0b10000, 0, 0, 0])
+        plugin.on_shutdown()
+
+    def test_charset(self):
+        plugin = self.getPlugin(backend='virtual')
+        lcd = self.getLCD(plugin)
+        util = self.getUtil(plugin)
+
+        util.write_to_lcd(u"Nozzle 210\u00b0C", 0)
+        util.write_to_lcd(u"\u00c4rger\\B\u00e9b\u00e9", 1)
+        # the degree sign is in the ROM, the accents are dropped
+        self.assertEqual(lcd.get_text(0), u"Nozzle 210\u00dfC    ")
+        text = lcd.get_text(1)
+        self.assertEqual(text[1:5] + text[6:], u"rgerBebe      ")
+        # the capital umlaut and the backslash are custom characters
+        self.assertEqual(lcd.get_cgram(ord(text[0]))[0], 0b01010)
+        self.assertEqual(lcd.get_cgram(ord(text[5]))[1], 0b10000)
+
+    def test_geometry(self):
+        plugin = self.getPlugin(backend='virtual', lcd_width=20, lcd_height=4)
+        lcd = self.getLCD(plugin)
+
+        plugin.on_event("PrintStarted", {"name":"foo_bar_2018-06-24_v2.gcode"})
+        plugin.on_print_progress(None, None, 50)
+        self.assertEqual(lcd.get_text(0), "FooBar20180624V2    ")
+        # the progress bar fills the width of the display
+        self.assertEqual(lcd.get_text(1), "[=======       ] 50%")
+        self.assertEqual(lcd.get_text(3), " " * 20)
+
+        plugin.on_event("Error", {"error":"Thermal runaway in the hotend"})
+        self.assertEqual(lcd.get_text(0), "Error               ")
+        # file names and messages are shortened to the width of the display
+        self.assertGreater(len(lcd.get_text(1).rstrip()), 16)
+
+    def test_marquee(self):
+        # the steps are queued by hand
+        plugin = self.getPlugin(marquee_file_names=True, marquee_interval=60)
+        lcd = self.getLCD(plugin)
+
+        plugin.on_event("PrintStarted", {"name":"foo_bar_cheese_grinder_v3.gcode"})
+        # nothing scrolls before the progress is shown
+        plugin.on_event("self_marquee", None)
+        self.assertEqual(lcd.getLCDText(1), self.getLCDText("FooBarCheeseV3"))
+
+        plugin.on_print_progress(None, None, 43)
+        self.assertTwoLines(plugin, "foo_bar_cheese_g", u"[====\x01     ] 43%")
+
+        # the start of the name is shown for a few steps
+        for i in range(5):
+            plugin.on_event("self_marquee", None)
+        self.assertEqual(lcd.getLCDText(0), "oo_bar_cheese_gr")
+
+        # a step only redraws the name, and the progress keeps its place
+        lcd.resetStats()
+        plugin.on_event("self_marquee", None)
+        plugin.on_print_progress(None, None, 44)
+        self.assertTwoLines(plugin, "o_bar_cheese_gri", u"[====\x02     ] 44%")
+        self.assertLessEqual(lcd.getStats()['write8'], 16 + 2)
+
+        # the other events are not scrolled over
+        plugin.on_event("PrintPaused", None)
+        plugin.on_event("self_marquee", None)
+        self.assertEqual(lcd.getLCDText(0), self.getLCDText("PrintPaused"))
+        plugin.on_shutdown()
+
+    def test_marquee_logging(self):
+        plugin = self.getPlugin(marquee_file_names=True, marquee_interval=60)
+        plugin.on_event("PrintStarted", {"name":"foo_bar_cheese_grinder_v3.gcode"})
+        plugin.on_print_progress(None, None, 43)
+
+        records = []
+        class Handler(logging.Handler):
+            def emit(self, record):
+                records.append(record)
+        handler = Handler()
+        plugin._logger.addHandler(handler)
+        plugin._logger.setLevel(logging.DEBUG)
+        plugin._logger.propagate = False
+        try:
+            for i in range(10):
+                plugin.on_event("self_marquee", None)
+        finally:
+            plugin._logger.removeHandler(handler)
+            plugin._logger.setLevel(logging.ERROR)
+            plugin._logger.propagate = True
+
+        # the steps are only logged at debug
+        self.assertGreater(len(records), 0)
+        self.assertEqual([r.getMessage() for r in records if r.levelno > logging.DEBUG], [])
+        plugin.on_shutdown()
+
+    def test_marquee_timer(self):
+        plugin = self.getPlugin(marquee_file_names=True, marquee_interval=0.01, render_thread=True)
+        lcd = self.getLCD(plugin)
+
+        plugin.on_event("PrintStarted", {"name":"foo_bar_cheese_grinder_v3.gcode"})
+        plugin.on_print_progress(None, None, 43)
+        for i in range(500):
+            if lcd.getLCDText(0) != "foo_bar_cheese_g":
+                break
+            time.sleep(0.01)
+        self.assertNotEqual(lcd.getLCDText(0), "foo_bar_cheese_g")
+
+        plugin.on_event("PrintDone", {"time":50})
+        self.assertTrue(plugin.wait_idle(5))
+        self.assertEqual(lcd.getLCDText(0), self.getLCDText("PrintDone"))
+        plugin.on_shutdown()
+
+    def test_open_in_background(self):
+        opening = threading.Event()
+        release = threading.Event()
+
+        class SlowBackend(adafruitLCD.backends.VirtualBackend):
+            def create(self, cols, lines):
+                opening.set()
+                release.wait(5)
+                return super(SlowBackend, self).create(cols, lines)
+
+        adafruitLCD.backends.BACKENDS['slow'] = SlowBackend
+        try:
+            plugin = self.getPlugin(wait=False, backend='slow')
+            self.assertTrue(opening.wait(5))
+            self.assertIsNone(self.getLCD(plugin))
+
+            # events are queued while the display is opening
+            plugin.on_event("PrintStarted", {"name":"foobar"})
+            plugin.on_print_progress(None, None, 43)
+            self.assertIsNone(self.getLCD(plugin))
+            self.assertFalse(plugin.wait_idle(0.01))
+
+            release.set()
+            self.assertTrue(plugin.wait_idle(5))
+        finally:
+            release.set()
+            del adafruitLCD.backends.BACKENDS['slow']
+
+        lcd = self.getLCD(plugin)
+        self.assertEqual(lcd.get_text(0), self.getLCDText("foobar"))
+        self.assertEqual(lcd.get_text(1), self.getLCDText(u"[====\x01     ] 43%"))
+
+        stats = plugin.get_startup_stats()
+        self.assertLess(stats['startup_ms'], stats['open_ms'])
+
+    def test_bus_failure(self):
+        state = dict(broken=False, commands=0)
+
+        class FlakyLCD(adafruitLCD.virtualLCD.VirtualLCD):
+            pass
+
+        def flaky(command):
+            def send(self, *args):
+                state['commands'] += 1
+                if state['broken']:
+                    raise IOError(121, "Remote I/O error")
+                return command(self, *args)
+            return send
+
+        for name in ('clear', 'set_cursor', 'message', 'create_char', 'set_backlight', 'enable_display'):
+            setattr(FlakyLCD, name, flaky(getattr(adafruitLCD.virtualLCD.VirtualLCD, name)))
+
+        class FlakyBackend(adafruitLCD.backends.VirtualBackend):
+            def create(self, cols, lines):
+                if state['broken']:
+                    raise IOError(121, "Remote I/O error")
+                return FlakyLCD(cols, lines)
+
+        adafruitLCD.backends.BACKENDS['flaky'] = FlakyBackend
+        try:
+            plugin = self.getPlugin(backend='flaky', bus_retry_interval=0.01, bus_retry_max_interval=0.02)
+        finally:
+            del adafruitLCD.backends.BACKENDS['flaky']
+        util = self.getUtil(plugin)
+
+        plugin.on_event("PrintStarted", {"name":"foobar"})
+        plugin.on_print_progress(None, None, 10)
+
+        # the errors do not reach OctoPrint, and the bus is left alone after 3 failures
+        logging.disable(logging.CRITICAL)
+        try:
+            state['broken'] = True
+            state['commands'] = 0
+            for i in range(11, 20):
+                plugin.on_print_progress(None, None, i)
+            stats = util.get_bus_stats()
+            self.assertEqual(stats['failures'], 3)
+            self.assertEqual(stats['trips'], 1)
+            self.assertLessEqual(state['commands'], 3)
+
+            # the latest frame is drawn once the lcd answers again
+            plugin.on_print_progress(None, None, 43)
+            state['broken'] = False
+            for i in range(500):
+                if util.get_bus_stats()['recoveries'] == 1:
+                    break
+                time.sleep(0.01)
+            self.assertTrue(plugin.wait_idle(5))
+        finally:
+            logging.disable(logging.NOTSET)
+
+        lcd = self.getLCD(plugin)
+        self.assertIsInstance(lcd, FlakyLCD)
+        self.assertEqual(lcd.get_text(0), self.getLCDText("foobar"))
+        self.assertEqual(lcd.get_text(1), self.getLCDText(u"[====\x01     ] 43%"))
+        self.assertEqual(lcd.get_cgram(1), [0, 0, 0b10000, 0, 0b10000, 0, 0, 0])
+
+        plugin.on_shutdown()
+
+    def test_lazy_logging(self):
+        plugin = self.getPlugin()
+        data = self.getData(plugin)
+
+        self.assertEqual(data.special_chars_to_num(u"[==\x02\x00  ] 24%"), u"[==#2#0  ] 24%")
+        self.assertEqual(str(data.printable("foo\x07")), "foo#7")
+
+        conversions = []
+        special_chars_to_num = data.special_chars_to_num
+        def counted(string):
+            conversions.append(string)
+            return special_chars_to_num(string)
+        data.special_chars_to_num = counted
+        printables = []
+        printable = data.printable
+        def counted_printable(string):
+            printables.append(string)
+            return printable(string)
+        data.printable = counted_printable
+
+        # at error level, nothing is converted for the log, or even wrapped
+        plugin.on_event("PrintStarted", {"name":"foobar"})
+        plugin.on_print_progress(None, None, 42)
+        self.assertEqual(conversions, [])
+        self.assertEqual(printables, [])
+
+        # at debug level, the messages are converted as they are logged
+        messages = []
+        handler = logging.Handler()
+        handler.emit = lambda record: messages.append(record.getMessage())
+        plugin._logger.setLevel(logging.DEBUG)
+        plugin._logger.propagate = False
+        plugin._logger.addHandler(handler)
+        try:
+            plugin.on_print_progress(None, None, 43)
+        finally:
+            plugin._logger.setLevel(logging.ERROR)
+            plugin._logger.propagate = True
+            plugin._logger.removeHandler(handler)
+        self.assertIn(u"[====\x01     ] 43%", conversions)
+        self.assertIn(u"Writing to LCD: [====#1     ] 43%", messages)
+
     def test_asynchronous_events(self):
         plugin = self.getPlugin()
 
@@ -237,8 +673,297 @@ class TestPlugin(unittest.TestCase):
 
         self.assertTwoLines(plugin, self.getLCDText("FooBarCheeseV2"), "[==\x02       ] 24%")
 
+    def test_render_thread(self):
+        plugin = self.getPlugin(render_thread=True)
 
+        plugin.on_event("PrintStarted", {"name":"foo_bar_2018-06-24_v2.gcode"})
+        plugin.on_print_progress(None, None, 37)
+        self.assertTrue(plugin.wait_idle(5))
+
+        self.assertTwoLines(plugin, "FooBar20180624V2", self.getLCDText("[===\x03      ] 37%"))
+
+        plugin.on_shutdown()
+        self.assertEqual(self.getLCD(plugin).getEnabled(), False)
+
+    def test_render_thread_latency(self):
+        events = [
+            ("Connected", None),
+            ("PrintStarted", {"name":"foo_bar_2018-06-24_v2.gcode"}),
+            ("self_progress", {"progress":42, "name":"FooBar20180624V2"}),
+            ("Error", {"error":"could not connect"})
+        ]
+
+        def latency(plugin):
+            # time how long on_event takes to return for each event
+            times = []
+            for event, payload in events:
+                start = time.time()
+                plugin.on_event(event, payload)
+                times.append(time.time() - start)
+            plugin.wait_idle(5)
+            return max(times)
+
+        def realtime_plugin(**overrides):
+            # let the dummy lcd take as long as a real one
+            plugin = self.getPlugin(**overrides)
+            self.getLCD(plugin).realtime = True
+            return plugin
+
+        inline = latency(realtime_plugin())
+        plugin = realtime_plugin(render_thread=True)
+        threaded = latency(plugin)
+        plugin.on_shutdown()
+
+        logging.getLogger("logging").info("on_event latency: inline %.2f ms, render thread %.2f ms",
+            inline * 1000, threaded * 1000)
+
+        # every event writes at least 9 characters at 1 ms each on the dummy lcd
+        self.assertGreater(inline, 0.009)
+        self.assertLess(threaded, inline / 2)
+        self.assertTwoLines(plugin, self.getLCDText("Error"), self.getLCDText("CouldNotConnect"))
+
+    def test_coalesce_progress(self):
+        plugin = self.getPlugin(render_thread=True)
+        self.getLCD(plugin).realtime = True
+
+        plugin.on_event("SlicingStarted", {"stl": "foo_bar_v4.stl", "progressAvailable":True})
+        for i in range(1, 100):
+            plugin.on_slicing_progress("foo", "bar", "fee", "fi", "fo", i)
+        self.assertTrue(plugin.wait_idle(5))
+
+        # the render thread can not keep up with the slicer, so most progress updates are dropped
+        stats = plugin._Adafruit_16x2_LCD__synchronous_events.get_stats()
+        # the startup message, and the slicing events
+        self.assertEqual(stats['queued'], 1 + 100)
+        self.assertGreater(stats['coalesced'], 50)
+        self.assertTwoLines(plugin, self.getLCDText("foo_bar_v4.stl"), self.getLCDText("[=========\x04] 99%"))
+
+        plugin.on_shutdown()
+
+    def test_event_cost(self):
+        plugin = self.getPlugin()
+        lcd = self.getLCD(plugin)
+
+        def cost(event, payload):
+            lcd.resetStats()
+            plugin.on_event(event, payload)
+            return lcd.getStats()
+
+        stats = cost("Connected", None)
+        # clear, which leaves the cursor home, "Connected"
+        self.assertEqual(stats['clear'], 1)
+        self.assertEqual(stats['write8'], 9)
+        self.assertEqual(stats['bus_commands'], 1 + 9)
+        self.assertEqual(stats['bus_time_us'], 10 * 1000 + 3000)
+
+        # an error that follows an error only rewrites the message
+        cost("Error", {"error":"Thermal runaway 1"})
+        stats = cost("Error", {"error":"Thermal runaway 2"})
+        self.assertNotIn('clear', stats)
+        self.assertEqual(stats['write8'], 1)
+        self.assertEqual(stats['bus_commands'], 2)
+
+        stats = cost("PrintStarted", {"name":"foobar"})
+        self.assertEqual(stats['create_char'], 4)
+        self.assertEqual(stats['write8'], 18)
+        self.assertEqual(stats['bus_commands'], 4 * 9 + 2 + 18)
+
+        # a progress update only redraws the changed characters
+        cost("self_progress", {"progress":42})
+        stats = cost("self_progress", {"progress":45})
+        self.assertEqual(stats['write8'], 2)
+        self.assertEqual(stats['set_cursor'], 2)
+        self.assertEqual(stats['bus_time_us'], 4 * 1000)
+
+    def test_render_stats(self):
+        plugin = self.getPlugin()
+
+        plugin.on_event("Connected", None)
+        plugin.on_event("PrintStarted", {"name":"foobar"})
+        for i in range(1, 100):
+            plugin.on_print_progress(None, None, i)
+        plugin.on_event("PrintDone", {"time":123456})
+
+        stats = self.getUtil(plugin).get_render_stats()
+        # one frame per event, including the startup message
+        self.assertEqual(stats['frames'], 103)
+        # drawing whole frames never needs more commands than drawing row by row
+        self.assertLessEqual(stats['commands'], stats['row_by_row_commands'])
+
+    def test_frame_limit(self):
+        plugin = self.getPlugin(max_fps=8)
+        events = plugin._Adafruit_16x2_LCD__events
+        dispatcher = plugin._Adafruit_16x2_LCD__dispatcher
+
+        # the limiter runs on a fake clock, and the held frames are drawn
+        # when the test moves the clock past the delay they asked for.  The
+        # times are powers of two, so that they add up exactly
+        clock = dict(now=1024.0)
+        dispatcher._EventDispatcher__limiter.clock = lambda: clock['now']
+        timers = []
+        dispatcher.set_scheduler(lambda delay: timers.append(clock['now'] + delay))
+        def advance(seconds):
+            end = clock['now'] + seconds
+            while len(timers) > 0 and min(timers) <= end:
+                clock['now'] = min(timers)
+                timers[:] = [t for t in timers if t > clock['now']]
+                dispatcher.drain()
+            clock['now'] = end
 
+        plugin.on_event("PrintStarted", {"name":"foobar"})
+
+        # record every progress frame that is drawn
+        frames = []
+        on_progress_event = events.on_progress_event
+        def watched_progress(event, data):
+            on_progress_event(event, data)
+            frames.append((clock['now'], data['progress']))
+        events.on_progress_event = watched_progress
+
+        start = clock['now']
+        for i in range(1, 100):
+            plugin.on_print_progress(None, None, i)
+            advance(1.0 / 128)
+        advance(0.125)
+
+        # the latest progress is always drawn
+        self.assertTwoLines(plugin, self.getLCDText("foobar"), self.getLCDText("[=========\x04] 99%"))
+
+        # ~0.8 seconds of progress at 8 fps: a frame every 16 progress
+        # updates, the first one 0.125 seconds after PrintStarted, and the
+        # one that was held back
+        self.assertEqual(frames, [(start + 0.125 * (i + 1), 16 * (i + 1)) for i in range(6)] + [(start + 0.875, 99)])
+
+        # state changes are never held back, and drop the held progress
+        plugin.on_print_progress(None, None, 50)
+        self.assertEqual(len(timers), 1)
+        plugin.on_event("PrintPaused", None)
+        self.assertTwoLines(plugin, self.getLCDText("PrintPaused"), self.getLCDText("[=========\x04] 99%"))
+        advance(1)
+        self.assertEqual(len(frames), 7)
+        self.assertTrue(dispatcher.empty())
+
+    def test_shutdown_while_drawing(self):
+        plugin = self.getPlugin(render_thread=True)
+        events = plugin._Adafruit_16x2_LCD__events
+        worker = plugin._Adafruit_16x2_LCD__worker
+
+        # an event that takes longer to draw than the worker is given to stop
+        drawing = threading.Event()
+        release = threading.Event()
+        on_connect_event = events.on_connect_event
+        def slow_connect(event, data):
+            drawing.set()
+            release.wait(5)
+            on_connect_event(event, data)
+        events.on_connect_event = slow_connect
+        stop = worker.stop
+        worker.stop = lambda timeout=None: stop(0.1)
+
+        plugin.on_event("Connected", None)
+        self.assertTrue(drawing.wait(5))
+        logging.disable(logging.CRITICAL)
+        try:
+            plugin.on_shutdown()
+        finally:
+            logging.disable(logging.NOTSET)
+
+        # the lcd is left on rather than written to while the worker draws
+        self.assertTrue(self.getLCD(plugin).getBacklight())
+        self.assertTrue(self.getLCD(plugin).getEnabled())
+        release.set()
+        worker.join(5)
+        self.assertTwoLines(plugin, self.getLCDText("Connected"), self.getLCDText(""))
+
+    def test_frame_limit_inline(self):
+        plugin = self.getPlugin(min_redraw_interval=0.2)
+
+        plugin.on_event("PrintStarted", {"name":"foobar"})
+        plugin.on_print_progress(None, None, 10)
+        plugin.on_print_progress(None, None, 20)
+
+        # the progress is held until the interval expires, then drawn by a timer
+        self.assertTwoLines(plugin, self.getLCDText("PrintStarted"), self.getLCDText("foobar"))
+        time.sleep(0.5)
+        self.assertTwoLines(plugin, self.getLCDText("foobar"), self.getLCDText("[==        ] 20%"))
+
+    def test_frame_limit_inline_reschedule(self):
+        plugin = self.getPlugin(min_redraw_interval=0.2)
+
+        plugin.on_event("PrintStarted", {"name":"foobar"})
+        plugin.on_print_progress(None, None, 10)
+        plugin.on_print_progress(None, None, 20)
+        # the pause draws the held progress, before the timer expires
+        time.sleep(0.1)
+        plugin.on_event("PrintPaused", None)
+        plugin.on_print_progress(None, None, 30)
+
+        # the timer expires while the next progress has to be held again,
+        # and starts a timer for it
+        time.sleep(1.5)
+        self.assertTwoLines(plugin, self.getLCDText("foobar"), self.getLCDText("[===       ] 30%"))
+        self.assertTrue(plugin._Adafruit_16x2_LCD__dispatcher.empty())
+
+    def test_concurrent_events(self):
+        plugin = self.getPlugin()
+        util = self.getUtil(plugin)
+
+        # watch every write to the lcd for overlapping writes and for stack growth
+        state = {'writing': 0, 'overlaps': 0, 'depth': 0}
+        lock = threading.Lock()
+        write_to_lcd = util.write_to_lcd
+
+        def stack_depth():
+            frame = sys._getframe()
+            depth = 0
+            while frame is not None:
+                depth += 1
+                frame = frame.f_back
+            return depth
+
+        def watched_write(*args, **kwargs):
+            with lock:
+                state['writing'] += 1
+                if state['writing'] > 1:
+                    state['overlaps'] += 1
+                state['depth'] = max(state['depth'], stack_depth())
+            try:
+                write_to_lcd(*args, **kwargs)
+            finally:
+                with lock:
+                    state['writing'] -= 1
+
+        util.write_to_lcd = watched_write
+
+        plugin.on_event("PrintStarted", {"name":"foobar"})
+        single_depth = state['depth']
+
+        def fire(seed):
+            rand = random.Random(seed)
+            for i in range(200):
+                if rand.random() < 0.05:
+                    plugin.on_event("PrintPaused", None)
+                else:
+                    plugin.on_print_progress(None, None, rand.randint(1, 99))
+
+        threads = [threading.Thread(target=fire, args=(i,)) for i in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(state['overlaps'], 0)
+        # the events are drawn in a loop, so the stack does not grow with the backlog
+        self.assertLessEqual(state['depth'], single_depth + 2)
+
+        # everything has been drawn, and the lcd matches the plugin's buffer
+        queue = plugin._Adafruit_16x2_LCD__synchronous_events
+        self.assertTrue(queue.empty())
+        self.assertEqual(queue.get_stats()['queued'], 1 + 16 * 200 + 1)
+        for row in range(2):
+            self.assertEqual(self.getLCD(plugin).getLCDText(row), self.getLCDBuffer(plugin, row))
+        self.assertIn(self.getLCD(plugin).getLCDText(0), [self.getLCDText("foobar"), self.getLCDText("PrintPaused")])
+        self.assertRegexpMatches(self.getLCD(plugin).getLCDText(1), r"^\[[=\x01-\x04 ]{10}\] \d\d?%\s*$")
 
         
 class EventThread(threading.Thread):
@@ -0,0 +1,53 @@
+import unittest
+
+import sys
+
+#setup the imports for the unit test
+sys.modules['Adafruit_CharLCD'] = __import__('dummyLCD')
+from octoprint_adafruitlcd import progressBar
+
+GLYPHS = (' ', u'\x01', u'\x02', u'\x03', u'\x04', '=')
+
+
+def switcher_line(progress):
+    # the progress bar as Events used to build it
+    switcher = {0: ' ', 1: u'\x01', 2: u'\x02', 3: u'\x03', 4: u'\x04', 5: '='}
+    bar = '=' * (progress // 10)
+    bar += switcher[(progress % 10) // 2]
+    bar += ' ' * (10 - len(bar))
+    return u"[{}] {}%".format(bar, progress)
+
+
+class TestProgressBarTable(unittest.TestCase):
+
+    def test_lines(self):
+        table = progressBar.ProgressBarTable(GLYPHS)
+
+        for progress in range(100):
+            self.assertEqual(table.line(progress), switcher_line(progress))
+        self.assertEqual(table.line(100), u"[==========] 100%")
+
+        # out of range progress is clamped
+        self.assertEqual(table.line(-3), table.line(0))
+        self.assertEqual(table.line(250), table.line(100))
+
+    def test_bar_length(self):
+        self.assertEqual(progressBar.bar_length(16), 10)
+        self.assertEqual(progressBar.bar_length(20), 14)
+
+        table = progressBar.get_table(GLYPHS, progressBar.bar_length(20))
+        for progress in range(100):
+            self.assertLessEqual(len(table.line(progress)), 20)
+        self.assertEqual(table.line(50), u"[=======       ] 50%")
+        self.assertEqual(table.line(55), u"[=======\x03      ] 55%")
+
+        # the tables are only computed once
+        self.assertIs(progressBar.get_table(GLYPHS, 14), table)
+        self.assertIsNot(progressBar.get_table(GLYPHS, 10), table)
+
+    def test_glyphs(self):
+        table = progressBar.ProgressBarTable(('-', '#'), 4)
+
+        self.assertEqual(table.line(0), u"[----] 0%")
+        self.assertEqual(table.line(49), u"[#---] 49%")
+        self.assertEqual(table.line(50), u"[##--] 50%")
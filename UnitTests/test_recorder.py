@@ -0,0 +1,70 @@
+import unittest
+
+import os
+import shutil
+import tempfile
+import time
+
+import benchmark
+from octoprint_adafruitlcd import recorder
+
+
+class TestRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def getScreen(self, plugin):
+        lcd = benchmark.get_lcd(plugin)
+        return [lcd.getLCDText(0), lcd.getLCDText(1)]
+
+    def record(self, path, trace):
+        plugin = benchmark.get_plugin(record_events=path)
+        for step in trace:
+            recorder.play_step(plugin, step)
+        screen = self.getScreen(plugin)
+        plugin.on_shutdown()
+        return screen
+
+    def test_record_and_replay(self):
+        path = os.path.join(self.dir, "trace.jsonl")
+        trace = benchmark.slice_then_print_trace()
+        # events that are not drawn are recorded as well
+        trace.insert(1, ('event', "FileAdded", {"name":"foo.stl", "type":["model", "stl"]}))
+
+        screen = self.record(path, trace)
+
+        recorded = recorder.load_trace(path)
+        self.assertEqual([step for t, step in recorded], [tuple(step) for step in trace])
+        times = [t for t, step in recorded]
+        self.assertEqual(times, sorted(times))
+
+        # replaying the trace draws the same screen
+        plugin = benchmark.get_plugin()
+        recorder.replay(plugin, recorded)
+        self.assertEqual(self.getScreen(plugin)[0], screen[0])
+
+    def test_compressed(self):
+        path = os.path.join(self.dir, "trace.jsonl.gz")
+        trace = benchmark.error_storm_trace(20)
+
+        self.record(path, trace)
+
+        self.assertEqual([step for t, step in recorder.load_trace(path)], [tuple(step) for step in trace])
+
+    def test_recorded_speed(self):
+        trace = [
+            (0, ('event', "Connected", None)),
+            (0.2, ('event', "PrintStarted", {"name":"foobar"})),
+            (0.4, ('print_progress', 10))
+        ]
+
+        plugin = benchmark.get_plugin()
+        start = time.time()
+        recorder.replay(plugin, trace, speed=2)
+        self.assertGreaterEqual(time.time() - start, 0.2)
+
+        self.assertEqual(self.getScreen(plugin)[0], "foobar          ")
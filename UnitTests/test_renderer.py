@@ -0,0 +1,85 @@
+import unittest
+
+import sys
+
+#setup the imports for the unit test
+sys.modules['Adafruit_CharLCD'] = __import__('dummyLCD')
+from octoprint_adafruitlcd import renderer
+
+
+class TestFrameRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.renderer = renderer.FrameRenderer()
+
+    def test_no_change(self):
+        frame = ["Hello World!    ", "                "]
+        self.assertEqual(self.renderer.plan(frame, list(frame)), [])
+
+    def test_bridge_small_gaps(self):
+        current = ["[====\x01     ] 42%", "                "]
+        desired = ["[====\x02     ] 43%", "                "]
+
+        runs = self.renderer.plan(current, desired)
+
+        # moving the cursor over the 9 unchanged characters is cheaper
+        self.assertEqual(runs, [(5, 0, "\x02", True), (14, 0, "3", True)])
+
+        current = ["abcdefgh        ", "                "]
+        desired = ["aBcDeFgh        ", "                "]
+
+        runs = self.renderer.plan(current, desired)
+
+        # rewriting c and e is as cheap as moving the cursor over them
+        self.assertEqual(runs, [(1, 0, "BcDeF", True)])
+        self.assertEqual(self.renderer.commands(runs), 6)
+        self.assertEqual(self.renderer.row_by_row_commands(current, desired), 6)
+
+    def test_cost_model(self):
+        current = ["abcdefgh        ", "                "]
+        desired = ["aBcdEfgh        ", "                "]
+
+        # a cursor move costs the same as writing three characters
+        expensive_cursor = renderer.FrameRenderer(cursor_cost=3, char_cost=1)
+        runs = expensive_cursor.plan(current, desired)
+        self.assertEqual(runs, [(1, 0, "BcdE", True)])
+        self.assertEqual(expensive_cursor.cost(runs), 7)
+
+        runs = self.renderer.plan(current, desired)
+        self.assertEqual(runs, [(1, 0, "B", True), (4, 0, "E", True)])
+        self.assertEqual(self.renderer.cost(runs), 4)
+
+    def test_cursor(self):
+        current = ["PrintStarted    ", "foobar          "]
+        desired = ["foobar          ", "[          ] 1% "]
+
+        runs = self.renderer.plan(current, desired, (12, 0))
+        self.assertEqual(runs, [(0, 0, "foobar      ", True), (0, 1, "[     ", True), (11, 1, "] 1%", True)])
+
+        # the cursor is already where the next change is
+        current = ["Hello           ", "                "]
+        desired = ["Hello World     ", "                "]
+        runs = self.renderer.plan(current, desired, (6, 0))
+        self.assertEqual(runs, [(6, 0, "World", False)])
+        self.assertEqual(self.renderer.commands(runs), 5)
+        self.assertEqual(self.renderer.row_by_row_commands(current, desired), 6)
+
+    def test_clear(self):
+        current = ["PrintStarted    ", "foobar          "]
+
+        # blanking the old characters costs more than clearing the display
+        desired = ["Connected       ", "                "]
+        clear, runs = self.renderer.plan_frame(current, desired, (6, 1))
+        self.assertTrue(clear)
+        self.assertEqual(runs, [(0, 0, "Connected", False)])
+
+        # most of the old characters stay on the screen
+        desired = ["PrintPaused     ", "foobar          "]
+        clear, runs = self.renderer.plan_frame(current, desired, (6, 1))
+        self.assertFalse(clear)
+        self.assertEqual(runs, self.renderer.plan(current, desired, (6, 1)))
+
+        # the clear command is too slow to be worth it
+        slow_clear = renderer.FrameRenderer(clear_cost=100)
+        clear, runs = slow_clear.plan_frame(current, ["Connected       ", "                "])
+        self.assertFalse(clear)
@@ -0,0 +1,211 @@
+import unittest
+
+import sys
+
+#setup the imports for the unit test
+sys.modules['Adafruit_CharLCD'] = __import__('dummyLCD')
+from octoprint_adafruitlcd import synchronousEvent
+
+
+def progress(value, source='print'):
+    return synchronousEvent.SynchronousEvent('self_progress', {'progress':value, 'source':source})
+
+def event(name):
+    return synchronousEvent.SynchronousEvent(name, None)
+
+
+def drain(queue):
+    events = []
+    while not queue.empty():
+        e = queue.pop()
+        payload = e.getPayload()
+        events.append((e.getEvent(), payload['progress'] if payload else None))
+    return events
+
+
+class TestSynchronousEventQueue(unittest.TestCase):
+
+    def test_fifo(self):
+        queue = synchronousEvent.SynchronousEventQueue()
+
+        queue.put(event('Connected'))
+        queue.put(event('PrintStarted'))
+        queue.put(event('Error'))
+
+        self.assertEqual(drain(queue), [('Connected', None), ('PrintStarted', None), ('Error', None)])
+
+    def test_coalesce_progress(self):
+        queue = synchronousEvent.SynchronousEventQueue()
+
+        for i in range(1, 1001):
+            queue.put(progress(i % 100))
+
+        self.assertEqual(drain(queue), [('self_progress', 0)])
+        self.assertEqual(queue.get_stats(), dict(queued=1000, coalesced=999))
+
+    def test_coalesce_sources(self):
+        queue = synchronousEvent.SynchronousEventQueue()
+
+        queue.put(progress(10, 'slicing'))
+        queue.put(progress(20, 'print'))
+        queue.put(progress(11, 'slicing'))
+        queue.put(progress(21, 'print'))
+
+        self.assertEqual(drain(queue), [('self_progress', 11), ('self_progress', 21)])
+
+    def test_keep_state_order(self):
+        queue = synchronousEvent.SynchronousEventQueue()
+
+        queue.put(progress(41))
+        queue.put(progress(42))
+        queue.put(event('PrintPaused'))
+        queue.put(progress(43))
+        queue.put(event('Error'))
+        queue.put(event('Disconnected'))
+        queue.put(progress(44))
+        queue.put(progress(45))
+
+        self.assertEqual(drain(queue), [
+            ('self_progress', 42),
+            ('PrintPaused', None),
+            ('self_progress', 43),
+            ('Error', None),
+            ('Disconnected', None),
+            ('self_progress', 45)
+        ])
+        self.assertEqual(queue.get_stats(), dict(queued=8, coalesced=2))
+
+
+class TestPriorityEventQueue(unittest.TestCase):
+
+    def test_alert_discards_progress(self):
+        queue = synchronousEvent.PriorityEventQueue()
+
+        queue.put(event('PrintStarted'))
+        queue.put(progress(1))
+        queue.put(progress(2, 'slicing'))
+        queue.put(event('Error'))
+        queue.put(progress(3))
+
+        self.assertEqual(drain(queue), [
+            ('PrintStarted', None),
+            ('Error', None),
+            ('self_progress', 3)
+        ])
+        self.assertEqual(queue.get_stats(), dict(queued=5, coalesced=0, discarded=2))
+
+    def test_state_discards_progress(self):
+        queue = synchronousEvent.PriorityEventQueue()
+
+        # a progress queued before a state change would be drawn over it
+        queue.put(progress(98))
+        queue.put(event('PrintDone'))
+        queue.put(event('Error'))
+        queue.put(progress(1, 'slicing'))
+        queue.put(event('PrintStarted'))
+        queue.put(progress(2))
+
+        self.assertEqual(drain(queue), [
+            ('PrintDone', None),
+            ('Error', None),
+            ('PrintStarted', None),
+            ('self_progress', 2)
+        ])
+        self.assertEqual(queue.get_stats(), dict(queued=6, coalesced=0, discarded=2))
+
+    def test_alert_priority(self):
+        classes = synchronousEvent.default_event_classes({'state': 1, 'progress': 1})
+        queue = synchronousEvent.PriorityEventQueue(classes)
+
+        queue.put(event('PrintStarted'))
+        queue.put(progress(1))
+        queue.put(event('Error'))
+        queue.put(event('Disconnected'))
+        queue.put(event('PrintDone'))
+        queue.put(event('Connected'))
+
+        self.assertEqual(drain(queue), [
+            ('Error', None),
+            ('Disconnected', None),
+            ('Connected', None),
+            ('PrintStarted', None),
+            ('PrintDone', None)
+        ])
+
+    def test_configured_priorities(self):
+        classes = synchronousEvent.default_event_classes({'alert': 1, 'state': 0, 'progress': 2})
+        queue = synchronousEvent.PriorityEventQueue(classes)
+
+        queue.put(event('Error'))
+        queue.put(event('PrintDone'))
+        queue.put(progress(1))
+
+        self.assertEqual(drain(queue), [('PrintDone', None), ('Error', None), ('self_progress', 1)])
+
+    def test_custom_classes(self):
+        classes = [
+            synchronousEvent.EventClass('slicing', 0, ['Slicing']),
+            synchronousEvent.EventClass('other', 1, [''])
+        ]
+        queue = synchronousEvent.PriorityEventQueue(classes)
+
+        queue.put(event('PrintStarted'))
+        queue.put(event('SlicingDone'))
+
+        self.assertEqual(drain(queue), [('SlicingDone', None), ('PrintStarted', None)])
+
+
+class FakeLimiter:
+    """
+    FrameLimiter that holds the frames until it is told otherwise
+    """
+
+    def __init__(self):
+        self.wait = 0
+
+    def remaining(self):
+        return self.wait
+
+    def drawn(self):
+        pass
+
+
+class TestEventDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.drawn = []
+        self.delays = []
+        self.limiter = FakeLimiter()
+        self.dispatcher = synchronousEvent.EventDispatcher(synchronousEvent.PriorityEventQueue(), self.render,
+                                                           self.limiter)
+        self.dispatcher.set_scheduler(self.delays.append)
+
+    def render(self, event, payload):
+        self.drawn.append((event, payload['progress'] if payload else None))
+
+    def test_hold_progress(self):
+        self.limiter.wait = 0.1
+
+        # progress from several sources and marquee steps are held together
+        self.dispatcher.dispatch(progress(10))
+        self.dispatcher.dispatch(progress(20, 'slicing'))
+        self.dispatcher.dispatch(event('self_marquee'))
+        self.dispatcher.dispatch(progress(11))
+        self.assertEqual(self.drawn, [])
+        self.assertEqual(self.delays, [0.1] * 4)
+
+        # and drawn once the interval expired
+        self.limiter.wait = 0
+        self.dispatcher.drain()
+        self.assertEqual(self.drawn, [('self_progress', 11), ('self_progress', 20), ('self_marquee', None)])
+        self.assertTrue(self.dispatcher.empty())
+
+    def test_state_change(self):
+        self.limiter.wait = 0.1
+
+        # a state change is drawn right away, and drops the held progress
+        self.dispatcher.dispatch(progress(10))
+        self.dispatcher.dispatch(progress(20, 'slicing'))
+        self.dispatcher.dispatch(event('PrintPaused'))
+        self.assertEqual(self.drawn, [('PrintPaused', None)])
+        self.assertTrue(self.dispatcher.empty())
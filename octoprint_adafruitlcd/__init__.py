@@ -1,60 +1,238 @@
 # coding=utf-8
 from __future__ import absolute_import
-import Adafruit_CharLCD as LCD
 import octoprint.plugin
+import logging
 import math
 import re
+import threading
+import time
 
 from . import util
 from . import data
 from . import synchronousEvent
 from . import events
+from . import renderWorker
+from . import recorder
+from . import fileNameWarmer
+from . import backends
+from . import circuitBreaker
+from . import marquee
 
 class Adafruit_16x2_LCD(octoprint.plugin.StartupPlugin,
                     octoprint.plugin.ProgressPlugin,
                     octoprint.plugin.ShutdownPlugin,
-                    octoprint.plugin.EventHandlerPlugin):
+                    octoprint.plugin.EventHandlerPlugin,
+                    octoprint.plugin.SettingsPlugin):
     
     def __init__(self):
         # constants
 
-        self.__data = data.LCDData(LCD.Adafruit_CharLCDPlate())
+        # the lcd is created on startup, by the backend in the settings
+        self.__data = data.LCDData(None)
         self.__util = util.LCDUtil(self.__data)
         self.__events = events.Events(self.__data, self.__util)
 
         self.__filename = ""
 
-        self.__synchronous_events = synchronousEvent.SynchronousEventQueue()
-        self.__is_LCD_printing = False
+        self.__synchronous_events = synchronousEvent.PriorityEventQueue()
+        self.__dispatcher = synchronousEvent.EventDispatcher(self.__synchronous_events, self.render_event)
 
-        
+        self.__worker = None
+        self.__recorder = None
+        self.__warmer = None
+        self.__opener = None
+        self.__marquee = None
+        self.__startup_stats = dict()
 
-    def on_after_startup(self):
+    def get_settings_defaults(self):
+        return dict(
+            # display driver: gpio, plate, mcp23017, pcf8574, or virtual
+            backend="plate",
+            # arguments of the display driver, such as its I2C address or pins
+            backend_options=dict(),
+            # size of the display, in characters
+            lcd_width=16,
+            lcd_height=2,
+            # draw events on a background thread, so on_event never waits on the LCD
+            render_thread=True,
+            # override the priority of the 'alert', 'state', and 'progress' events (lower is drawn first)
+            event_priorities=dict(),
+            # limit how often progress is redrawn, 0 for no limit
+            max_fps=0,
+            min_redraw_interval=0,
+            # file to record every event to, so that it can be replayed later
+            record_events="",
+            # shorten the names of uploaded files in the background
+            prewarm_file_names=True,
+            # stop writing to the LCD after this many failed commands in a row,
+            # and reconnect every bus_retry_interval seconds, doubling up to bus_retry_max_interval
+            bus_failures=3,
+            bus_retry_interval=0.5,
+            bus_retry_max_interval=30.0,
+            # scroll the whole name of the printed file, instead of shortening it,
+            # one character every marquee_interval seconds
+            marquee_file_names=False,
+            marquee_interval=0.5
+        )
+
+    def on_startup(self, host, port):
         """
-        Runs when plugin is started. Turn on and clear the LCD.
+        Runs before the server starts.  Set up the event queue, and open the
+        LCD from the backend in the settings on a background thread, so that
+        the server does not wait on the display.  Events are queued until
+        the LCD is open.
         """
-
+        start = time.time()
+        self.__data.lcd_width = self._settings.get_int(["lcd_width"])
+        self.__data.lcd_height = self._settings.get_int(["lcd_height"])
         self.__util.init(self._logger)
 
+        record_path = self._settings.get(["record_events"])
+        if record_path:
+            self._logger.info("Recording events to %s", record_path)
+            self.__recorder = recorder.EventRecorder(record_path, self._logger)
+            self.__recorder.start()
+
+        self.__synchronous_events = synchronousEvent.PriorityEventQueue(
+            synchronousEvent.default_event_classes(self._settings.get(["event_priorities"])))
+        limiter = synchronousEvent.FrameLimiter(self._settings.get_float(["max_fps"]),
+                                                self._settings.get_float(["min_redraw_interval"]))
+        self.__dispatcher = synchronousEvent.EventDispatcher(self.__synchronous_events, self.render_event,
+                                                             limiter if limiter.interval > 0 else None,
+                                                             ready=False)
+
+        if self._settings.get_boolean(["render_thread"]):
+            self.__worker = renderWorker.RenderWorker(self.__dispatcher, self._logger)
+            self.__worker.start()
+
+        if self._settings.get_boolean(["prewarm_file_names"]):
+            self.__warmer = fileNameWarmer.FileNameWarmer(self.__data, self._logger)
+            self.__warmer.start()
+
+        if self._settings.get_boolean(["marquee_file_names"]):
+            self.__data.marquee = marquee.Marquee()
+            self.__marquee = marquee.MarqueeTimer(self._settings.get_float(["marquee_interval"]),
+                                                  lambda: self.__handle_event("self_marquee", None),
+                                                  self._logger)
+            self.__marquee.start()
+
+        self.__opener = threading.Thread(target=self.__open_display, args=(start,), name="AdafruitLCDOpen")
+        self.__opener.daemon = True
+        self.__opener.start()
+
+        self.__startup_stats['startup_ms'] = (time.time() - start) * 1000
+
+    def __open_display(self, start):
+        # type (float) -> None
+        """
+        Open the LCD, then draw the events that were queued while it was opening
+        :param start: time at which the plugin started
+        """
+        breaker = circuitBreaker.CircuitBreaker(self._logger, self._settings.get_int(["bus_failures"]),
+                                                self._settings.get_float(["bus_retry_interval"]),
+                                                self._settings.get_float(["bus_retry_max_interval"]))
+        # redraw the latest frame once the lcd answers again
+        redraw = lambda: self.__handle_event("self_redraw", None)
+
+        name = self._settings.get(["backend"])
+        try:
+            backend = backends.get_backend(name, self._settings.get(["backend_options"]))
+        except ValueError:
+            self._logger.exception("Could not open the %s display, falling back to a virtual display", name)
+            backend = backends.VirtualBackend()
+        try:
+            self.__util.open(backend, breaker, redraw)
+        except Exception:
+            # such as a display that is not plugged in yet, the breaker
+            # opens it once it answers
+            self._logger.exception("Could not open the %s display, retrying in the background", name)
+            self.__util.open_later(backend, backends.VirtualBackend(), breaker, redraw)
+
+        self.__startup_stats['open_ms'] = (time.time() - start) * 1000
+        self._logger.info("LCD open %.0f ms after startup", self.__startup_stats['open_ms'])
+
+        self.__dispatcher.open()
+        if self.__worker is not None:
+            self.__worker.wake_in(0)
+        else:
+            try:
+                self.__dispatcher.drain()
+            except Exception:
+                self._logger.exception("Could not draw event")
+
+    def on_after_startup(self):
+        """
+        Runs when plugin is started. Greet the user once the LCD is open.
+        """
         self._logger.debug("Starting Verbose Debugger")
         self._logger.info("Adafruit 16x2 LCD starting")
 
-        self.__util.clear()
-        self.__util.write_to_lcd("Hello! What will", 0, False)
-        self.__util.write_to_lcd("we print today?", 1, False)
-        
-    
+        self.__handle_event("self_hello", None)
+
+    def get_startup_stats(self):
+        # type () -> dict
+        """
+        Get the time on_startup blocked the server for, and the time it
+        took to open the LCD, in milliseconds
+        """
+        return dict(self.__startup_stats)
+
+    def wait_idle(self, timeout=None):
+        # type (float) -> bool
+        """
+        Wait for the LCD to be open, for the render thread to draw every
+        queued event, and for the uploaded file names to be shortened.
+        Returns immediately when the background threads are disabled.
+        :param timeout: maximum time to wait in seconds
+        :return: True if every event has been drawn
+        """
+        end = None if timeout is None else time.time() + timeout
+        if self.__opener is not None:
+            self.__opener.join(timeout)
+            if self.__opener.is_alive():
+                return False
+        for thread in (self.__warmer, self.__worker):
+            if thread is None:
+                continue
+            remaining = None if end is None else max(0, end - time.time())
+            if not thread.wait_idle(remaining):
+                return False
+        return True
+
 
     def on_event(self, event, payload):
         # type (str, dict)
         """
         Called when an event occurs. Displays print updates, slicing info, alalysis times, ect.
 
-        If there are more than one on_event call at a time, then it will 
+        If there are more than one on_event call at a time, then the events
+        are queued, and drawn one at a time by whichever thread got to the
+        LCD first.
 
         :param event: Event which just happened.
         :param payload: Dictionary of data passed with the event
         """
+        if self.__recorder is not None:
+            self.__recorder.record('event', event, payload)
+
+        # shorten the name of new files before they are printed
+        if event in ('Upload', 'FileAdded') and self.__warmer is not None and payload:
+            self.__warmer.warm(payload.get('name'))
+
+        # scroll the name of the file while it prints
+        if self.__marquee is not None:
+            if event == 'PrintStarted':
+                self.__marquee.scroll(True)
+            elif event in ('PrintDone', 'PrintFailed', 'PrintCancelled', 'Error', 'Disconnected'):
+                self.__marquee.scroll(False)
+
+        self.__handle_event(event, payload)
+
+    def __handle_event(self, event, payload):
+        # type (str, dict)
+        """
+        Queue an event to be drawn, if it is useful
+        """
 
         # Only let useful events continue
         # 'onnect' encapsulates any Connection event
@@ -62,57 +240,68 @@ class Adafruit_16x2_LCD(octoprint.plugin.StartupPlugin,
         useful_events = ['Print', 'onnect', 'Error', 'Slicing', 'Anal', 'Shutdown', 'self_']
         black_list = ['ConnectivityChanged', 'PrinterStateChanged', 'Profile']
         if any(e in event for e in useful_events) and not any(e in event for e in black_list):
-            self._logger.info("Event: {}".format(event))
+            # the marquee steps come several times a second for a whole print
+            self._logger.log(logging.DEBUG if event == 'self_marquee' else logging.INFO, "Event: %s", event)
         else:
             return
-        
-        # start a synchronous event if there are no events waiting to be executed
-        if not self.__is_LCD_printing:
-            self.__is_LCD_printing = True
-            self.synchronous_event(self.__synchronous_events, event, payload)
-            self.__is_LCD_printing = False
+
+        e = synchronousEvent.SynchronousEvent(event, payload)
+
+        # let the render thread draw the event
+        if self.__worker is not None:
+            self.__worker.put(e)
         else:
-            e = synchronousEvent.SynchronousEvent(event, payload)
-            self.__synchronous_events.put(e)
-        
-        
-    
-    def synchronous_event(self, eventManager, event, payload):
-        # type (SynchronousEventQueue, str, dict) -> None
+            self.__dispatcher.dispatch(e)
+
+    def render_event(self, event, payload):
+        # type (str, dict) -> None
         """
-        Can not be called asynchronously.  To protect from asynchronous 
-        calls, use the SynchronousEventQueue class
+        Draw a single event on the LCD.
+
+        Can not be called asynchronously.  It is only called by the
+        EventDispatcher, which makes sure only one thread draws at a time
         """
-        self._logger.info("Processing Event: {}".format(event))
+        self._logger.log(logging.DEBUG if event == 'self_marquee' else logging.INFO, "Processing Event: %s", event)
 
-        # Make sure the lcd is enabled for the event
-        self.__util.light(True)
+        # Make sure the lcd is enabled for the event.  A redraw or a step of
+        # the marquee keeps the light the last event left
+        if event not in ('self_redraw', 'self_marquee'):
+            self.__util.light(True)
 
-        # Connect events
-        if 'onnect' in event:
-            self.__events.on_connect_event(event, payload)
-        
-        elif event == 'Error':
-            self.__events.on_error_event(event, payload)
-        
-        elif 'Print' in event:
-            self.__events.on_print_event(event, payload)
-        
-        elif 'Anal' in event:
-            self.__events.on_analysys_event(event, payload)
-        
-        elif "Slicing" in event:
-            self.__events.on_slicing_event(event, payload)
-        
-        elif event == 'self_progress':
-            self.__events.on_progress_event(event, payload)
+        # the other events draw over the scrolling file name
+        if self.__data.marquee is not None and event not in ('self_progress', 'self_marquee', 'self_redraw'):
+            self.__data.marquee.visible = False
+
+        # Draw the whole event as a single frame
+        with self.__util.frame():
+
+            # Connect events
+            if 'onnect' in event:
+                self.__events.on_connect_event(event, payload)
+
+            elif event == 'Error':
+                self.__events.on_error_event(event, payload)
+
+            elif 'Print' in event:
+                self.__events.on_print_event(event, payload)
+
+            elif 'Anal' in event:
+                self.__events.on_analysys_event(event, payload)
+
+            elif "Slicing" in event:
+                self.__events.on_slicing_event(event, payload)
+
+            elif event == 'self_progress':
+                self.__events.on_progress_event(event, payload)
 
+            elif event == 'self_marquee':
+                self.__events.on_marquee_event(event, payload)
 
-        """ Start the next synchronous event if there are any events waiting in the queue """
+            elif event == 'self_hello':
+                self.__events.on_hello_event(event, payload)
 
-        if not eventManager.empty():
-            e = eventManager.pop()
-            self.synchronous_event(eventManager, e.getEvent(), e.getPayload())
+            elif event == 'self_redraw':
+                self.__util.redraw()
 
     def on_print_progress(self, storage, path, progress):
         # type (str, str, int)
@@ -122,13 +311,16 @@ class Adafruit_16x2_LCD(octoprint.plugin.StartupPlugin,
         :param path: Path of file being printed
         :param progress: Progress of print
         """
+        if self.__recorder is not None:
+            self.__recorder.record('print_progress', progress)
+
         if not self._printer.is_printing() or progress == 0 or progress == 100:
             return
         
         # pass the progress onto the event manager, so that no to LCD prints will
         # happen at the same time.
         # I know that this is a bit convoluted, but it works for now
-        self.on_event("self_progress", {'progress':progress, 'name':self.__data.fileName})
+        self.__handle_event("self_progress", {'progress':progress, 'source':'print'})
 
     def on_slicing_progress(self, slicer, source_location, source_path, destination_location, destination_path, progress):
         # type (str, str, str, str, str, int) -> None
@@ -138,16 +330,54 @@ class Adafruit_16x2_LCD(octoprint.plugin.StartupPlugin,
         :param path: Path of file being printed
         :param progress: Progress of print
         """
+        if self.__recorder is not None:
+            self.__recorder.record('slicing_progress', progress)
 
         if progress == 0 or progress == 100:
             return
         
-        self.on_event("self_progress", {'progress':progress, 'name':self.__data.fileName})
+        self.__handle_event("self_progress", {'progress':progress, 'source':'slicing'})
 
     def on_shutdown(self):
         """
         Called on shutdown of OctoPrint. Turn off the LCD.
         """
+        if self.__marquee is not None:
+            self.__marquee.stop(5)
+            self.__marquee = None
+
+        # the render thread could still be drawing if it does not stop
+        drawing = False
+        if self.__worker is not None:
+            self.__worker.stop(5)
+            drawing = self.__worker.is_alive()
+            self.__worker = None
+
+        if self.__recorder is not None:
+            self.__recorder.stop(5)
+            self.__recorder = None
+
+        if self.__warmer is not None:
+            self.__warmer.stop(5)
+            self.__warmer = None
+
+        if self.__opener is not None:
+            self.__opener.join(5)
+            drawing = drawing or self.__opener.is_alive()
+            self.__opener = None
+
+        self._logger.info("LCD event queue: %s", self.__synchronous_events.get_stats())
+        self._logger.info("LCD frames: %s", self.__util.get_render_stats())
+        self._logger.info("LCD file name cache: %s", self.__data.file_names.get_stats())
+        self._logger.info("LCD custom characters: %s", self.__util.get_glyph_stats())
+        self._logger.info("LCD startup: %s", self.get_startup_stats())
+        self._logger.info("LCD bus: %s", self.__util.get_bus_stats())
+        self.__util.close()
+        if self.__data.lcd is None:
+            return
+        if drawing:
+            self._logger.warning("The LCD is still being drawn on, leaving it on")
+            return
         self._logger.info("Turning off LCD")
         self.__util.light(False, True)
         self.__util.enable_lcd(False, True)
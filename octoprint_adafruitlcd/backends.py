@@ -0,0 +1,138 @@
+"""
+Display backends.
+
+A backend creates the lcd object that LCDUtil draws on, from the
+backend_options setting, and declares what the lcd's commands cost on that
+hardware, so that the renderer plans the frames for the display that is
+actually attached.
+
+The costs are rough times in microseconds:
+
+    char_cost    writing one character
+    cursor_cost  moving the cursor
+    clear_cost   clearing the display
+"""
+
+class Backend(object):
+    """
+    Base class of the backends
+    """
+
+    char_cost = 1000
+    cursor_cost = 1000
+    clear_cost = 4000
+
+    def __init__(self, options=None):
+        # type (dict) -> None
+        """
+        :param options: keyword arguments of the lcd's constructor
+        """
+        self.options = dict(options or {})
+
+    def create(self, cols, lines):
+        # type (int, int) -> object
+        """
+        Create the lcd
+        :param cols: number of columns of the display
+        :param lines: number of lines of the display
+        """
+        raise NotImplementedError()
+
+
+class GPIOBackend(Backend):
+    """
+    LCD wired to the GPIO pins, with Adafruit_CharLCD.  The options are the
+    pins: rs, en, d4, d5, d6, d7, and optionally backlight.
+
+    Adafruit_CharLCD waits 1 ms after every command.
+    """
+
+    def create(self, cols, lines):
+        import Adafruit_CharLCD as LCD
+        options = dict(self.options)
+        pins = [options.pop(pin) for pin in ('rs', 'en', 'd4', 'd5', 'd6', 'd7')]
+        return LCD.Adafruit_CharLCD(*(pins + [cols, lines]), **options)
+
+
+class PlateBackend(Backend):
+    """
+    Adafruit LCD plate, with Adafruit_CharLCDPlate.  The options are address
+    and busnum.
+
+    Every command is about 9 I2C transactions on top of the 1 ms wait.
+    """
+
+    char_cost = 3700
+    cursor_cost = 3700
+    clear_cost = 6700
+
+    def create(self, cols, lines):
+        import Adafruit_CharLCD as LCD
+        return LCD.Adafruit_CharLCDPlate(cols=cols, lines=lines, **self.options)
+
+
+class MCP23017Backend(Backend):
+    """
+    Adafruit LCD plate, with the batched smbus driver in mcp23017.  The
+    options are address and busnum.
+
+    A character is 4 bytes of a block write, a cursor move is a block write
+    of its own.
+    """
+
+    char_cost = 360
+    cursor_cost = 630
+    clear_cost = 2630
+
+    def create(self, cols, lines):
+        from . import mcp23017
+        return mcp23017.MCP23017Plate(cols=cols, lines=lines, **self.options)
+
+
+class PCF8574Backend(Backend):
+    """
+    LCD with a PCF8574 I2C backpack, with the batched smbus driver in
+    pcf8574.  The options are address and busnum.
+    """
+
+    char_cost = 360
+    cursor_cost = 540
+    clear_cost = 2540
+
+    def create(self, cols, lines):
+        from . import pcf8574
+        return pcf8574.PCF8574Backpack(cols=cols, lines=lines, **self.options)
+
+
+class VirtualBackend(Backend):
+    """
+    An lcd that only exists in memory, for running without a display
+    """
+
+    char_cost = 1
+    cursor_cost = 1
+    clear_cost = 1
+
+    def create(self, cols, lines):
+        from . import virtualLCD
+        return virtualLCD.VirtualLCD(cols, lines)
+
+
+BACKENDS = dict(
+    gpio=GPIOBackend,
+    plate=PlateBackend,
+    mcp23017=MCP23017Backend,
+    pcf8574=PCF8574Backend,
+    virtual=VirtualBackend
+)
+
+def get_backend(name, options=None):
+    # type (str, dict) -> Backend
+    """
+    Get a backend by name
+    :param name: one of BACKENDS
+    :param options: backend_options setting
+    """
+    if name not in BACKENDS:
+        raise ValueError("Unknown backend '{}', must be one of {}".format(name, ", ".join(sorted(BACKENDS))))
+    return BACKENDS[name](options)
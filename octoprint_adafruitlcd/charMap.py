@@ -0,0 +1,161 @@
+import unicodedata
+
+# the characters of the HD44780 A00 ROM (the common, Japanese one) that are
+# not where ASCII puts them, keyed on their unicode equivalent
+ROM_A00 = {
+    u'\xa5': 0x5c,  # yen sign, instead of the backslash
+    u'\u2192': 0x7e,  # right arrow, instead of the tilde
+    u'\u2190': 0x7f,  # left arrow
+    u'\xb7': 0xa5,  # middle dot
+    u'\u30fb': 0xa5,  # katakana middle dot
+    u'\u2022': 0xa5,  # bullet
+    u'\u30fc': 0xb0,  # katakana long vowel mark
+    u'\xb0': 0xdf,  # degree sign
+    u'\xba': 0xdf,  # masculine ordinal indicator
+    u'\u03b1': 0xe0,  # alpha
+    u'\xe4': 0xe1,  # a with diaeresis
+    u'\u03b2': 0xe2,  # beta
+    u'\xdf': 0xe2,  # sharp s, looks like a beta
+    u'\u03b5': 0xe3,  # epsilon
+    u'\u03bc': 0xe4,  # mu
+    u'\xb5': 0xe4,  # micro sign
+    u'\u03c3': 0xe5,  # sigma
+    u'\u03c1': 0xe6,  # rho
+    u'\u221a': 0xe8,  # square root
+    u'\xa2': 0xec,  # cent sign
+    u'\xa3': 0xed,  # pound sign
+    u'\xf1': 0xee,  # n with tilde
+    u'\xf6': 0xef,  # o with diaeresis
+    u'\u03b8': 0xf2,  # theta
+    u'\u221e': 0xf3,  # infinity
+    u'\u03a9': 0xf4,  # omega
+    u'\u2126': 0xf4,  # ohm sign
+    u'\xfc': 0xf5,  # u with diaeresis
+    u'\u03a3': 0xf6,  # capital sigma
+    u'\u03c0': 0xf7,  # pi
+    u'\u5343': 0xfa,  # thousand
+    u'\u4e07': 0xfb,  # ten thousand
+    u'\u5186': 0xfc,  # yen
+    u'\xf7': 0xfd,  # division sign
+    u'\u2588': 0xff,  # full block
+}
+
+# the halfwidth katakana are in the ROM in the same order as in unicode
+KATAKANA = (0xff61, 0xff9f, 0xa1)
+
+# characters that the ROM does not have, drawn with another character
+FALLBACKS = {
+    u'\u2018': u"'", u'\u2019': u"'", u'\u201a': u"'", u'\u2032': u"'",
+    u'\u201c': u'"', u'\u201d': u'"', u'\u201e': u'"', u'\u2033': u'"',
+    u'\u2010': u'-', u'\u2011': u'-', u'\u2012': u'-', u'\u2013': u'-', u'\u2014': u'-', u'\u2212': u'-',
+    u'\u2026': u'.', u'\xd7': u'x', u'\xb1': u'+', u'\xab': u'<', u'\xbb': u'>',
+    u'\xa0': u' ', u'\xa6': u'|', u'\xa7': u'S', u'\xa9': u'C', u'\xae': u'R',
+    u'\xc6': u'E', u'\xe6': u'e', u'\xd8': u'O', u'\xf8': u'o', u'\u0141': u'L', u'\u0142': u'l',
+    u'\u0110': u'D', u'\u0111': u'd', u'\xd0': u'D', u'\xf0': u'd', u'\u0131': u'i',
+    u'\xbc': u'/', u'\xbd': u'/', u'\xbe': u'/', u'\xbf': u'?', u'\xa1': u'!',
+    u'\ufffd': u'?',
+}
+
+# characters that are neither in the ROM nor in FALLBACKS, and that are
+# worth a custom character: char -> (glyph, pattern, fallback when no slot
+# is left).  The glyphs are at the end of the private use area, so that they
+# do not clash with the ones registered with LCDUtil.register_glyph
+GLYPHS = {
+    u'\\': (u'\uf8f0', [0, 0b10000, 0b01000, 0b00100, 0b00010, 0b00001, 0, 0], u'/'),
+    u'~': (u'\uf8f1', [0, 0, 0, 0b01000, 0b10101, 0b00010, 0, 0], u'-'),
+    u'\xc4': (u'\uf8f2', [0b01010, 0, 0b01110, 0b10001, 0b11111, 0b10001, 0b10001, 0], unichr(0xe1)),
+    u'\xd6': (u'\uf8f3', [0b01010, 0, 0b01110, 0b10001, 0b10001, 0b10001, 0b01110, 0], unichr(0xef)),
+    u'\xdc': (u'\uf8f4', [0b01010, 0, 0b10001, 0b10001, 0b10001, 0b10001, 0b01110, 0], unichr(0xf5)),
+}
+
+
+class _Table(dict):
+    """
+    Translation table of unicode.translate.  The characters that are not
+    in the table are looked up once, and added to it.
+    """
+
+    def __missing__(self, code):
+        char = self.translate(code)
+        self[code] = char
+        return char
+
+    def translate(self, code):
+        # type (int) -> str
+        """
+        Find the character of the lcd that stands for a unicode character,
+        from its decomposition: accents are dropped, and compatibility
+        characters (such as fullwidth letters or ligatures) are spelled
+        with the characters they stand for
+        """
+        if 0xd800 <= code <= 0xdbff or code >= 0x10000:
+            # the lcd can not show characters outside of the BMP
+            return u'?'
+        if 0xdc00 <= code <= 0xdfff:
+            # the second half of a character that is already a '?'
+            return u''
+        char = unichr(code)
+        if 0xe000 <= code <= 0xf8ff:
+            # a custom character
+            return char
+
+        decomposed = u''.join(c for c in unicodedata.normalize('NFKD', char) if not unicodedata.combining(c))
+        if 0 < len(decomposed) and decomposed != char:
+            translated = decomposed.translate(self)
+            if u'?' not in translated or u'?' in decomposed:
+                return translated
+        return u'?'
+
+
+class CharMap:
+    """
+    Translates the unicode messages to the character set of the lcd's ROM.
+
+    The table is built once, and a message is translated with a single
+    unicode.translate.  Characters that the ROM does not have are drawn
+    with a custom character (see GLYPHS) if the frame has a CGRAM slot for
+    it, or with the closest ROM character: the letter without its accents,
+    a similar punctuation mark, or '?'.
+    """
+
+    def __init__(self):
+        table = dict()
+        # the custom characters stay in the frame, they are given a slot
+        # when it is drawn
+        for code in range(0x08):
+            table[code] = unichr(code)
+        for code in range(0x08, 0x20):
+            table[code] = u' '
+        for code in range(0x20, 0x7f):
+            table[code] = unichr(code)
+        for char, code in ROM_A00.items():
+            table[ord(char)] = unichr(code)
+        first, last, rom = KATAKANA
+        for code in range(first, last + 1):
+            table[code] = unichr(rom + code - first)
+        for char, fallback in FALLBACKS.items():
+            table[ord(char)] = fallback
+        for char, (glyph, pattern, fallback) in GLYPHS.items():
+            table[ord(char)] = glyph
+
+        self.__table = _Table(table)
+
+    def translate(self, message):
+        # type (str) -> str
+        """
+        Translate a message to lcd characters
+        :param message: unicode message, or UTF-8 bytes
+        :return: the characters of the ROM, as unicode characters with the
+            same code, and the custom characters of GLYPHS
+        """
+        if isinstance(message, bytes):
+            message = message.decode('utf-8', 'replace')
+        return message.translate(self.__table)
+
+    def glyphs(self):
+        # type () -> list
+        """
+        Get the custom characters that translate() uses
+        :return: list of (char, pattern, fallback)
+        """
+        return sorted(GLYPHS.values())
@@ -0,0 +1,152 @@
+import threading
+
+
+class CircuitBreaker:
+    """
+    Stops the bus traffic to a display that does not answer.
+
+    Every command sent to the LCD reports a success() or a failure().  After
+    threshold failures in a row, the breaker opens: allow() returns False,
+    so no command waits on the dead bus, and a background thread calls the
+    probe until the display answers again.  The probes are spaced out
+    exponentially, from interval to max_interval seconds.  Once a probe
+    succeeds, the breaker closes and on_close is called.
+    """
+
+    def __init__(self, logger, threshold=3, interval=0.5, max_interval=30.0):
+        # type (Logger, int, float, float) -> None
+        """
+        :param logger: logger to report the failures to
+        :param threshold: number of failures in a row that open the breaker
+        :param interval: seconds before the first probe
+        :param max_interval: longest time between two probes
+        """
+        self._logger = logger
+        self.__threshold = max(1, threshold)
+        self.__interval = interval
+        self.__max_interval = max(interval, max_interval)
+
+        self.__probe = None
+        self.__on_close = None
+
+        self.__lock = threading.Lock()
+        self.__failures = 0
+        self.__open = False
+        self.__thread = None
+        self.__stopped = threading.Event()
+
+        self.__stats = dict(failures=0, trips=0, probes=0, recoveries=0, skipped=0)
+
+    def set_probe(self, probe, on_close=None):
+        # type (function, function) -> None
+        """
+        :param probe: function() that reconnects the display, and returns
+            True if it answers.  Called on the breaker's thread
+        :param on_close: function() called once the display answers again
+        """
+        self.__probe = probe
+        self.__on_close = on_close
+
+    def allow(self):
+        # type () -> bool
+        """
+        Check whether commands can be sent to the display
+        """
+        if self.__open:
+            self.__stats['skipped'] += 1
+            return False
+        return True
+
+    def is_open(self):
+        # type () -> bool
+        return self.__open
+
+    def success(self):
+        # type () -> None
+        self.__failures = 0
+
+    def failure(self):
+        # type () -> None
+        """
+        Count a failed command, and open the breaker once there are too many
+        """
+        with self.__lock:
+            self.__stats['failures'] += 1
+            self.__failures += 1
+            if self.__open or self.__failures < self.__threshold:
+                return
+            self._logger.warning("LCD did not answer %d times, retrying in %.1f s", self.__failures, self.__interval)
+            self.__trip()
+
+    def trip(self):
+        # type () -> None
+        """
+        Open the breaker right away, such as when the display could not be
+        opened at all, and probe it until it answers
+        """
+        with self.__lock:
+            if self.__open:
+                return
+            self.__trip()
+
+    def __trip(self):
+        # called with the lock held
+        self.__open = True
+        self.__stats['trips'] += 1
+        self.__thread = threading.Thread(target=self.__run, name="AdafruitLCDReconnect")
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def __run(self):
+        delay = self.__interval
+        while not self.__stopped.wait(delay):
+            self.__stats['probes'] += 1
+            try:
+                answered = self.__probe is not None and self.__probe()
+            except Exception:
+                self._logger.debug("LCD probe failed", exc_info=True)
+                answered = False
+
+            if answered:
+                with self.__lock:
+                    self.__failures = 0
+                    self.__open = False
+                    self.__stats['recoveries'] += 1
+                self._logger.info("LCD answers again")
+                if self.__on_close is not None:
+                    self.__on_close()
+                return
+
+            delay = min(delay * 2, self.__max_interval)
+            self._logger.debug("LCD still does not answer, retrying in %.1f s", delay)
+
+    def wait_closed(self, timeout=None):
+        # type (float) -> bool
+        """
+        Block until the display answers again
+        :param timeout: maximum time to wait in seconds, None to wait forever
+        :return: True if the breaker is closed
+        """
+        thread = self.__thread
+        if thread is not None:
+            thread.join(timeout)
+        return not self.__open
+
+    def stop(self, timeout=None):
+        # type (float) -> None
+        """
+        Stop probing the display
+        :param timeout: maximum time to wait for the probe to finish
+        """
+        self.__stopped.set()
+        thread = self.__thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+
+    def get_stats(self):
+        # type () -> dict
+        """
+        Get the number of failed commands, the times the breaker opened,
+        the probes, the recoveries, and the commands skipped while open
+        """
+        return dict(self.__stats)
@@ -1,5 +1,32 @@
 import re
 
+from . import lruCache
+
+# the 8 custom characters
+SPECIAL_CHARS = re.compile(u'[\x00-\x07]')
+
+# patterns used to shorten file names
+VERSION = re.compile(r'[v][\d]*')
+WORDS = re.compile(r'[a-zA-Z\d][^A-Z-_ ]*')
+NUMBERS = re.compile(r'\d+')
+CAPITALIZED_WORDS = re.compile(r'[\dA-Z][^A-Z]*')
+CAPITALIZED_VERSION = re.compile(r'[V][\d]*')
+
+class SpecialChars:
+    """
+    A string whose special characters are converted to numbers when it is
+    formatted, so that the conversion is skipped for log messages that 
+    are never written
+    """
+
+    def __init__(self, data, string):
+        # type (LCDData, str) -> None
+        self.__data = data
+        self.__string = string
+
+    def __str__(self):
+        return self.__data.special_chars_to_num(self.__string)
+
 class LCDData:
     """
     Holds global data for the plugin, 
@@ -17,8 +44,14 @@ class LCDData:
         self.lcd = lcd
 
         self.fileName = ""
+        # Marquee of the printed file name, None to show the shortened name
+        self.marquee = None
 
         self.lcd_width = 16
+        self.lcd_height = 2
+
+        # shortened file names, keyed on (name, lcd_width)
+        self.file_names = lruCache.LRUCache(256)
     
     
     def special_chars_to_num(self, string):
@@ -29,10 +62,16 @@ class LCDData:
         The range is 0 to 7 since the LCD can only store 8 special characters
         :param string: string to convert
         """
-        for ch in range(0, 8):
-            if unichr(ch) in string:
-                string = string.replace(unichr(ch), "#{}".format(ch))
-        return string
+        return SPECIAL_CHARS.sub(lambda m: "#{}".format(ord(m.group())), string)
+
+    def printable(self, string):
+        # type (str) -> SpecialChars
+        """
+        Get a string to log, special characters are converted only if the 
+        message is actually logged
+        :param string: string to log
+        """
+        return SpecialChars(self, string)
     
     def get_diff(self, str1, str2):
         #type (str, str) -> list
@@ -48,6 +87,19 @@ class LCDData:
         #type (str) -> str
         """
         Simplify the file names to fit in the lcd screen.
+
+        The names are cached, see shorten_file_name for how they are shortened
+        :param name: name to minify
+        """
+        if len(name) <= self.lcd_width:
+            return name
+        width = self.lcd_width
+        return self.file_names.get((name, width), lambda: self.shorten_file_name(name, width))
+
+    def shorten_file_name(self, name, width):
+        #type (str, int) -> str
+        """
+        Simplify the file names to fit in the lcd screen.
         It makes several changes to the string until it is less than the lcd width
 
         1. remove extension
@@ -56,9 +108,10 @@ class LCDData:
         4. remove trailing words, (excluding version numbers: Vxxx)
 
         :param name: name to minify
+        :param width: width to fit the name in
         """
 
-        if len(name) <= self.lcd_width:
+        if len(name) <= width:
             return name
 
 
@@ -66,46 +119,46 @@ class LCDData:
         if name.find('.') != -1:
             name = name.split('.', 1)[0]
         
-        if len(name) <= self.lcd_width:
+        if len(name) <= width:
             return name
         
         # Capitalize Version number
-        words = re.findall(r'[v][\d]*', name)
+        words = VERSION.findall(name)
         for v in words:
             name = name.replace(v, v.capitalize())
         
         """ == Remove dashes, underscores, and spaces.  Then capitalize each word == """
-        words = re.findall(r'[a-zA-Z\d][^A-Z-_ ]*', name)
+        words = WORDS.findall(name)
         name = ''.join([s.capitalize() for s in words])
 
 
-        if len(name) <= self.lcd_width:
+        if len(name) <= width:
             return name
 
         """ == Remove big numbers == """
 
         # find all the numbers in the string
-        numbers = re.findall(r'\d+', name)
+        numbers = NUMBERS.findall(name)
 
         # remove numbers with more than 3 digits
         for n in numbers:
-            if len(n) > 2 and len(name) > self.lcd_width:
+            if len(n) > 2 and len(name) > width:
                 name = name.replace(n, "")
         
 
-        if len(name) <= self.lcd_width:
+        if len(name) <= width:
             return name
 
         """ == remove extra words from the end == """
 
         # split the string into capitalized words
-        words = re.findall(r'[\dA-Z][^A-Z]*', name)
+        words = CAPITALIZED_WORDS.findall(name)
 
         # remove words from the string until it is smaller or equal to the lcd width
         for w in reversed(words):
-            if len(name) > self.lcd_width:
+            if len(name) > width:
                 # Make sure that version numbers are not messed with
-                if len(re.findall(r'[V][\d]*', w)) == 0:
+                if len(CAPITALIZED_VERSION.findall(w)) == 0:
                     name = name.replace(w, "") 
 
         return name
\ No newline at end of file
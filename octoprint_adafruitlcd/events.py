@@ -1,4 +1,8 @@
+import logging
 import math
+import os
+
+from . import progressBar
 
 class Events:
     """
@@ -16,6 +20,14 @@ class Events:
         # type (LCDData) -> None
         self.__data = data
         self.__util = util
+
+    def __get_progress_bar(self):
+        # type () -> ProgressBarTable
+        """
+        Get the progress bar lines for the current display width and glyphs
+        """
+        glyphs = (' ', self.__data.perc2, self.__data.perc4, self.__data.perc6, self.__data.perc8, self.__data.perc10)
+        return progressBar.get_table(glyphs, progressBar.bar_length(self.__data.lcd_width))
     
     def on_print_event(self, event, data):
         # type (str, dict) -> None
@@ -33,6 +45,9 @@ class Events:
             self.__util.create_custom_progress_bar()
             self.__data.fileName = self.__data.clean_file_name(data['name'])
             self.__util.write_to_lcd(self.__data.fileName, 1)
+            if self.__data.marquee is not None:
+                # the progress scrolls the whole name, without its extension
+                self.__data.marquee.reset(os.path.splitext(data['name'])[0])
 
 
     def on_connect_event(self, event, data):
@@ -81,7 +96,7 @@ class Events:
             minute = int(math.floor(data['time'] / 60))
             second = int(math.floor(data['time']) % 60)
             text = event + " {}:{}".format(minute, second)
-            if len(text) > 16:
+            if len(text) > self.__data.lcd_width:
                 text = text.replace(' ', '')
             self.__util.write_to_lcd(text, 0)
             return
@@ -94,25 +109,38 @@ class Events:
         
 
     
+    def on_hello_event(self, event, data):
+        # type (str, dict) -> None
+
+        self.__util.clear()
+        self.__util.write_to_lcd("Hello! What will", 0, False)
+        self.__util.write_to_lcd("we print today?", 1, False)
+
     def on_progress_event(self, event, data):
         # type (str, dict) -> None
         
-        switcher = {
-            0: ' ',
-            1: self.__data.perc2,
-            2: self.__data.perc4,
-            3: self.__data.perc6,
-            4: self.__data.perc8,
-            5: self.__data.perc10
-        }
-
-        bar = self.__data.perc10 * int(round(data['progress'] / 10))
-        bar += switcher[(data['progress'] % 10) / 2]
-        bar += ' ' * (10 - len(bar))
-        
-        progress_bar = "[{}] {}%".format(bar, str(data['progress']))
-
-        self.__util.write_to_lcd(data['name'], 0)
+        progress_bar = self.__get_progress_bar().line(data['progress'])
+
+        # the file name is looked up when the progress is drawn, since the
+        # event that sets it may still be waiting to be drawn
+        name = data.get('name', self.__data.fileName)
+        marquee = self.__data.marquee
+        if marquee is not None and data.get('source') == 'print' and marquee.scrolls(self.__data.lcd_width):
+            marquee.visible = True
+            name = marquee.window(self.__data.lcd_width)
+        elif marquee is not None:
+            marquee.visible = False
+        self.__util.write_to_lcd(name, 0)
         self.__util.write_to_lcd(progress_bar, 1)
+
+    def on_marquee_event(self, event, data):
+        # type (str, dict) -> None
+
+        # only scroll the name while the progress is shown
+        marquee = self.__data.marquee
+        if marquee is None or not marquee.visible:
+            return
+        if marquee.step():
+            self.__util.write_to_lcd(marquee.window(self.__data.lcd_width), 0, level=logging.DEBUG)
     
         
@@ -0,0 +1,82 @@
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+class FileNameWarmer(threading.Thread):
+    """
+    Shortens the names of uploaded files in the background.
+
+    The shortened names are kept in the LCDData file name cache, so that
+    drawing the analysis, slicing, and print events of a new file is only
+    a cache lookup.
+    """
+
+    def __init__(self, data, logger):
+        # type (LCDData, Logger) -> None
+        """
+        :param data: LCDData whose file name cache is filled
+        :param logger: logger to report failures to
+        """
+        super(FileNameWarmer, self).__init__(name="AdafruitLCDFileNames")
+        self.daemon = True
+
+        self.__data = data
+        self._logger = logger
+        self.__queue = queue.Queue()
+
+    def warm(self, name):
+        # type (str) -> None
+        """
+        Queue a file name to be shortened.  Returns immediately.
+        :param name: name of the file, as in the event payloads
+        """
+        if name:
+            self.__queue.put(name)
+
+    def run(self):
+        while True:
+            name = self.__queue.get()
+            try:
+                if name is None:
+                    return
+                self.__data.clean_file_name(name)
+            except Exception:
+                self._logger.exception("Could not shorten file name %s", name)
+            finally:
+                self.__queue.task_done()
+
+    def wait_idle(self, timeout=None):
+        # type (float) -> bool
+        """
+        Block until every queued name has been shortened
+        :param timeout: maximum time to wait in seconds, None to wait forever
+        :return: True if the warmer is idle
+        """
+        end = None if timeout is None else time.time() + timeout
+        with self.__queue.all_tasks_done:
+            while self.__queue.unfinished_tasks:
+                if not self.is_alive():
+                    return False
+                if end is None:
+                    self.__queue.all_tasks_done.wait()
+                else:
+                    remaining = end - time.time()
+                    if remaining <= 0:
+                        return False
+                    self.__queue.all_tasks_done.wait(remaining)
+            return True
+
+    def stop(self, timeout=None):
+        # type (float) -> None
+        """
+        Shorten the remaining names, then stop the warmer
+        :param timeout: maximum time to wait for the warmer to finish
+        """
+        self.__queue.put(None)
+        if self.is_alive():
+            self.join(timeout)
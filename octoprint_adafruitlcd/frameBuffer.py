@@ -0,0 +1,187 @@
+import codecs
+import struct
+from itertools import izip
+
+# every cell is a UTF-16 code unit, so that the frames can hold the custom
+# characters, which are not lcd characters until they are given a slot
+ENCODING = 'utf-16-le'
+CELL = 2
+# rows are compared a 64 bit word, 4 cells, at a time
+WORD_CELLS = 4
+# the codec functions, without the lookup of str.encode
+_encode = codecs.getencoder(ENCODING)
+_decode = codecs.getdecoder(ENCODING)
+
+
+class FrameBuffer:
+    """
+    The characters of a width x height display.
+
+    The cells are kept in a single bytearray, two bytes per character, that
+    is changed in place: a write copies the encoded text into the buffer,
+    and rows are memoryview slices of it.  Characters are only decoded
+    into strings by line() and lines(), and rows are compared in place,
+    as bytes and as 64 bit words.
+    """
+
+    def __init__(self, width, height, fill=u' '):
+        # type (int, int, str) -> None
+        """
+        :param width: number of columns
+        :param height: number of rows
+        :param fill: character of every cell
+        """
+        self.width = width
+        self.height = height
+        self.__cells = bytearray(fill.encode(ENCODING) * (width * height))
+        self.__view = memoryview(self.__cells)
+        self.__row_size = width * CELL
+        # the bytes of a blank row, most rows are cleared before a write
+        self.__blank = u' '.encode(ENCODING) * width
+        # the words of a row, and the first column after them
+        self.__words = struct.Struct('<%dQ' % (width // WORD_CELLS))
+        self.__tail = width // WORD_CELLS * WORD_CELLS
+
+    @staticmethod
+    def from_lines(lines):
+        # type (list) -> FrameBuffer
+        """
+        Create a frame from a list of rows of the same length
+        """
+        frame = FrameBuffer(len(lines[0]) if len(lines) > 0 else 0, len(lines))
+        frame.set_lines(lines)
+        return frame
+
+    def write(self, row, column, text):
+        # type (int, int, str) -> None
+        """
+        Write text at a position.  The text is cut at the end of the row,
+        and rows that the display does not have are dropped.
+        :param row: row of the first character
+        :param column: column of the first character
+        :param text: characters to write
+        """
+        if row < 0 or row >= self.height or column >= self.width or len(text) == 0:
+            return
+        text = text[:self.width - column]
+        if isinstance(text, bytes):
+            # a byte is a character of the lcd
+            text = text.decode('latin-1')
+        encoded = _encode(text)[0]
+        if len(encoded) != len(text) * CELL:
+            # the lcd can not show characters outside of the BMP either
+            encoded = u''.join(c if ord(c) < 0x10000 else u'?' for c in text).encode(ENCODING)
+        start = row * self.__row_size + column * CELL
+        self.__cells[start:start + len(encoded)] = encoded
+
+    def set_lines(self, lines):
+        # type (list) -> None
+        """
+        Write every row
+        """
+        for row, line in enumerate(lines):
+            self.write(row, 0, line)
+
+    def fill(self, char=u' '):
+        # type (str) -> None
+        """
+        Set every cell to a character
+        """
+        self.__cells[:] = char.encode(ENCODING) * (self.width * self.height)
+
+    def fill_row(self, row, char=u' '):
+        # type (int, str) -> None
+        """
+        Set every cell of a row to a character
+        """
+        if 0 <= row < self.height:
+            start = row * self.__row_size
+            self.__cells[start:start + self.__row_size] = self.__blank if char == u' ' else char.encode(ENCODING) * self.width
+
+    def row(self, row):
+        # type (int) -> memoryview
+        """
+        Get the bytes of a row, without copying them
+        """
+        start = row * self.__row_size
+        return self.__view[start:start + self.__row_size]
+
+    def line(self, row, start=0, end=None):
+        # type (int, int, int) -> str
+        """
+        Get the characters of a row as a string
+        :param row: row to get
+        :param start: first column
+        :param end: column after the last one, the end of the row if None
+        """
+        end = self.width if end is None else end
+        offset = row * self.__row_size
+        return _decode(self.__cells[offset + start * CELL:offset + end * CELL])[0]
+
+    def lines(self):
+        # type () -> list
+        """
+        Get every row as a string
+        """
+        return [self.line(row) for row in range(self.height)]
+
+    def text(self):
+        # type () -> str
+        """
+        Get every character of the frame in a single string, row after row
+        """
+        return _decode(self.__cells)[0]
+
+    def diff(self, other, row):
+        # type (FrameBuffer, int) -> list
+        """
+        Get the columns of a row that differ from another frame of the same
+        size.  Equal rows are found with a single comparison of their bytes,
+        the other rows are XORed a word at a time, and only the cells of the
+        words that differ are looked at.  Nothing is copied.
+        :param other: frame to compare with
+        :param row: row to compare
+        :return: the columns that differ, in order
+        """
+        start = row * self.__row_size
+        end = start + self.__row_size
+        if self.__view[start:end] == other.__view[start:end]:
+            return []
+        columns = []
+        column = 0
+        for x, y in izip(self.__words.unpack_from(self.__cells, start), self.__words.unpack_from(other.__cells, start)):
+            x ^= y
+            if x:
+                if x & 0xFFFF:
+                    columns.append(column)
+                if x & 0xFFFF0000:
+                    columns.append(column + 1)
+                if x & 0xFFFF00000000:
+                    columns.append(column + 2)
+                if x >> 48:
+                    columns.append(column + 3)
+            column += WORD_CELLS
+        a, b = self.__cells, other.__cells
+        for i in xrange(start + self.__tail * CELL, end, CELL):
+            if a[i] != b[i] or a[i + 1] != b[i + 1]:
+                columns.append((i - start) >> 1)
+        return columns
+
+    def copy(self):
+        # type () -> FrameBuffer
+        frame = FrameBuffer(self.width, self.height)
+        frame.copy_from(self)
+        return frame
+
+    def copy_from(self, other):
+        # type (FrameBuffer) -> None
+        """
+        Copy the cells of a frame of the same size, without allocating
+        """
+        self.__cells[:] = other.__cells
+
+    def __eq__(self, other):
+        return isinstance(other, FrameBuffer) and self.width == other.width and self.__cells == other.__cells
+
+    def __ne__(self, other):
+        return not self == other
@@ -0,0 +1,176 @@
+import re
+
+from . import glyphCache
+
+class GlyphAllocator:
+    """
+    Maps any number of custom characters onto the 8 CGRAM slots of the LCD.
+
+    A glyph is registered with the character that stands for it in the
+    frames, and is given a slot when a frame that uses it is drawn.  A glyph
+    keeps its slot for as long as it can: when a frame needs a glyph that is
+    not loaded, the least recently drawn slot is replaced.
+
+    Replacing the pattern of a slot changes every cell that shows it, so
+    slots that are on the screen are only replaced when nothing else is
+    free, and the caller has to remove them from the screen first (see
+    assign).
+    """
+
+    def __init__(self):
+        self.__cache = glyphCache.GlyphCache()
+
+        # char -> (pattern, preferred slot, fallback char)
+        self.__glyphs = dict()
+        # matches the registered chars
+        self.__chars = None
+
+        # when each slot was last drawn
+        self.__used = [0] * glyphCache.GlyphCache.SLOTS
+        self.__clock = 0
+
+        self.__stats = dict(resident=0, replaced=0, deferred=0, fallbacks=0)
+
+    def register(self, char, pattern, preferred=None, fallback=' '):
+        # type (str, list, int, str) -> None
+        """
+        Register a glyph
+        :param char: character that stands for the glyph in the frames
+        :param pattern: 8 rows of 5 bits
+        :param preferred: slot to load the glyph in, if it is free
+        :param fallback: character drawn when no slot is left for the glyph
+        """
+        self.__glyphs[char] = (tuple(pattern), preferred, fallback)
+        self.__chars = re.compile(u'[' + u''.join(re.escape(c) for c in self.__glyphs) + u']')
+
+    def find(self, rows):
+        # type (list) -> list
+        """
+        Find the glyphs used in a frame
+        :param rows: rows of the frame
+        :return: the registered chars in the frame, in the order they are found
+        """
+        if self.__chars is None:
+            return []
+        chars = []
+        for char in self.__chars.findall(u''.join(rows)):
+            if char not in chars:
+                chars.append(char)
+        return chars
+
+    def assign(self, chars, visible=()):
+        # type (list, set) -> tuple
+        """
+        Give a slot to each glyph of a frame.  Glyphs that are loaded keep
+        their slot, glyphs with the same pattern share a slot, and the
+        other glyphs replace the slot that is free or least recently drawn,
+        preferring slots that are not on the screen.
+
+        :param chars: glyphs of the frame, from find()
+        :param visible: slots shown on the screen before the frame is drawn
+        :return: (slots, uploads, deferred), slots maps each char to its
+            slot, or None if no slot is left.  uploads are the (slot, pattern)
+            to load before drawing, deferred are the (slot, pattern) that
+            are on the screen and can only be loaded once the frame has
+            removed them from the screen
+        """
+        self.__clock += 1
+
+        slots = dict()
+        # pattern of the slots used by the frame
+        planned = dict()
+        for char in chars:
+            pattern = self.__glyphs[char][0]
+            slot = self.__find_slot(pattern)
+            if slot is not None:
+                slots[char] = slot
+                planned[slot] = pattern
+                self.__stats['resident'] += 1
+
+        uploads = []
+        deferred = []
+        for char in chars:
+            if char in slots:
+                continue
+            pattern, preferred, fallback = self.__glyphs[char]
+
+            # an earlier glyph of the frame may have the same pattern
+            shared = [s for s, p in planned.items() if p == pattern]
+            if shared:
+                slots[char] = shared[0]
+                self.__stats['resident'] += 1
+                continue
+
+            free = [s for s in range(len(self.__used)) if s not in planned]
+            if len(free) == 0:
+                slots[char] = None
+                self.__stats['fallbacks'] += 1
+                continue
+            slot = min(free, key=lambda s: (s in visible, s != preferred,
+                                            self.__cache.get(s) is not None, self.__used[s]))
+            slots[char] = slot
+            planned[slot] = pattern
+            if self.__cache.get(slot) is not None:
+                self.__stats['replaced'] += 1
+            if slot in visible:
+                self.__stats['deferred'] += 1
+                deferred.append((slot, pattern))
+            else:
+                uploads.append((slot, pattern))
+
+        for slot in planned:
+            self.__used[slot] = self.__clock
+        return slots, uploads, deferred
+
+    def __find_slot(self, pattern):
+        # type (tuple) -> int
+        for slot in range(len(self.__used)):
+            if self.__cache.get(slot) == pattern:
+                return slot
+        return None
+
+    def upload(self, lcd, slot, pattern):
+        # type (Adafruit_CharLCD, int, tuple) -> bool
+        """
+        Load a pattern in a slot, if it is not already there
+        :return: True if the pattern was uploaded
+        """
+        return self.__cache.load(lcd, slot, pattern)
+
+    def translate(self, rows, slots, hidden=()):
+        # type (list, dict, set) -> list
+        """
+        Replace the glyphs of a frame with their slots
+        :param rows: rows of the frame
+        :param slots: slots from assign()
+        :param hidden: chars to draw as blanks
+        :return: the rows to send to the lcd
+        """
+        table = dict()
+        for char, slot in slots.items():
+            if char in hidden:
+                table[char] = u' '
+            elif slot is None:
+                table[char] = self.__glyphs[char][2]
+            else:
+                table[char] = unichr(slot)
+        return [u''.join(table.get(c, c) for c in row) for row in rows]
+
+    def invalidate(self):
+        # type () -> None
+        """
+        Forget the content of every slot, after the controller is reset
+        """
+        self.__cache.invalidate()
+
+    def get_stats(self):
+        # type () -> dict
+        """
+        Get the number of patterns uploaded, the glyphs that were already
+        loaded, the glyphs that replaced another one, the replacements that
+        had to wait for the slot to leave the screen, and the glyphs drawn
+        with their fallback because no slot was left
+        """
+        stats = dict(self.__stats)
+        stats['uploads'] = self.__cache.get_stats()['uploads']
+        return stats
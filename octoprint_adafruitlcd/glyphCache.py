@@ -0,0 +1,56 @@
+class GlyphCache:
+    """
+    Keeps track of the custom characters in the 8 CGRAM slots of the LCD.
+
+    Uploading a character takes 9 bus writes, so a character is only
+    uploaded when the slot holds a different pattern.  The controller keeps
+    CGRAM until it is reset, so the cache only has to be invalidated when
+    the LCD is initialized again.
+    """
+
+    SLOTS = 8
+
+    def __init__(self):
+        # pattern in each slot, None if unknown
+        self.__slots = [None] * self.SLOTS
+        self.__stats = dict(uploads=0, skipped=0)
+
+    def load(self, lcd, slot, pattern):
+        # type (Adafruit_CharLCD, int, list) -> bool
+        """
+        Make sure a slot holds a pattern, uploading it if needed
+        :param lcd: lcd to upload the pattern to
+        :param slot: CGRAM slot, from 0 to 7
+        :param pattern: 8 rows of 5 bits
+        :return: True if the pattern was uploaded
+        """
+        pattern = tuple(pattern)
+        if self.__slots[slot] == pattern:
+            self.__stats['skipped'] += 1
+            return False
+
+        lcd.create_char(slot, list(pattern))
+        self.__slots[slot] = pattern
+        self.__stats['uploads'] += 1
+        return True
+
+    def get(self, slot):
+        # type (int) -> tuple
+        """
+        Get the pattern in a slot, None if unknown
+        """
+        return self.__slots[slot]
+
+    def invalidate(self):
+        # type () -> None
+        """
+        Forget the content of every slot, after the controller is reset
+        """
+        self.__slots = [None] * self.SLOTS
+
+    def get_stats(self):
+        # type () -> dict
+        """
+        Get the number of patterns uploaded, and the uploads that were skipped
+        """
+        return dict(self.__stats)
@@ -0,0 +1,70 @@
+from collections import OrderedDict
+import threading
+
+class LRUCache:
+    """
+    A bounded, thread safe, least recently used cache
+    """
+
+    def __init__(self, maxsize=256):
+        # type (int) -> None
+        """
+        :param maxsize: number of entries to keep
+        """
+        self.__maxsize = maxsize
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+        # statistics
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def get(self, key, compute):
+        # type (object, function) -> object
+        """
+        Get a cached value, computing it on a miss
+        :param key: key of the value
+        :param compute: function() that computes the value
+        """
+        with self.__lock:
+            if key in self.__entries:
+                value = self.__entries.pop(key)
+                # move the entry to the most recently used end
+                self.__entries[key] = value
+                self.__hits += 1
+                return value
+            self.__misses += 1
+
+        value = compute()
+
+        with self.__lock:
+            self.__entries[key] = value
+            while len(self.__entries) > self.__maxsize:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+        return value
+
+    def __contains__(self, key):
+        with self.__lock:
+            return key in self.__entries
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__entries)
+
+    def clear(self):
+        # type () -> None
+        with self.__lock:
+            self.__entries.clear()
+
+    def get_stats(self):
+        # type () -> dict
+        """
+        Get the statistics of the cache
+        :return: dict with the number of 'hits', 'misses', 'evictions', and
+            cached 'entries'
+        """
+        with self.__lock:
+            return dict(hits=self.__hits, misses=self.__misses, evictions=self.__evictions,
+                        entries=len(self.__entries))
@@ -0,0 +1,126 @@
+import threading
+
+
+class Marquee:
+    """
+    Scrolls a text that is longer than the lcd, one character at a time.
+
+    The text loops with a gap after its end, and stops for a few steps at
+    its start, so that the beginning of the name can be read:
+
+        foo_bar_cheese_g
+        oo_bar_cheese_gr
+        ...
+        r_v3   foo_bar_c
+    """
+
+    def __init__(self, gap=3, pause=4):
+        # type (int, int) -> None
+        """
+        :param gap: number of blanks between the end of the text and its start
+        :param pause: number of steps the start of the text is shown for
+        """
+        self.__gap = gap
+        self.__pause = pause
+        self.reset("")
+
+    def reset(self, text):
+        # type (str) -> None
+        """
+        Scroll a new text, from its start
+        """
+        self.text = text
+        # the marquee is only drawn while the screen shows it
+        self.visible = False
+        self.__loop = text + u" " * self.__gap
+        self.__offset = 0
+        self.__hold = self.__pause
+
+    def scrolls(self, width):
+        # type (int) -> bool
+        """
+        Check whether the text is too long for the lcd
+        """
+        return len(self.text) > width
+
+    def window(self, width):
+        # type (int) -> str
+        """
+        Get the part of the text the lcd shows
+        :param width: number of columns of the lcd
+        """
+        if not self.scrolls(width):
+            return self.text
+        return (self.__loop + self.__loop)[self.__offset:self.__offset + width]
+
+    def step(self):
+        # type () -> bool
+        """
+        Move the text one character to the left
+        :return: False if the text did not move, while its start is shown
+        """
+        if self.__hold > 0:
+            self.__hold -= 1
+            return False
+        self.__offset = (self.__offset + 1) % len(self.__loop)
+        if self.__offset == 0:
+            self.__hold = self.__pause
+        return True
+
+
+class MarqueeTimer(threading.Thread):
+    """
+    Calls tick every interval seconds while a print is running, so that
+    the marquee is scrolled by the thread that draws the events, and never
+    by OctoPrint's threads.  The timer sleeps while nothing scrolls.
+    """
+
+    def __init__(self, interval, tick, logger):
+        # type (float, function, Logger) -> None
+        """
+        :param interval: seconds between two steps
+        :param tick: function() that queues a step
+        :param logger: logger to report failures to
+        """
+        super(MarqueeTimer, self).__init__(name="AdafruitLCDMarquee")
+        self.daemon = True
+
+        self.__interval = interval
+        self.__tick = tick
+        self._logger = logger
+
+        self.__scrolling = threading.Event()
+        self.__stopped = threading.Event()
+
+    def scroll(self, scrolling):
+        # type (bool) -> None
+        """
+        Start or stop the steps
+        """
+        if scrolling:
+            self.__scrolling.set()
+        else:
+            self.__scrolling.clear()
+
+    def run(self):
+        while True:
+            self.__scrolling.wait()
+            if self.__stopped.wait(self.__interval):
+                return
+            if not self.__scrolling.is_set():
+                continue
+            try:
+                self.__tick()
+            except Exception:
+                self._logger.exception("Could not scroll the file name")
+
+    def stop(self, timeout=None):
+        # type (float) -> None
+        """
+        Stop the timer
+        :param timeout: maximum time to wait for the timer to finish
+        """
+        self.__stopped.set()
+        self.__scrolling.set()
+        if self.is_alive():
+            self.join(timeout)
@@ -0,0 +1,113 @@
+"""
+Driver for the Adafruit character LCD plate, which talks to the MCP23017 on
+the plate directly through smbus.
+
+Adafruit_CharLCDPlate drives the LCD through the Adafruit_GPIO abstraction,
+and every write8 becomes about 9 I2C transactions: one for RS, one for each
+nibble, and three for each enable pulse.  This driver puts the MCP23017 in
+byte mode with IOCON.BANK = 1, so that every byte of a block write to GPIOB
+is a new state of port B, and sends whole character runs in a few block
+writes.  (With BANK = 0, byte mode toggles the address pointer between GPIOB
+and GPIOA instead.)
+
+Port B of the plate:
+
+    GPB7 RS   GPB6 RW   GPB5 EN   GPB4 D4   GPB3 D5   GPB2 D6   GPB1 D7   GPB0 blue
+
+The red and green backlights are on GPA6 and GPA7, and the buttons on
+GPA0-GPA4.  The backlights are on when their pin is low.
+"""
+from . import portLCD
+
+# IOCON, with IOCON.BANK = 0 as after a power on.  With BANK = 1 this is
+# OLATA, which is harmless to write when the plugin restarts
+IOCON_BANK0 = 0x0A
+# IOCON: registers of a port next to each other, and no address pointer
+# increment
+IOCON_BANK = 0x80
+IOCON_SEQOP = 0x20
+
+# MCP23017 registers, with IOCON.BANK = 1
+IODIRA = 0x00
+GPPUA = 0x06
+GPIOA = 0x09
+IODIRB = 0x10
+GPIOB = 0x19
+
+# Port B pins
+PIN_RS = 0x80
+PIN_EN = 0x20
+PIN_D4 = 0x10
+PIN_D5 = 0x08
+PIN_D6 = 0x04
+PIN_D7 = 0x02
+PIN_BLUE = 0x01
+# Port A pins
+PIN_RED = 0x40
+PIN_GREEN = 0x80
+BUTTONS = 0x1F
+
+# Longest block an smbus transfer can hold
+BLOCK_SIZE = 32
+
+# WRITE_TABLE[rs][value]: the port B states that write a byte, without the blue pin
+WRITE_TABLE = portLCD.write_table(PIN_RS, PIN_EN, (PIN_D4, PIN_D5, PIN_D6, PIN_D7))
+
+
+class MCP23017Plate(portLCD.PortLCD):
+    """
+    Adafruit character LCD plate, driven with smbus block writes of up to
+    32 port states (8 characters).
+    """
+
+    def __init__(self, bus=None, address=0x20, busnum=1, cols=16, lines=2, clear_delay=portLCD.CLEAR_DELAY):
+        # type (SMBus, int, int, int, int, float) -> None
+        """
+        :param bus: smbus.SMBus like object, one is opened on busnum if None
+        :param address: I2C address of the MCP23017
+        :param busnum: I2C bus to open if no bus is given
+        :param cols: number of columns of the LCD
+        :param lines: number of lines of the LCD
+        :param clear_delay: seconds to wait for clear and home
+        """
+        super(MCP23017Plate, self).__init__(WRITE_TABLE, cols, lines, clear_delay)
+        if bus is None:
+            from smbus2 import SMBus
+            bus = SMBus(busnum)
+        self._bus = bus
+        self._address = address
+
+        # the backlights are on when their pin is low
+        self.__port_a = 0
+
+        # the buttons are inputs with pull ups, the backlights outputs
+        self._bus.write_byte_data(address, IOCON_BANK0, IOCON_BANK | IOCON_SEQOP)
+        self._bus.write_byte_data(address, IODIRA, BUTTONS)
+        self._bus.write_byte_data(address, GPPUA, BUTTONS)
+        self._bus.write_byte_data(address, IODIRB, 0x00)
+        self._bus.write_byte_data(address, GPIOA, self.__port_a)
+
+        self._init_display()
+
+    def _send(self, states):
+        # type (list) -> None
+        for i in range(0, len(states), BLOCK_SIZE):
+            self._bus.write_i2c_block_data(self._address, GPIOB, states[i:i + BLOCK_SIZE])
+
+    def set_color(self, red, green, blue):
+        """Set backlight color to provided red, green, and blue values."""
+        self.__port_a = (0 if red else PIN_RED) | (0 if green else PIN_GREEN)
+        self._port_bits = 0 if blue else PIN_BLUE
+        self._bus.write_byte_data(self._address, GPIOA, self.__port_a)
+        # the blue pin is set with a state that keeps EN low
+        self._bus.write_byte_data(self._address, GPIOB, self._port_bits)
+
+    def set_backlight(self, backlight):
+        """Turn the backlight on or off."""
+        self.set_color(backlight, backlight, backlight)
+
+    def is_pressed(self, button):
+        """Return True if the provided button is pressed, False otherwise."""
+        if button not in range(5):
+            raise ValueError('Unknown button, must be SELECT, RIGHT, DOWN, UP, or LEFT.')
+        return (self._bus.read_byte_data(self._address, GPIOA) >> button) & 1 == 0
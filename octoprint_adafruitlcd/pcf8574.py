@@ -0,0 +1,77 @@
+"""
+Driver for the PCF8574 I2C backpacks found on cheap 16x2 and 20x4 LCDs.
+
+The PCF8574 has no registers: every byte written to it is a new state of
+its port.  The command byte of an smbus block write is written to the port
+like the others, so a block write holds up to 33 port states (8
+characters).
+
+Port of the backpack:
+
+    P7 D7   P6 D6   P5 D5   P4 D4   P3 backlight   P2 EN   P1 RW   P0 RS
+
+The backlight is on when its pin is high.
+"""
+from . import portLCD
+
+# Port pins
+PIN_RS = 0x01
+PIN_EN = 0x04
+PIN_BACKLIGHT = 0x08
+PIN_D4 = 0x10
+PIN_D5 = 0x20
+PIN_D6 = 0x40
+PIN_D7 = 0x80
+
+# Longest block an smbus transfer can hold, after the command byte
+BLOCK_SIZE = 32
+
+# WRITE_TABLE[rs][value]: the port states that write a byte, without the backlight pin
+WRITE_TABLE = portLCD.write_table(PIN_RS, PIN_EN, (PIN_D4, PIN_D5, PIN_D6, PIN_D7))
+
+
+class PCF8574Backpack(portLCD.PortLCD):
+    """
+    LCD with a PCF8574 backpack, driven with smbus block writes.
+    """
+
+    def __init__(self, bus=None, address=0x27, busnum=1, cols=16, lines=2, clear_delay=portLCD.CLEAR_DELAY):
+        # type (SMBus, int, int, int, int, float) -> None
+        """
+        :param bus: smbus.SMBus like object, one is opened on busnum if None
+        :param address: I2C address of the PCF8574, 0x27 or 0x3F on most backpacks
+        :param busnum: I2C bus to open if no bus is given
+        :param cols: number of columns of the LCD
+        :param lines: number of lines of the LCD
+        :param clear_delay: seconds to wait for clear and home
+        """
+        super(PCF8574Backpack, self).__init__(WRITE_TABLE, cols, lines, clear_delay)
+        if bus is None:
+            from smbus2 import SMBus
+            bus = SMBus(busnum)
+        self._bus = bus
+        self._address = address
+
+        self._port_bits = PIN_BACKLIGHT
+        # the port starts high, which would hold EN high
+        self._bus.write_byte(self._address, self._port_bits)
+
+        self._init_display()
+
+    def _send(self, states):
+        # type (list) -> None
+        for i in range(0, len(states), BLOCK_SIZE + 1):
+            block = states[i:i + BLOCK_SIZE + 1]
+            if len(block) == 1:
+                self._bus.write_byte(self._address, block[0])
+            else:
+                self._bus.write_i2c_block_data(self._address, block[0], block[1:])
+
+    def set_backlight(self, backlight):
+        """Turn the backlight on or off."""
+        self._port_bits = PIN_BACKLIGHT if backlight else 0
+        self._bus.write_byte(self._address, self._port_bits)
+
+    def set_color(self, red, green, blue):
+        """The backlight has a single color, it is on if any color is set."""
+        self.set_backlight(red or green or blue)
@@ -0,0 +1,197 @@
+"""
+HD44780 character LCDs driven in 4 bit mode through the 8 bit port of an
+I2C I/O expander, such as the MCP23017 of the Adafruit LCD plate, or the
+PCF8574 of the common LCD backpacks.
+
+Every write to the controller is a sequence of port states: the data
+nibble with EN high, then with EN low, since the controller reads a
+nibble when EN falls.  The states of every byte are computed once, in a
+table for the pins of the expander, and the states of a whole character
+run are sent in a few block writes.
+"""
+import time
+
+# HD44780 commands
+LCD_CLEARDISPLAY = 0x01
+LCD_RETURNHOME = 0x02
+LCD_ENTRYMODESET = 0x04
+LCD_DISPLAYCONTROL = 0x08
+LCD_FUNCTIONSET = 0x20
+LCD_SETCGRAMADDR = 0x40
+LCD_SETDDRAMADDR = 0x80
+
+LCD_ENTRYLEFT = 0x02
+LCD_DISPLAYON = 0x04
+LCD_CURSORON = 0x02
+LCD_BLINKON = 0x01
+LCD_2LINE = 0x08
+
+# DDRAM address of the first two rows, the next two rows follow them
+LCD_ROW_OFFSETS = (0x00, 0x40)
+
+# Time clear and home take, in seconds
+CLEAR_DELAY = 0.002
+
+
+def write_table(rs, en, data):
+    # type (int, int, tuple) -> tuple
+    """
+    Compute the port states that write each byte
+    :param rs: mask of the RS pin
+    :param en: mask of the EN pin
+    :param data: masks of the D4, D5, D6, and D7 pins
+    :return: table[rs][value], the 4 port states that write value
+    """
+    def nibble_pins(nibble):
+        return sum(pin for bit, pin in enumerate(data) if nibble & (1 << bit))
+
+    def sequence(value, char_mode):
+        high = nibble_pins(value >> 4) | (rs if char_mode else 0)
+        low = nibble_pins(value & 0x0F) | (rs if char_mode else 0)
+        return (high | en, high, low | en, low)
+
+    return tuple(tuple(sequence(value, char_mode) for value in range(256)) for char_mode in (False, True))
+
+
+class PortLCD(object):
+    """
+    Base class of the I/O expander drivers.  It has the methods of
+    Adafruit_CharLCD that the plugin uses.
+
+    Writes are collected, and sent with _send() when the method returns.
+    Subclasses set up the expander, and implement _send() and the backlight.
+    """
+
+    def __init__(self, table, cols=16, lines=2, clear_delay=CLEAR_DELAY):
+        # type (tuple, int, int, float) -> None
+        """
+        :param table: port states of each byte, from write_table
+        :param cols: number of columns of the LCD
+        :param lines: number of lines of the LCD
+        :param clear_delay: seconds to wait for clear and home
+        """
+        self._table = table
+        self._cols = cols
+        self._lines = lines
+        self._clear_delay = clear_delay
+        # the third and fourth rows of a 4 line display continue the first two
+        self._row_offsets = LCD_ROW_OFFSETS + tuple(offset + cols for offset in LCD_ROW_OFFSETS)
+
+        self.__pending = []
+        # pins that are set in every state, such as the backlight
+        self._port_bits = 0
+
+    def _init_display(self):
+        """
+        Initialize the display the way Adafruit_CharLCD does
+        """
+        self.displaycontrol = LCD_DISPLAYON
+        self.displayfunction = LCD_2LINE
+        self.displaymode = LCD_ENTRYLEFT
+        self._command(0x33)
+        self._command(0x32)
+        self._command(LCD_DISPLAYCONTROL | self.displaycontrol)
+        self._command(LCD_FUNCTIONSET | self.displayfunction)
+        self._command(LCD_ENTRYMODESET | self.displaymode)
+        self.clear()
+
+    def _send(self, states):
+        # type (list) -> None
+        """
+        Write port states to the expander, in order
+        """
+        raise NotImplementedError()
+
+    def _queue(self, values, rs):
+        # type (list, bool) -> None
+        """
+        Queue the port states that write values to the controller
+        """
+        table = self._table[1 if rs else 0]
+        bits = self._port_bits
+        # set RS while EN is low before the first pulse
+        self.__pending.append(table[values[0]][1] | bits)
+        for value in values:
+            for state in table[value]:
+                self.__pending.append(state | bits)
+
+    def _flush(self):
+        # type () -> None
+        pending = self.__pending
+        self.__pending = []
+        if pending:
+            self._send(pending)
+
+    def _command(self, value):
+        # type (int) -> None
+        self._queue([value], False)
+        self._flush()
+
+    def home(self):
+        """Move the cursor back to its home (first line and first column)."""
+        self._command(LCD_RETURNHOME)
+        time.sleep(self._clear_delay)
+
+    def clear(self):
+        """Clear the LCD."""
+        self._command(LCD_CLEARDISPLAY)
+        time.sleep(self._clear_delay)
+
+    def set_cursor(self, col, row):
+        """Move the cursor to an explicit column and row position."""
+        if row >= self._lines:
+            row = self._lines - 1
+        self._command(LCD_SETDDRAMADDR | (col + self._row_offsets[row]))
+
+    def enable_display(self, enable):
+        """Enable or disable the display.  Set enable to True to enable."""
+        if enable:
+            self.displaycontrol |= LCD_DISPLAYON
+        else:
+            self.displaycontrol &= ~LCD_DISPLAYON
+        self._command(LCD_DISPLAYCONTROL | self.displaycontrol)
+
+    def show_cursor(self, show):
+        """Show or hide the cursor.  Cursor is shown if show is True."""
+        if show:
+            self.displaycontrol |= LCD_CURSORON
+        else:
+            self.displaycontrol &= ~LCD_CURSORON
+        self._command(LCD_DISPLAYCONTROL | self.displaycontrol)
+
+    def blink(self, blink):
+        """Turn on or off cursor blinking.  Set blink to True to enable blinking."""
+        if blink:
+            self.displaycontrol |= LCD_BLINKON
+        else:
+            self.displaycontrol &= ~LCD_BLINKON
+        self._command(LCD_DISPLAYCONTROL | self.displaycontrol)
+
+    def write8(self, value, char_mode=False):
+        """Write 8-bit value in character or data mode."""
+        self._queue([value], char_mode)
+        self._flush()
+
+    def message(self, text):
+        """Write text to display.  Note that text can include newlines."""
+        line = 0
+        chars = []
+        for char in text:
+            if char == '\n':
+                if chars:
+                    self._queue(chars, True)
+                    chars = []
+                line += 1
+                self._queue([LCD_SETDDRAMADDR | self._row_offsets[min(line, self._lines - 1)]], False)
+            else:
+                chars.append(ord(char))
+        if chars:
+            self._queue(chars, True)
+        self._flush()
+
+    def create_char(self, location, pattern):
+        """Fill one of the first 8 CGRAM locations with custom characters."""
+        location &= 0x7
+        self._queue([LCD_SETCGRAMADDR | (location << 3)], False)
+        self._queue(list(pattern), True)
+        self._flush()
@@ -0,0 +1,64 @@
+class ProgressBarTable:
+    """
+    The 101 progress bar lines, from 0% to 100%, computed once.
+
+    Each cell of the bar is split into as many steps as there are partial
+    glyphs, so a 10 cell bar with glyphs (' ', 1, 2, 3, 4, '=') moves one
+    step every 2%:
+
+        [====\\x02     ] 45%
+    """
+
+    def __init__(self, glyphs, bar_length=10):
+        # type (tuple, int) -> None
+        """
+        :param glyphs: glyphs of a cell, from empty to full, with the partly
+            filled cells in between
+        :param bar_length: number of cells in the bar
+        """
+        self.glyphs = tuple(glyphs)
+        self.bar_length = bar_length
+
+        steps = len(self.glyphs) - 1
+        lines = []
+        for progress in range(101):
+            filled = progress * bar_length * steps // 100
+            full = filled // steps
+            bar = self.glyphs[-1] * full
+            if full < bar_length:
+                bar += self.glyphs[filled % steps]
+            bar += self.glyphs[0] * (bar_length - len(bar))
+            lines.append(u"[{}] {}%".format(bar, progress))
+        self.__lines = tuple(lines)
+
+    def line(self, progress):
+        # type (int) -> str
+        """
+        Get the line for a progress
+        :param progress: progress from 0 to 100
+        """
+        return self.__lines[min(max(int(progress), 0), 100)]
+
+
+# tables that have been computed, keyed on (glyphs, bar_length)
+_tables = dict()
+
+def get_table(glyphs, bar_length=10):
+    # type (tuple, int) -> ProgressBarTable
+    """
+    Get the progress bar table for a glyph set and bar length, computing it
+    the first time it is used
+    """
+    key = (tuple(glyphs), bar_length)
+    table = _tables.get(key)
+    if table is None:
+        table = _tables.setdefault(key, ProgressBarTable(glyphs, bar_length))
+    return table
+
+def bar_length(width):
+    # type (int) -> int
+    """
+    Get the number of cells of a bar that fits in a line, with room for the
+    brackets and the percentage: 10 cells on a 16 character display
+    """
+    return max(1, width - len("[] 99%"))
@@ -0,0 +1,137 @@
+"""
+Record the events sent to the plugin, and replay them.
+
+Traces are stored as one json list per line:
+
+    [time, "event", name, payload]
+    [time, "print_progress", progress]
+    [time, "slicing_progress", progress]
+
+where time is the number of seconds since the recording started.  Files
+ending in .gz are compressed.
+"""
+import gzip
+import json
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+def open_trace(path, mode):
+    # type (str, str) -> file
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+class EventRecorder(threading.Thread):
+    """
+    Records the events sent to the plugin to a trace file.
+
+    record() only puts the step in a queue, the file is written by this
+    thread, so that OctoPrint's event thread never waits on the disk.
+    """
+
+    def __init__(self, path, logger):
+        # type (str, Logger) -> None
+        """
+        :param path: trace file to write
+        :param logger: logger to report write failures to
+        """
+        super(EventRecorder, self).__init__(name="AdafruitLCDRecorder")
+        self.daemon = True
+
+        self.__path = path
+        self._logger = logger
+        self.__queue = queue.Queue()
+        self.__start = time.time()
+
+    def record(self, *step):
+        # type (tuple) -> None
+        """
+        Record a step, such as ('event', name, payload) or ('print_progress', progress)
+        """
+        self.__queue.put([round(time.time() - self.__start, 3)] + list(step))
+
+    def run(self):
+        try:
+            trace = open_trace(self.__path, "wb")
+        except (IOError, OSError):
+            self._logger.exception("Could not open trace file %s", self.__path)
+            return
+
+        with trace:
+            while True:
+                line = self.__queue.get()
+                if line is None:
+                    return
+                try:
+                    trace.write((json.dumps(line, separators=(',', ':'), default=str) + "\n").encode("utf-8"))
+                    # write everything that has been recorded so far
+                    if self.__queue.empty():
+                        trace.flush()
+                except (IOError, OSError):
+                    self._logger.exception("Could not write to trace file %s", self.__path)
+                    return
+
+    def stop(self, timeout=None):
+        # type (float) -> None
+        """
+        Write the remaining steps and close the trace file
+        :param timeout: maximum time to wait for the writer
+        """
+        self.__queue.put(None)
+        if self.is_alive():
+            self.join(timeout)
+
+
+def load_trace(path):
+    # type (str) -> list
+    """
+    Load a recorded trace
+    :param path: trace file
+    :return: list of (time, step)
+    """
+    trace = []
+    with open_trace(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entry = json.loads(line.decode("utf-8"))
+                trace.append((entry[0], tuple(entry[1:])))
+    return trace
+
+
+def play_step(plugin, step):
+    # type (Adafruit_16x2_LCD, tuple) -> None
+    """
+    Send a single step to the plugin
+    """
+    if step[0] == 'event':
+        plugin.on_event(step[1], step[2])
+    elif step[0] == 'print_progress':
+        plugin.on_print_progress("local", "replay.gcode", step[1])
+    elif step[0] == 'slicing_progress':
+        plugin.on_slicing_progress("replay", "local", "replay.stl", "local", "replay.gcode", step[1])
+
+
+def replay(plugin, trace, speed=None):
+    # type (Adafruit_16x2_LCD, list, float) -> None
+    """
+    Replay a trace through the plugin
+    :param plugin: plugin to send the steps to
+    :param trace: list of (time, step), as from load_trace
+    :param speed: 1 to replay at the recorded speed, 2 for twice as fast,
+        None to replay as fast as possible
+    """
+    start = time.time()
+    for t, step in trace:
+        if speed:
+            delay = start + t / float(speed) - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        play_step(plugin, step)
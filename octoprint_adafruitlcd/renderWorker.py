@@ -0,0 +1,121 @@
+import threading
+import time
+
+class RenderWorker(threading.Thread):
+    """
+    Background thread that owns the LCD.
+
+    OctoPrint's threads only put events into the queue, and the worker
+    draws them on the LCD one at a time, so that on_event never has to
+    wait on the display.
+    """
+
+    def __init__(self, dispatcher, logger):
+        # type (EventDispatcher, Logger) -> None
+        """
+        :param dispatcher: EventDispatcher that draws the queued events
+        :param logger: logger to report render failures to
+        """
+        super(RenderWorker, self).__init__(name="AdafruitLCDRender")
+        self.daemon = True
+
+        self.__dispatcher = dispatcher
+        self._logger = logger
+
+        self.__condition = threading.Condition()
+        self.__running = True
+        self.__pending = False
+        self.__busy = False
+        # time at which a held frame can be drawn
+        self.__wake_at = None
+
+        # held frames are drawn by the worker, not by a timer thread
+        self.__dispatcher.set_scheduler(self.wake_in)
+
+    def put(self, event):
+        # type (SynchronousEvent) -> None
+        """
+        Queue an event to be drawn by the worker.  Returns immediately.
+        :param event: SynchronousEvent to draw
+        """
+        self.__dispatcher.put(event)
+        with self.__condition:
+            self.__pending = True
+            self.__condition.notify_all()
+
+    def wake_in(self, delay):
+        # type (float) -> None
+        """
+        Drain the queue again after a delay
+        :param delay: seconds to wait
+        """
+        with self.__condition:
+            wake_at = time.time() + delay
+            if self.__wake_at is None or wake_at < self.__wake_at:
+                self.__wake_at = wake_at
+            self.__condition.notify_all()
+
+    def run(self):
+        while True:
+            with self.__condition:
+                while True:
+                    if self.__wake_at is not None and time.time() >= self.__wake_at:
+                        self.__wake_at = None
+                        self.__pending = True
+                    if self.__pending or not self.__running:
+                        break
+
+                    self.__busy = False
+                    self.__condition.notify_all()
+                    if self.__wake_at is None:
+                        self.__condition.wait()
+                    else:
+                        self.__condition.wait(self.__wake_at - time.time())
+
+                if not self.__pending:
+                    # stopped and there is nothing left to draw
+                    self.__busy = False
+                    self.__wake_at = None
+                    self.__condition.notify_all()
+                    return
+
+                self.__pending = False
+                self.__busy = True
+
+            try:
+                self.__dispatcher.drain()
+            except Exception:
+                self._logger.exception("Could not draw event")
+
+    def wait_idle(self, timeout=None):
+        # type (float) -> bool
+        """
+        Block until every queued event has been drawn
+        :param timeout: maximum time to wait in seconds, None to wait forever
+        :return: True if the worker is idle
+        """
+        end = None if timeout is None else time.time() + timeout
+        with self.__condition:
+            while self.__busy or self.__pending or self.__wake_at is not None:
+                if not self.is_alive():
+                    return False
+                if end is None:
+                    self.__condition.wait()
+                else:
+                    remaining = end - time.time()
+                    if remaining <= 0:
+                        return False
+                    self.__condition.wait(remaining)
+            return True
+
+    def stop(self, timeout=None):
+        # type (float) -> None
+        """
+        Draw the remaining events, then stop the worker
+        :param timeout: maximum time to wait for the worker to finish
+        """
+        with self.__condition:
+            self.__running = False
+            self.__condition.notify_all()
+        if self.is_alive():
+            self.join(timeout)
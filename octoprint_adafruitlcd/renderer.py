@@ -0,0 +1,160 @@
+from . import frameBuffer
+
+def as_frame(frame):
+    # type (object) -> FrameBuffer
+    """
+    Get a FrameBuffer from a FrameBuffer or a list of rows
+    """
+    if isinstance(frame, frameBuffer.FrameBuffer):
+        return frame
+    return frameBuffer.FrameBuffer.from_lines(frame)
+
+
+class FrameRenderer:
+    """
+    Plans the writes needed to turn the frame on the LCD into a new frame.
+
+    Every command sent to the LCD has a cost: moving the cursor costs
+    cursor_cost, and writing a character costs char_cost.  The controller
+    moves the cursor to the right after each character, so a short run of
+    unchanged characters between two changes is rewritten when that is
+    cheaper than moving the cursor over it.
+
+    Clearing the display costs clear_cost, and leaves the cursor home, so
+    a frame is only drawn on a cleared display when blanking the old
+    characters would cost more.
+    """
+
+    def __init__(self, cursor_cost=1, char_cost=1, clear_cost=4):
+        # type (float, float, float) -> None
+        """
+        :param cursor_cost: cost of a set_cursor command
+        :param char_cost: cost of writing one character
+        :param clear_cost: cost of clearing the display
+        """
+        self.cursor_cost = cursor_cost
+        self.char_cost = char_cost
+        self.clear_cost = clear_cost
+
+        # blank frame of the last size planned, the screen after a clear
+        self.__blank = None
+
+    def diff(self, current, desired):
+        # type (FrameBuffer, FrameBuffer) -> list
+        """
+        Get the columns that differ in each row
+        :param current: FrameBuffer, or list of rows, currently on the LCD
+        :param desired: FrameBuffer, or list of rows, to display
+        """
+        current = as_frame(current)
+        desired = as_frame(desired)
+        return [current.diff(desired, row) for row in xrange(desired.height)]
+
+    def plan(self, current, desired, cursor=None, diffs=None):
+        # type (list, list, tuple, list) -> list
+        """
+        Plan the writes for a frame.
+
+        :param current: FrameBuffer, or list of rows, currently on the LCD
+        :param desired: FrameBuffer, or list of rows, to display
+        :param cursor: (column, row) of the cursor, None if unknown
+        :param diffs: diff(current, desired), if it is already known
+        :return: list of (column, row, text, move) runs, where move is True
+            if the cursor has to be moved before writing the text
+        """
+        desired = as_frame(desired)
+        if diffs is None:
+            diffs = self.diff(current, desired)
+
+        runs = []
+        for row, diff in enumerate(diffs):
+            if len(diff) == 0:
+                continue
+
+            # the cursor can be used as the start of a run if it is on this row
+            if cursor is not None and cursor[1] == row and cursor[0] <= diff[0] \
+                    and (diff[0] - cursor[0]) * self.char_cost <= self.cursor_cost:
+                start = cursor[0]
+                move = False
+            else:
+                start = diff[0]
+                move = True
+            end = diff[0] + 1
+
+            for i in diff[1:]:
+                # rewrite the unchanged characters if it is cheaper than moving the cursor
+                if (i - end) * self.char_cost <= self.cursor_cost:
+                    end = i + 1
+                    continue
+                runs.append((start, row, desired.line(row, start, end), move))
+                start = i
+                end = i + 1
+                move = True
+            runs.append((start, row, desired.line(row, start, end), move))
+
+            cursor = (end, row)
+        return runs
+
+    def plan_frame(self, current, desired, cursor=None, diffs=None):
+        # type (list, list, tuple, list) -> tuple
+        """
+        Plan the writes for a frame, clearing the display first if that is
+        cheaper than writing the differences.
+
+        :param current: FrameBuffer, or list of rows, currently on the LCD
+        :param desired: FrameBuffer, or list of rows, to display
+        :param cursor: (column, row) of the cursor, None if unknown
+        :param diffs: diff(current, desired), if it is already known
+        :return: (clear, runs), clear is True if the display has to be
+            cleared before the runs are written
+        """
+        desired = as_frame(desired)
+        runs = self.plan(current, desired, cursor, diffs)
+        cost = self.cost(runs)
+        if self.clear_cost >= cost:
+            return False, runs
+
+        blank = self.__blank
+        if blank is None or blank.width != desired.width or blank.height != desired.height:
+            blank = self.__blank = frameBuffer.FrameBuffer(desired.width, desired.height)
+        cleared = self.plan(blank, desired, (0, 0))
+        if self.clear_cost + self.cost(cleared) < cost:
+            return True, cleared
+        return False, runs
+
+    def cost(self, runs):
+        # type (list) -> float
+        """
+        Get the cost of a plan
+        :param runs: runs from plan()
+        """
+        return sum((self.cursor_cost if move else 0) + len(text) * self.char_cost
+                   for col, row, text, move in runs)
+
+    def commands(self, runs):
+        # type (list) -> int
+        """
+        Get the number of bus commands of a plan
+        :param runs: runs from plan()
+        """
+        return sum((1 if move else 0) + len(text) for col, row, text, move in runs)
+
+    def row_by_row_commands(self, current, desired, diffs=None):
+        # type (FrameBuffer, FrameBuffer, list) -> int
+        """
+        Get the number of bus commands needed to draw the frame one row at a
+        time, moving the cursor over every unchanged character (the way
+        LCDUtil used to draw).
+        :param current: FrameBuffer, or list of rows, currently on the LCD
+        :param desired: FrameBuffer, or list of rows, to display
+        :param diffs: diff(current, desired), if it is already known
+        """
+        if diffs is None:
+            diffs = self.diff(current, desired)
+        commands = 0
+        for diff in diffs:
+            if len(diff) == 0:
+                continue
+            commands += 1 + len(diff)
+            commands += sum(1 for a, b in zip(diff, diff[1:]) if b != a + 1)
+        return commands
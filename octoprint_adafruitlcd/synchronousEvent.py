@@ -1,4 +1,6 @@
 from collections import deque
+import threading
+import time
 
 class SynchronousEvent:
     """
@@ -20,10 +22,34 @@ class SynchronousEvent:
         # type() -> dict
         return self.__payload
 
+    def getCoalesceKey(self):
+        # type() -> tuple
+        """
+        Get the key of events that can replace each other in the queue.
+
+        Only progress and marquee events can be coalesced, a newer progress
+        replaces an older one from the same source (print or slicing)
+        :return: key, None if the event can not be coalesced
+        """
+        if self.__event not in ('self_progress', 'self_marquee'):
+            return None
+        return (self.__event, (self.__payload or {}).get('source'))
+
 class SynchronousEventQueue:
+    """
+    FIFO queue of SynchronousEvents, which collapses stale progress events.
+
+    A progress event replaces any pending progress event from the same 
+    source, as long as no other event is queued after it.  All other
+    events keep their order.
+    """
     
     def __init__(self):
         self.__event_queue = deque()
+
+        # statistics
+        self.__queued = 0
+        self.__coalesced = 0
     
     def empty(self):
         # type () -> bool
@@ -32,6 +58,10 @@ class SynchronousEventQueue:
         :return: True if empty
         """
         return len(self.__event_queue) == 0
+
+    def size(self):
+        # type () -> int
+        return len(self.__event_queue)
     
     def put(self, event):
         # type (SynchronousEvent) -> None
@@ -39,6 +69,21 @@ class SynchronousEventQueue:
         Add an event to the queue
         :param event: SynchronousEvent to add
         """
+        self.__queued += 1
+
+        key = event.getCoalesceKey()
+        if key is not None:
+            # look through the progress events at the end of the queue, 
+            # anything before them has to be drawn first
+            for i in reversed(xrange(len(self.__event_queue))):
+                queued_key = self.__event_queue[i].getCoalesceKey()
+                if queued_key is None:
+                    break
+                if queued_key == key:
+                    self.__event_queue[i] = event
+                    self.__coalesced += 1
+                    return
+
         self.__event_queue.append(event)
     
     def get(self):
@@ -57,4 +102,374 @@ class SynchronousEventQueue:
         :return: event, None if empty
         """
         if not self.empty():
-            return self.__event_queue.popleft()
\ No newline at end of file
+            return self.__event_queue.popleft()
+
+    def get_stats(self):
+        # type () -> dict
+        """
+        Get the statistics of the queue
+        :return: dict with the number of 'queued' and 'coalesced' events
+        """
+        return dict(queued=self.__queued, coalesced=self.__coalesced)
+
+    def discard(self, match):
+        # type (function) -> int
+        """
+        Remove every queued event that matches
+        :param match: function(SynchronousEvent) -> bool
+        :return: number of events removed
+        """
+        kept = deque(e for e in self.__event_queue if not match(e))
+        discarded = len(self.__event_queue) - len(kept)
+        self.__event_queue = kept
+        return discarded
+
+    def coalescable(self):
+        # type () -> bool
+        """
+        Check whether every queued event can be coalesced
+        """
+        return all(e.getCoalesceKey() is not None for e in self.__event_queue)
+
+
+class EventClass:
+    """
+    A class of events for the PriorityEventQueue
+    """
+
+    def __init__(self, name, priority, events, discardable=False, preempt=False):
+        # type (str, int, list, bool, bool) -> None
+        """
+        :param name: name of the class
+        :param priority: lower priorities are drawn first
+        :param events: event name fragments that belong to this class, 
+            (same as the filters in on_event)
+        :param discardable: events only redraw the screen, and can be 
+            dropped once they are obsolete
+        :param preempt: discard any queued discardable events when an 
+            event of this class is queued
+        """
+        self.name = name
+        self.priority = priority
+        self.events = events
+        self.discardable = discardable
+        self.preempt = preempt
+
+    def matches(self, event):
+        # type (str) -> bool
+        return any(e in event for e in self.events)
+
+
+def default_event_classes(priorities=None):
+    # type (dict) -> list
+    """
+    Get the default event classes
+
+    Errors, connection changes, and the other state changes jump ahead of
+    the queued progress frames, and discard them, since a progress that
+    was queued before them is stale once they are drawn.  Alerts and state
+    changes have the same priority, so that the newest state is the one
+    left on the screen: an error that jumps ahead of a queued PrintDone
+    would be drawn over right away.
+
+    :param priorities: dict of class name to priority, to override the defaults
+    """
+    priorities = priorities or {}
+    return [
+        EventClass('alert', priorities.get('alert', 0), ['Error', 'onnect'], preempt=True),
+        EventClass('progress', priorities.get('progress', 1), ['self_progress', 'self_marquee'], discardable=True),
+        # everything else
+        EventClass('state', priorities.get('state', 0), [''], preempt=True)
+    ]
+
+
+class PriorityEventQueue:
+    """
+    Priority aware replacement for SynchronousEventQueue.
+
+    Events are drawn in order of their EventClass priority, and in the 
+    order they were queued within the same priority.  Progress events are
+    coalesced just as in SynchronousEventQueue.
+    """
+
+    def __init__(self, classes=None):
+        # type (list) -> None
+        """
+        :param classes: list of EventClass, the first matching class is 
+            used for each event.  Uses default_event_classes() if None
+        """
+        self.__classes = classes if classes is not None else default_event_classes()
+
+        self.__priorities = sorted(set(c.priority for c in self.__classes))
+        self.__queues = dict((p, SynchronousEventQueue()) for p in self.__priorities)
+
+        self.__discarded = 0
+
+    def get_class(self, event):
+        # type (SynchronousEvent) -> EventClass
+        """
+        Get the class of an event, events that match no class get the 
+        lowest priority
+        """
+        for c in self.__classes:
+            if c.matches(event.getEvent()):
+                return c
+        return self.__classes[-1]
+
+    def empty(self):
+        # type () -> bool
+        return all(q.empty() for q in self.__queues.values())
+
+    def size(self):
+        # type () -> int
+        return sum(q.size() for q in self.__queues.values())
+
+    def put(self, event):
+        # type (SynchronousEvent) -> None
+        """
+        Add an event to the queue, discarding any frames it makes obsolete
+        :param event: SynchronousEvent to add
+        """
+        event_class = self.get_class(event)
+
+        if event_class.preempt:
+            discardable = lambda e: self.get_class(e).discardable
+            for p in self.__priorities:
+                if p >= event_class.priority:
+                    self.__discarded += self.__queues[p].discard(discardable)
+
+        self.__queues[event_class.priority].put(event)
+
+    def __next_queue(self):
+        for p in self.__priorities:
+            if not self.__queues[p].empty():
+                return self.__queues[p]
+
+    def get(self):
+        # type () -> SynchronousEvent
+        """
+        Peek at the next item in the queue
+        :return: event, None if empty
+        """
+        q = self.__next_queue()
+        if q is not None:
+            return q.get()
+
+    def pop(self):
+        # type () -> SynchronousEvent
+        """
+        Pop the next item in the queue
+        :return: event, None if empty
+        """
+        q = self.__next_queue()
+        if q is not None:
+            return q.pop()
+
+    def get_stats(self):
+        # type () -> dict
+        """
+        Get the statistics of the queue
+        :return: dict with the number of 'queued', 'coalesced', and 'discarded' events
+        """
+        stats = [q.get_stats() for q in self.__queues.values()]
+        return dict(
+            queued=sum(s['queued'] for s in stats),
+            coalesced=sum(s['coalesced'] for s in stats),
+            discarded=self.__discarded
+        )
+
+    def coalescable(self):
+        # type () -> bool
+        """
+        Check whether every queued event can be coalesced
+        """
+        return all(q.coalescable() for q in self.__queues.values())
+
+
+class FrameLimiter:
+    """
+    Limits how often the LCD is redrawn.
+    """
+
+    def __init__(self, max_fps=0, min_interval=0, clock=time.time):
+        # type (float, float, function) -> None
+        """
+        :param max_fps: maximum frames per second, 0 for no limit
+        :param min_interval: minimum time between frames in seconds
+        :param clock: function() that returns the time in seconds
+        """
+        self.interval = max(1.0 / max_fps if max_fps else 0, min_interval or 0)
+        self.clock = clock
+        self.__last_frame = None
+
+    def remaining(self):
+        # type () -> float
+        """
+        Get the time until the next frame can be drawn
+        :return: seconds to wait, 0 if a frame can be drawn now
+        """
+        if self.__last_frame is None:
+            return 0
+        return max(0, self.__last_frame + self.interval - self.clock())
+
+    def drawn(self):
+        # type () -> None
+        """
+        Record that a frame has just been drawn
+        """
+        self.__last_frame = self.clock()
+
+
+class EventDispatcher:
+    """
+    Draws the events of a queue one at a time.
+
+    Any thread can dispatch an event.  The first thread to get the render
+    lock owns the LCD, and draws every queued event in a loop, including
+    the ones other threads queue while it is drawing.  The other threads 
+    return right away.
+
+    With a FrameLimiter, a progress event that comes too soon after the 
+    last frame is held in the queue, where newer progress replaces it, and
+    is drawn once the interval expires.  Progress is drawn right away when
+    an event that can not be coalesced is queued behind it, so state
+    changes are never delayed; other progress and marquee steps are held
+    with it.
+
+    A dispatcher that is not ready only queues events, until open() is
+    called once the LCD can be drawn on.
+    """
+
+    def __init__(self, queue, render, limiter=None, ready=True):
+        # type (SynchronousEventQueue, function, FrameLimiter, bool) -> None
+        """
+        :param queue: queue of SynchronousEvents, such as PriorityEventQueue
+        :param render: function(event, payload) that draws an event
+        :param limiter: FrameLimiter for progress redraws, None for no limit
+        :param ready: False to queue the events until open() is called
+        """
+        self.__queue = queue
+        self.__render = render
+        self.__limiter = limiter
+        self.__ready = ready
+
+        self.__schedule = self.__schedule_timer
+        self.__timer = None
+
+        # guards the queue
+        self.__queue_lock = threading.Lock()
+        # held by the thread that is drawing on the LCD
+        self.__render_lock = threading.Lock()
+
+    def get_queue(self):
+        # type () -> SynchronousEventQueue
+        return self.__queue
+
+    def is_ready(self):
+        # type () -> bool
+        return self.__ready
+
+    def open(self):
+        # type () -> None
+        """
+        Let the queued events be drawn.  The caller drains the queue.
+        """
+        self.__ready = True
+
+    def set_scheduler(self, schedule):
+        # type (function) -> None
+        """
+        Set how a drain is scheduled once a held frame may be drawn.  By 
+        default a timer thread drains the queue.
+        :param schedule: function(delay) that calls drain after delay seconds
+        """
+        self.__schedule = schedule
+
+    def __schedule_timer(self, delay):
+        # type (float) -> None
+        # the timer that is draining can not wait for itself, a frame it
+        # holds again needs a new timer
+        timer = self.__timer
+        if timer is not None and timer.is_alive() and timer is not threading.current_thread():
+            return
+        self.__timer = threading.Timer(delay, self.drain)
+        self.__timer.daemon = True
+        self.__timer.start()
+
+    def __frame_delay(self, event):
+        # type (SynchronousEvent) -> float
+        """
+        Get how long an event has to be held before it can be drawn
+        """
+        if self.__limiter is None or event.getCoalesceKey() is None or not self.__queue.coalescable():
+            return 0
+        return self.__limiter.remaining()
+
+    def put(self, event):
+        # type (SynchronousEvent) -> None
+        """
+        Queue an event without drawing it
+        :param event: SynchronousEvent to queue
+        """
+        with self.__queue_lock:
+            self.__queue.put(event)
+
+    def empty(self):
+        # type () -> bool
+        with self.__queue_lock:
+            return self.__queue.empty()
+
+    def dispatch(self, event):
+        # type (SynchronousEvent) -> None
+        """
+        Queue an event, and draw the queue if no other thread is drawing
+        :param event: SynchronousEvent to draw
+        """
+        self.put(event)
+        self.drain()
+
+    def drain(self):
+        # type () -> None
+        """
+        Draw every queued event, unless another thread is already drawing them.
+        """
+        if not self.__ready:
+            # The events are drawn once the dispatcher is open
+            return
+        while True:
+            if not self.__render_lock.acquire(False):
+                # The owner will draw the queued events
+                return
+            held = False
+            try:
+                while True:
+                    with self.__queue_lock:
+                        e = self.__queue.get()
+                        if e is None:
+                            break
+                        delay = self.__frame_delay(e)
+                        if delay > 0:
+                            # draw the latest progress once the interval expires
+                            held = True
+                            break
+                        self.__queue.pop()
+                    self.__render(e.getEvent(), e.getPayload())
+                    if self.__limiter is not None:
+                        self.__limiter.drawn()
+            finally:
+                self.__render_lock.release()
+
+            if held:
+                # Unless a state change was queued behind the held progress 
+                # while the lock was held
+                with self.__queue_lock:
+                    waiting = not self.__queue.coalescable()
+                if not waiting:
+                    self.__schedule(delay)
+                    return
+                continue
+
+            # An event could have been queued after the queue was found 
+            # empty, but before the render lock was released
+            if self.empty():
+                return
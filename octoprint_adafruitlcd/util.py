@@ -1,17 +1,27 @@
 
+import logging
 import math
 import re
-import Adafruit_CharLCD as LCD
+from contextlib import contextmanager
 
 from . import data
+from . import renderer
+from . import glyphAllocator
+from . import circuitBreaker
+from . import frameBuffer
+from . import charMap
+
+# a character that is never drawn, for the cells of the lcd that are unknown
+UNKNOWN = u'\uffff'
 
 class LCDUtil:
 
     def __init__(self, data):
-        # type (Adafruit_CharLCDPlate, LCDData) -> None
+        # type (LCDData) -> None
         """
-        Create a new LCDUtil object.  It holds basic utility commands for the LCD
-        :lcd: lcd to use
+        Create a new LCDUtil object.  It holds basic utility commands for the LCD.
+        The lcd is created by open()
+        :param data: LCDData
         """
 
         # setup plugin variables
@@ -20,17 +30,99 @@ class LCDUtil:
         # Setup class variables
         self.__lcd_enabled = True
         self.__lcd_light = False
-        self.__current_lcd_text = [" " * self.__data.lcd_width, " " * self.__data.lcd_width]
+        # what the lcd shows
+        self.__current_lcd_text = frameBuffer.FrameBuffer(self.__data.lcd_width, self.__data.lcd_height)
+
+        # The frame to display, it is drawn when the outermost frame() ends
+        self.__frame = self.__current_lcd_text.copy()
+        # the frame in lcd characters, once its glyphs are given a slot
+        self.__target = self.__current_lcd_text.copy()
+        self.__frame_depth = 0
+        self.__renderer = renderer.FrameRenderer()
+        # position of the lcd's cursor, None if unknown
+        self.__cursor = None
+        # the last frame drawn, before its glyphs were replaced with their slots
+        self.__drawn = None
+
+        self.__backend = None
+        self.__breaker = None
+        self.__on_recover = None
+
+        self.__stats = dict(frames=0, commands=0, row_by_row_commands=0, clears=0)
+
+        # custom characters, loaded in the lcd's CGRAM when they are drawn
+        self.__glyphs = glyphAllocator.GlyphAllocator()
+        # the progress bar keeps the slots it has always used
+        for char, pattern in self.__progress_glyphs():
+            self.__glyphs.register(char, pattern, ord(char))
+        # the messages are translated to the characters of the lcd's ROM,
+        # and to custom characters for the few that it does not have
+        self.__charmap = charMap.CharMap()
+        for char, pattern, fallback in self.__charmap.glyphs():
+            self.__glyphs.register(char, pattern, None, fallback)
+
+    def init(self, logger):
+        # type (Logger)
+        """
+        Set the logger, and size the frames for the display in LCDData
+        """
+        self._logger = logger
+        self.__breaker = circuitBreaker.CircuitBreaker(logger)
+
+        self.__current_lcd_text = frameBuffer.FrameBuffer(self.__data.lcd_width, self.__data.lcd_height)
+        self.__frame = self.__current_lcd_text.copy()
+        self.__target = self.__current_lcd_text.copy()
+        self.__cursor = None
+        self.__drawn = None
+
+    def open(self, backend, breaker=None, on_recover=None):
+        # type (Backend, CircuitBreaker, function) -> None
+        """
+        Create the lcd of a backend, and show that the plugin is starting.
+        The frames are planned with the costs of the backend.
+        :param backend: Backend from backends.get_backend
+        :param breaker: CircuitBreaker that stops the commands while the lcd
+            does not answer, and creates the lcd again once it does
+        :param on_recover: function() called once the lcd answers again,
+            such as one that queues a redraw
+        """
+        self.__data.lcd = backend.create(self.__data.lcd_width, self.__data.lcd_height)
+        self.__renderer = renderer.FrameRenderer(backend.cursor_cost, backend.char_cost, backend.clear_cost)
+        self.__glyphs.invalidate()
+
+        self.__backend = backend
+        if breaker is not None:
+            self.__breaker = breaker
+        self.__breaker.set_probe(self.__reconnect, self.__recovered)
+        self.__on_recover = on_recover
 
         # Write starting message to lcd
         self.__data.lcd.enable_display(True)
         self.__data.lcd.clear()
         self.__data.lcd.home()
-        self.__data.lcd.message("Hold on, I'm\nstill waking up")
+        message = "Hold on, I'm\nstill waking up"
+        self.__data.lcd.message(message)
+        self.__current_lcd_text.fill()
+        for row, line in enumerate(message.split('\n')):
+            self.__current_lcd_text.write(row, 0, line)
+        self.__cursor = None
 
-    def init(self, logger):
-        # type (Logger)
-        self._logger = logger
+    def open_later(self, backend, fallback, breaker=None, on_recover=None):
+        # type (Backend, Backend, CircuitBreaker, function) -> None
+        """
+        Open the lcd of a fallback backend, after the lcd of backend could
+        not be created, such as a display that is not plugged in.  The
+        breaker is opened, and creates the lcd of backend once it answers.
+        :param backend: Backend whose lcd could not be created
+        :param fallback: Backend to use until then, such as VirtualBackend
+        :param breaker: CircuitBreaker that probes the lcd of backend
+        :param on_recover: function() called once the lcd of backend answers
+        """
+        self.open(fallback, breaker, on_recover)
+        # the frames are planned for the lcd that is drawn on once it answers
+        self.__backend = backend
+        self.__renderer = renderer.FrameRenderer(backend.cursor_cost, backend.char_cost, backend.clear_cost)
+        self.__breaker.trip()
 
     def enable_lcd(self, enable, force=False):
         # type (bool, bool) -> None
@@ -41,13 +133,13 @@ class LCDUtil:
         """
 
         if force:
-            self._logger.info("{}abling lcd; forced: yes".format('En' if enable else 'Dis'))
-            self.__data.lcd.enable_display(enable)
+            self._logger.info("%sabling lcd; forced: yes", 'En' if enable else 'Dis')
+            self.__send(self.__data.lcd.enable_display, enable)
             self.__lcd_enabled = enable
         else:
             if self.__lcd_enabled != enable:
-                self._logger.info("{}abling lcd; forced: no".format('En' if enable else 'Dis'))
-                self.__data.lcd.enable_display(enable)
+                self._logger.info("%sabling lcd; forced: no", 'En' if enable else 'Dis')
+                self.__send(self.__data.lcd.enable_display, enable)
                 self.__lcd_enabled = enable
 
     def light(self, on, force=False):
@@ -59,92 +151,310 @@ class LCDUtil:
         """
 
         if force:
-            self._logger.debug("turning {} lcd light; forced: Yes".format('on' if on else 'off'))
-            self.__data.lcd.set_backlight(1.0 if on else 0)
+            self._logger.debug("turning %s lcd light; forced: Yes", 'on' if on else 'off')
+            self.__send(self.__data.lcd.set_backlight, 1.0 if on else 0)
             self.__lcd_light = on
         else:
             if self.__lcd_light != on:
-                self._logger.debug("turning {} lcd light; forced: No".format('on' if on else 'off'))
-                self.__data.lcd.set_backlight(1.0 if on else 0)
+                self._logger.debug("turning %s lcd light; forced: No", 'on' if on else 'off')
+                self.__send(self.__data.lcd.set_backlight, 1.0 if on else 0)
                 self.__lcd_light = on
 
-    def write_to_lcd(self, message, row, clear=True, column=0):
-        # type (str, int, bool, int)
+    def write_to_lcd(self, message, row, clear=True, column=0, level=logging.INFO):
+        # type (str, int, bool, int, int)
         """
         Write a string message to the LCD. Displays the text on the LCD display.
+        The message is translated to the characters of the lcd, see CharMap.
+
+        Inside of a frame(), the message is only drawn once the frame ends.
         :param message: Message to display on the LCD
         :param row: Line number to display the text
         :param clear: clear the line
         :param column: position to start writing
+        :param level: level the message is logged at
         """
-        self._logger.info("Writing to LCD: {}".format(self.__data.special_chars_to_num(message)))
+        # the special characters are only converted if the message is logged
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, "Writing to LCD: %s", self.__data.printable(message))
 
         self.enable_lcd(True)
         self.light(True)
 
-        # make sure the message fits in the display
-        message = message[:self.__data.lcd_width - column]
-        # if the message should clear the line, fill the rest of the line with spaces
+        # if the message should clear the line, start from a blank line
         if clear:
-            temp = " " * self.__data.lcd_width
-            # insert the message into a lcd_width blank string
-            message = temp[:column] + message + temp[column + len(message):]
-            # clear the column number since we will now write to the entire line
-            column = 0
+            self.__frame.fill_row(row)
+        # the message is cut at the end of the line
+        self.__frame.write(row, column, self.__charmap.translate(message))
+
+        if self.__frame_depth == 0:
+            self.flush()
+
+    @contextmanager
+    def frame(self):
+        """
+        Collect every write_to_lcd into a single frame, which is drawn at 
+        the end of the outermost frame.  This lets the renderer plan the
+        writes for the whole screen at once.
+
+            with util.frame():
+                util.write_to_lcd("foo", 0)
+                util.write_to_lcd("bar", 1)
+        """
+        self.__frame_depth += 1
+        try:
+            yield
+        finally:
+            self.__frame_depth -= 1
+            if self.__frame_depth == 0:
+                self.flush()
+
+    def flush(self):
+        """
+        Draw the differences between the frame and the lcd
+        """
+        # nothing changed since the frame was drawn
+        if self.__frame == self.__drawn:
+            return
+        # the lcd does not answer, the frame is drawn once it does
+        if not self.__breaker.allow():
+            return
 
+        try:
+            self.__flush()
+        except EnvironmentError:
+            self.__failed()
+            return
+        self.__breaker.success()
+        if self.__drawn is None:
+            self.__drawn = self.__frame.copy()
+        else:
+            self.__drawn.copy_from(self.__frame)
 
-        # find the positions of the characters that are different
-        diff = self.__data.get_diff(self.__current_lcd_text[row][column:], message)
+    def __flush(self):
+        chars = self.__glyphs.find([self.__frame.text()])
+        if len(chars) == 0:
+            # the frame only has lcd characters
+            self.__draw(self.__frame)
+            return
 
-        # save the message to an array so that we can store what's actually being written
-        m = list(self.__current_lcd_text[row])
+        rows = self.__frame.lines()
+        visible = set(ord(c) for c in data.SPECIAL_CHARS.findall(self.__current_lcd_text.text()))
+        slots, uploads, deferred = self.__glyphs.assign(chars, visible)
+        self.__upload_glyphs(uploads)
+        if len(deferred) > 0:
+            # the slots are still on the screen, draw the frame without
+            # the new glyphs, so that the slots are not shown when they change
+            deferred_slots = set(slot for slot, pattern in deferred)
+            hidden = set(c for c in chars if slots[c] in deferred_slots)
+            self.__target.set_lines(self.__glyphs.translate(rows, slots, hidden))
+            self.__draw(self.__target)
+            self.__upload_glyphs(deferred)
+        self.__target.set_lines(self.__glyphs.translate(rows, slots))
+        self.__draw(self.__target)
 
-        self._logger.debug("Writing characters:")
+    def __draw(self, frame):
+        # type (FrameBuffer) -> None
+        """
+        Draw the differences between a frame, in lcd characters, and the lcd
+        """
+        diffs = self.__renderer.diff(self.__current_lcd_text, frame)
+        clear, runs = self.__renderer.plan_frame(self.__current_lcd_text, frame, self.__cursor, diffs)
+        if not clear and len(runs) == 0:
+            return
 
-        # write each different character
-        if len(diff) > 0:
-            last = diff[0]
-            self.__data.lcd.set_cursor(column + diff[0], row)
-        for i in diff:
-            # If the next character to write is not next to the last written 
-            # character, go to the new location
-            if last != i:
-                self.__data.lcd.set_cursor(column + i, row)
-            # Write the next character
-            self.__data.lcd.write8(ord(message[i]), True)
-            m[column + i] = message[i]
-            self._logger.debug("  {}".format(self.__data.special_chars_to_num(str(message[i]))))
+        self.__stats['frames'] += 1
+        self.__stats['commands'] += self.__renderer.commands(runs) + (1 if clear else 0)
+        self.__stats['row_by_row_commands'] += self.__renderer.row_by_row_commands(
+            self.__current_lcd_text, frame, diffs)
 
-            # set last to the selected index
-            last = i + 1
+        if clear:
+            # cheaper than overwriting the old characters
+            self.__data.lcd.clear()
+            self.__stats['clears'] += 1
+            self.__current_lcd_text.fill()
+            self.__cursor = (0, 0)
+
+        debug = self._logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            self._logger.debug("Writing characters:")
 
-        # update the lcd buffer with the newly written text
-        self.__current_lcd_text[row] = "".join(m)
+        for column, row, text, move in runs:
+            if move:
+                self.__data.lcd.set_cursor(column, row)
+            # drivers like MCP23017Plate send a whole run at once
+            self.__data.lcd.message(text)
+            if debug:
+                self._logger.debug("  (%d, %d) '%s'", column, row, self.__data.printable(text))
 
+            # update the lcd buffer with the newly written text
+            self.__current_lcd_text.write(row, column, text)
+            self.__cursor = (column + len(text), row)
 
-        self._logger.debug("LCD now displays: ")
-        self._logger.debug("  '{}'".format(self.__data.special_chars_to_num(self.__current_lcd_text[0])))
-        self._logger.debug("  '{}'".format(self.__data.special_chars_to_num(self.__current_lcd_text[1])))
+        if debug:
+            self._logger.debug("LCD now displays: ")
+            for line in self.__current_lcd_text.lines():
+                self._logger.debug("  '%s'", self.__data.printable(line))
+
+    def get_render_stats(self):
+        # type () -> dict
+        """
+        Get the number of frames drawn, the bus commands they needed, the
+        commands drawing them one row at a time would have needed, and the
+        number of frames drawn on a cleared lcd.
+        """
+        return dict(self.__stats)
 
     def clear(self):
         """
-        Clear both the lcd and the internal buffer.
-        
+        Clear the frame.  The lcd is only cleared when the frame is drawn,
+        if that costs less than overwriting the characters that changed.
+
         Prefer this method to clearing the lcd directly.
         """
+        self.__frame.fill()
 
-        self.__data.lcd.clear()
-        self.__current_lcd_text = [" " * self.__data.lcd_width, " " * self.__data.lcd_width]
+        if self.__frame_depth == 0:
+            self.flush()
+
+    def __send(self, command, *args):
+        # type (function, ...) -> bool
+        """
+        Send a command to the lcd, unless it does not answer
+        :return: True if the command was sent
+        """
+        if not self.__breaker.allow():
+            return False
+        try:
+            command(*args)
+        except EnvironmentError:
+            self.__failed()
+            return False
+        self.__breaker.success()
+        return True
+
+    def __failed(self):
+        """
+        A command failed, and the lcd shows an unknown frame
+        """
+        self._logger.warning("LCD command failed", exc_info=self._logger.isEnabledFor(logging.DEBUG))
+        # the next frame rewrites every character
+        self.__current_lcd_text.fill(UNKNOWN)
+        self.__cursor = None
+        self.__drawn = None
+        self.__glyphs.invalidate()
+        self.__breaker.failure()
+
+    def __reconnect(self):
+        # type () -> bool
+        """
+        Create the lcd again, called by the breaker while the lcd does not answer
+        """
+        lcd = self.__backend.create(self.__data.lcd_width, self.__data.lcd_height)
+        lcd.enable_display(self.__lcd_enabled)
+        lcd.set_backlight(1.0 if self.__lcd_light else 0)
+
+        # the lcd was initialized, it is blank and CGRAM is lost
+        self.__data.lcd = lcd
+        self.__current_lcd_text.fill()
+        self.__cursor = None
+        self.__drawn = None
+        self.__glyphs.invalidate()
+        return True
+
+    def __recovered(self):
+        if self.__on_recover is not None:
+            self.__on_recover()
+
+    def redraw(self):
+        """
+        Draw the latest frame again, such as once the lcd answers again
+        """
+        self.__drawn = None
+        if self.__frame_depth == 0:
+            self.flush()
+
+    def close(self):
+        """
+        Stop reconnecting to the lcd
+        """
+        self.__breaker.stop(5)
+
+    def get_bus_stats(self):
+        # type () -> dict
+        """
+        Get the number of failed commands, and how often the lcd was reconnected
+        """
+        return self.__breaker.get_stats()
     
     
+    def __progress_glyphs(self):
+        # type () -> list
+        return [
+            (self.__data.perc2, [0, 0, 0b10000, 0, 0b10000, 0, 0, 0]),
+            (self.__data.perc4, [0, 0, 0b11000, 0, 0b11000, 0, 0, 0]),
+            (self.__data.perc6, [0, 0, 0b11100, 0, 0b11100, 0, 0, 0]),
+            (self.__data.perc8, [0, 0, 0b11110, 0, 0b11110, 0, 0, 0])
+        ]
+
     def create_custom_progress_bar(self):
         """
-        Load the custom progress bar into the lcd screen
+        Load the custom progress bar into the lcd screen, before the
+        progress is drawn
+        """
+        self.load_glyphs([char for char, pattern in self.__progress_glyphs()])
+
+    def register_glyph(self, char, pattern, preferred=None, fallback=' '):
+        # type (str, list, int, str) -> None
+        """
+        Register a custom character.  It is loaded in one of the 8 CGRAM
+        slots when a frame that contains char is drawn.
+        :param char: character that stands for the glyph in the messages,
+            such as a character from the private use area (u'\ue000')
+        :param pattern: 8 rows of 5 bits
+        :param preferred: CGRAM slot to use if it is free
+        :param fallback: character drawn when every slot is used by the frame
+        """
+        self.__glyphs.register(char, pattern, preferred, fallback)
+
+    def load_glyphs(self, chars):
+        # type (list) -> None
+        """
+        Load custom characters ahead of the frames that use them.  Slots that
+        are on the screen are not replaced.
+        :param chars: registered chars
+        """
+        if not self.__breaker.allow():
+            return
+        visible = set(ord(c) for c in data.SPECIAL_CHARS.findall(self.__current_lcd_text.text()))
+        slots, uploads, deferred = self.__glyphs.assign(chars, visible)
+        try:
+            self.__upload_glyphs(uploads)
+        except EnvironmentError:
+            self.__failed()
+            return
+        self.__breaker.success()
+
+    def __upload_glyphs(self, uploads):
+        # type (list) -> None
+        for slot, pattern in uploads:
+            if self.__glyphs.upload(self.__data.lcd, slot, pattern):
+                # writing to CGRAM moves the lcd's address counter away from the display
+                self.__cursor = None
+
+    def reset_glyphs(self):
+        """
+        Forget which custom characters are loaded, after the lcd controller
+        is reset or initialized again
+        """
+        self.__glyphs.invalidate()
+        self.__drawn = None
+
+    def get_glyph_stats(self):
+        # type () -> dict
+        """
+        Get the number of custom characters uploaded, and the uploads skipped
         """
-        self.__data.lcd.create_char(ord(self.__data.perc2), [0, 0, 0b10000, 0, 0b10000, 0, 0, 0])
-        self.__data.lcd.create_char(ord(self.__data.perc4), [0, 0, 0b11000, 0, 0b11000, 0, 0, 0])
-        self.__data.lcd.create_char(ord(self.__data.perc6), [0, 0, 0b11100, 0, 0b11100, 0, 0, 0])
-        self.__data.lcd.create_char(ord(self.__data.perc8), [0, 0, 0b11110, 0, 0b11110, 0, 0, 0])
+        return self.__glyphs.get_stats()
 
     
 
@@ -0,0 +1,72 @@
+class VirtualLCD(object):
+    """
+    An LCD that only exists in memory.  It has the methods of
+    Adafruit_CharLCD that the plugin uses, and keeps what the display
+    would show, so the plugin can run on a machine without a display.
+    """
+
+    def __init__(self, cols=16, lines=2):
+        # type (int, int) -> None
+        self._cols = cols
+        self._lines = lines
+        self.__rows = [" " * cols for i in range(lines)]
+        self.__cursor = [0, 0]
+        self.__cgram = [None] * 8
+        self.__backlight = True
+        self.__enabled = True
+
+    def home(self):
+        self.__cursor = [0, 0]
+
+    def clear(self):
+        self.__rows = [" " * self._cols for i in range(self._lines)]
+        self.__cursor = [0, 0]
+
+    def set_cursor(self, col, row):
+        self.__cursor = [col, min(row, self._lines - 1)]
+
+    def enable_display(self, enable):
+        self.__enabled = enable
+
+    def write8(self, value, char_mode=False):
+        if not char_mode:
+            return
+        col, row = self.__cursor
+        if col < self._cols:
+            line = self.__rows[row]
+            self.__rows[row] = line[:col] + unichr(value) + line[col + 1:]
+        self.__cursor[0] += 1
+
+    def message(self, text):
+        line = 0
+        for char in text:
+            if char == '\n':
+                line += 1
+                self.set_cursor(0, line)
+            else:
+                self.write8(ord(char), True)
+
+    def create_char(self, location, pattern):
+        self.__cgram[location & 0x7] = list(pattern)
+
+    def set_backlight(self, backlight):
+        self.__backlight = bool(backlight)
+
+    def set_color(self, red, green, blue):
+        self.set_backlight(red or green or blue)
+
+    def get_text(self, row):
+        # type (int) -> str
+        return self.__rows[row]
+
+    def get_cgram(self, location):
+        # type (int) -> list
+        return self.__cgram[location]
+
+    def get_backlight(self):
+        # type () -> bool
+        return self.__backlight
+
+    def get_enabled(self):
+        # type () -> bool
+        return self.__enabled